@@ -2,7 +2,8 @@
 #
 # Copyright (c) 2018 Peter A McGill
 #
-from logging.handlers import RotatingFileHandler
+from .logPipeline import *
+from .metrics import *
 import asyncio
 import importlib
 import logging
@@ -11,17 +12,11 @@ import threading
 logger = logging.getLogger('asyncio.server')
 
 # -------------------------------------------------------------- #
-# addHandler
+# addHandler - records are queued and written by the LogPipeline
+# -- listener thread
 # ---------------------------------------------------------------#
 def addHandler(logger, logfile=None):
-  if logfile:
-    handler = RotatingFileHandler(logfile, maxBytes=5000000, backupCount=10)
-  else:
-    handler = logging.StreamHandler(sys.stdout)
-  logFormat = '%(levelname)s:%(asctime)s,%(filename)s:%(lineno)d %(message)s'
-  logFormatter = logging.Formatter(logFormat, datefmt='%d-%m-%Y %I:%M:%S %p')
-  handler.setFormatter(logFormatter)
-  logger.addHandler(handler)
+  return LogPipeline.addHandler(logger, logfile)
 
 class TaskError(Exception):
   pass
@@ -195,7 +190,7 @@ class ApiLoader(ApiRunner):
     JobControler.__start__(apiBase)
     LeveldbHash.__start__(apiBase)
     ApiRunner.__start__(apiBase)
-    BaseExecutor.__start__()    
+    BaseExecutor.__start__(apiBase)
     return cls()
     
   # ------------------------------------------------------------ #
@@ -1,12 +1,16 @@
 __all__ = (
   'ApiPacket',
   'Article',
+  'FrozenPacket',
   'JobPacket', 
   'Note',
   'Packet', 
-  'DEFAULT_PROTOCOL')
+  'DEFAULT_PROTOCOL',
+  'jsonDefault')
 
-import copy
+from collections import ChainMap
+from collections.abc import Mapping
+from functools import lru_cache
 import pickle
 import logging
 
@@ -33,43 +37,165 @@ class Note:
   def body(self):
     return self.__dict__
 
+# -------------------------------------------------------------- #
+# FrozenPacket - read only packet, a derived packet shares the maps
+# -- of its parent and overlays only the changed keys, so deriving
+# -- costs O(changed keys). Nested values are shared, not copied
+# ---------------------------------------------------------------#
+class FrozenPacket(Mapping):
+  __slots__ = ('_chain', '_masked')
+  MAX_DEPTH = 8
+
+  def __init__(self, packet={}, masked=frozenset()):
+    if isinstance(packet, ChainMap):
+      self._chain = packet
+    else:
+      self._chain = ChainMap(dict(packet))
+    self._masked = masked
+
+  def __getitem__(self, key):
+    if key in self._masked:
+      raise KeyError(key)
+    return self._chain[key]
+
+  def __contains__(self, key):
+    return key not in self._masked and key in self._chain
+
+  def __iter__(self):
+    for key in self._chain:
+      if key not in self._masked:
+        yield key
+
+  def __len__(self):
+    return len(self._chain) - len(self._masked.intersection(self._chain))
+
+  def __repr__(self):
+    return f'{self.__class__.__name__}({dict(self)})'
+
+  # immutable, so a copy is the same packet
+  def __copy__(self):
+    return self
+
+  def __deepcopy__(self, memo):
+    return self
+
+  def __reduce__(self):
+    return (self.__class__, (dict(self),))
+
+  # -------------------------------------------------------------- #
+  # derive - pop is applied before merge, as for Article.copy
+  # ---------------------------------------------------------------#
+  def derive(self, merge={}, pop=[]):
+    if not (merge or pop):
+      return self
+    masked = self._masked
+    if pop:
+      masked = masked.union(pop)
+    chain = self._chain
+    if merge:
+      masked = masked.difference(merge)
+      chain = chain.new_child(dict(merge))
+    if len(chain.maps) > self.MAX_DEPTH:
+      # compact the overlay chain to bound the lookup depth
+      chain = ChainMap({key:chain[key] for key in chain if key not in masked})
+      masked = frozenset()
+    return FrozenPacket(chain, masked)
+
+  def export(self, *keys):
+    if not keys:
+      return dict(self)
+    return {key:self[key] for key in keys if key in self}
+
+  def select(self, *keys):
+    if not keys:
+      keys = self.keys()
+    return [self[key] for key in keys if key in self]
+
+# -------------------------------------------------------------- #
+# jsonDefault - json encoder fallback for FrozenPacket and other
+# -- read only mappings
+# ---------------------------------------------------------------#
+def jsonDefault(obj):
+  if isinstance(obj, Mapping):
+    return dict(obj)
+  raise TypeError(f'{obj.__class__.__name__} is not json serializable')
+
 # -------------------------------------------------------------- #
 # Article
+# -- copy returns a FrozenPacket derived from a cached snapshot of
+# -- the article, which is renewed after any attribute update. The
+# -- copy is shallow, nested values are shared with the article, and
+# -- read only, so a caller that updates the copy uses export instead
 # ---------------------------------------------------------------#
 class Article(Note):
+  __slots__ = ('_snapshot',)
+
+  def __setattr__(self, key, value):
+    object.__setattr__(self, key, value)
+    self._thaw()
+
+  def __delattr__(self, key):
+    object.__delattr__(self, key)
+    self._thaw()
+
+  def _thaw(self):
+    object.__setattr__(self, '_snapshot', None)
+
+  def freeze(self):
+    snapshot = getattr(self, '_snapshot', None)
+    if snapshot is None:
+      snapshot = FrozenPacket(self.body)
+      object.__setattr__(self, '_snapshot', snapshot)
+    return snapshot
 
   def copy(self, pop=[], merge={}):
-    clone = copy.deepcopy(self.__dict__)
-    [clone.pop(popKey) for popKey in pop]
-    clone.update(merge)
-    return clone
+    return self.freeze().derive(merge, pop)
 
   def merge(self, packet, pop=[]):
     if not isinstance(packet, dict):
       raise TypeError('dict.update requires a dict argument')
     self.__dict__.update(packet)
+    self._thaw()
 
   def export(self, *keys):
+    body = self.body
     if not keys:
-      return self.copy()
-    return {key:self.__dict__[key] for key in keys if key in self.__dict__}
+      return dict(body)
+    return {key:body[key] for key in keys if key in body}
 
   def select(self, *keys):
+    body = self.body
     if not keys:
-      keys = self.__dict__.keys()
-    return [self.__dict__[key] for key in keys if key in self.__dict__]
+      keys = body.keys()
+    return [body[key] for key in keys if key in body]
 
 # -------------------------------------------------------------- #
 # Packet
 # ---------------------------------------------------------------#
 class Packet(Article):
   def __init__(self, packet={}):
+    # no snapshot exists yet, so the defaults bypass Article.__setattr__
     if 'args' not in packet:
-      self.args = []
+      self.__dict__['args'] = []
     if 'kwargs' not in packet:
-      self.kwargs = {}
+      self.__dict__['kwargs'] = {}
     super().__init__(packet)
 
+# -------------------------------------------------------------- #
+# parseRange - taskRange is either a task count or an a-b range.
+# -- the same few values recur, so the parsed range is cached
+# ---------------------------------------------------------------#
+@lru_cache(maxsize=256)
+def parseRange(taskRange):
+  try:
+    b = int(taskRange) + 1
+    return range(1,b)
+  except ValueError:
+    if '-' in taskRange:
+      a,b = list(map(int,taskRange.split('-')))
+      return range(a,b)
+  return None
+
 # -------------------------------------------------------------- #
 # JobPacket
 # ---------------------------------------------------------------#
@@ -79,7 +205,7 @@ class JobPacket(Packet):
       self.evalRange(packet['taskRange'])
       del packet['taskRange']
     if 'reload' not in packet:
-      self.reload = []
+      self.__dict__['reload'] = []
     super().__init__(packet)
     
   @property
@@ -87,24 +213,32 @@ class JobPacket(Packet):
     return [f'task{taskNum:02}' for taskNum in self.taskRange]
 
   def evalRange(self, taskRange):
-    try:
-      b = int(taskRange) + 1
-      self.taskRange = range(1,b)
-    except ValueError:
-      if '-' in taskRange:
-        a,b = list(map(int,taskRange.split('-')))
-        self.taskRange = range(a,b)
+    taskRange = parseRange(taskRange)
+    if taskRange is not None:
+      self.__dict__['taskRange'] = taskRange
 
 # -------------------------------------------------------------- #
 # ApiPacket
+# -- the fixed job header is slotted, any other packet item is an
+# -- extra, held in the instance __dict__
 # ---------------------------------------------------------------#
 class ApiPacket(JobPacket):
+  __slots__ = ('actor','caller','jobId','synchronous','typeKey','taskKey')
+  HEADER = __slots__[:-1]
+  REQUIRED = frozenset(HEADER)
+
   def __init__(self, packet):
-    reqList = ['actor','caller','jobId','synchronous','typeKey']
-    required = set(reqList)
-    provided = set(packet.keys())
-    if not required.issubset(provided):
+    if not self.REQUIRED <= packet.keys():
       errmsg = 'one or more required job params are not included'
-      raise Exception(f'{errmsg}\nrequired params: {reqList}')
-    super().__init__(packet)
-    self.taskKey = f'{self.jobId}:{self.typeKey}:{self.actor}'
+      raise Exception(f'{errmsg}\nrequired params: {list(self.HEADER)}')
+    for key in self.HEADER:
+      object.__setattr__(self, key, packet[key])
+    object.__setattr__(self, 'taskKey', f'{self.jobId}:{self.typeKey}:{self.actor}')
+    extras = {key:value for key, value in packet.items() if key not in self.REQUIRED}
+    super().__init__(extras)
+
+  @property
+  def body(self):
+    body = {key:getattr(self, key) for key in self.__slots__}
+    body.update(self.__dict__)
+    return body
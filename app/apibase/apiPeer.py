@@ -1,6 +1,5 @@
 #!/usr/bin/env python3
-from apibase import addHandler
-from logging.handlers import RotatingFileHandler
+from apibase import addHandler, LogPipeline, Metrics
 import asyncio
 import logging
 import os, sys
@@ -12,7 +11,15 @@ import subprocess
 class ApiPeer:
 
   @staticmethod    
-  def make(apiBase):
+  def make(apiBase, logFormat=None, sampleEvery=None, metricsPort=None):
+    # logFormat is text or json, sampleEvery N logs 1 in N sampled messages
+    logFormat = logFormat or os.environ.get('APIPEER_LOG_FORMAT')
+    sampleEvery = sampleEvery or os.environ.get('APIPEER_LOG_SAMPLE')
+    LogPipeline.configure(logFormat, sampleEvery)
+    # the prometheus metrics endpoint is served by ApiServer if a port is set
+    metricsPort = metricsPort or os.environ.get('APIPEER_METRICS_PORT')
+    Metrics.configure(metricsPort)
+
     logPath = f'{apiBase}/log'
     if not os.path.exists(logPath):
       subprocess.call(['mkdir','-p',logPath])
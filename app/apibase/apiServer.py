@@ -4,7 +4,7 @@ __all__ = ['ApiServer']
 #
 # Copyright (c) 2018 Peter A McGill
 #
-from apibase import AbstractTxnHost, ApiContext, ApiDatasource, ApiPacket, ApiRequest, JobTrader
+from apibase import AbstractTxnHost, ApiContext, ApiDatasource, ApiPacket, ApiRequest, JobTrader, Metrics
 import asyncio
 import logging
 import platform
@@ -44,6 +44,7 @@ class ApiServer(AbstractTxnHost):
       logger.info(f'{self.hostname} is starting ...')
       self.datasource.run()
       self.trader.start()
+      asyncio.ensure_future(Metrics.serve())
     except Exception as ex:
       f.set_exception(ex)
     finally:
@@ -77,6 +78,7 @@ class ApiServer(AbstractTxnHost):
   async def shutdown(self):
     logger.info(f'{self.hostname}, server is shutting down ...')
     self.datasource.shutdown()
+    Metrics.shutdown()
     await self.trader.shutdown()
     ApiRequest.stop()
     logger.info(f'{self.hostname}, server shutdown is complete')    
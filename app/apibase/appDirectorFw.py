@@ -4,6 +4,7 @@ __all__ = [
   'AppResolvar',
   'AppState',
   'Hashable',
+  'StateMachine',
   ]
 
 # The MIT License
@@ -11,10 +12,11 @@ __all__ = [
 # Copyright (c) 2018 Peter A McGill
 #
 from abc import ABCMeta, abstractmethod
-from apibase import Article, Note, Terminal
+from apibase import Article, Note, StateClock, Terminal
 from asyncio import CancelledError
 from concurrent.futures import CancelledError as FutCancelledError
 from apitools.datastore import HardhashContext
+import asyncio
 import logging
 import os
 
@@ -28,6 +30,9 @@ class AppActor(Terminal):
   def __init__(self, actorId):
     self.actorId = actorId
     self.resolve = None
+    self.machine = None
+    # StateClock, created by startClock. False if the jobId is not resolved
+    self.clock = None
     self.state = AppState(actorId)
     
   @property
@@ -55,15 +60,52 @@ class AppActor(Terminal):
     except Exception as ex:
       self.state.failed = True
       self.state.complete = True
+      self.stopClock(failed=True)
       self.onError(ex)
 
+  # -------------------------------------------------------------- #
+  # compile - builds the state machine tables once at actor start
+  # -------------------------------------------------------------- #
+  def compile(self, iterateMeta, promoteMeta=None):
+    self.machine = StateMachine.make(self.resolve, iterateMeta, promoteMeta)
+
+  # -------------------------------------------------------------- #
+  # startClock - created on the first runApp, with or without a state
+  # -- machine. The StateClock is keyed by jobId, so that Metrics.forget
+  # -- removes it. Without a jobId, the actor runs without a clock
+  # -------------------------------------------------------------- #
+  def startClock(self):
+    if self.clock is None:
+      resolve = self.resolve
+      jobId = getattr(self, 'jobId', None) or getattr(resolve, 'jobId', None) or \
+                                                  getattr(resolve, '_contextId', None)
+      if jobId is None:
+        logger.warning(f'{self.name}, jobId is not resolved, state timing is disabled')
+        self.clock = False
+      else:
+        self.clock = StateClock(jobId, self.name)
+      if self.machine is not None:
+        self.machine.clock = self.clock
+    return self.clock
+
+  # -------------------------------------------------------------- #
+  # stopClock - the program is complete, has failed or is cancelled
+  # -------------------------------------------------------------- #
+  def stopClock(self, failed=False):
+    if self.clock:
+      self.clock.stop(failed=failed)
+
   # -------------------------------------------------------------- #
   # quicken
   # -------------------------------------------------------------- #
   def quicken(self):
     state = self.state
-    packet = self._quicken[state.current]
-    logger.info(f'{self.name}, quicken, promote args : {packet}')
+    if self.machine is not None:
+      packet = self.machine.quicken(state.current)
+    else:
+      packet = self._quicken[state.current]
+    if logger.isEnabledFor(logging.INFO):
+      logger.info(f'{self.name}, quicken, promote args : {packet}')
     return packet
 
   # -------------------------------------------------------------- #
@@ -140,13 +182,23 @@ class AppDirector(AppActor):
         # until all signals are received state.hasNext must remain False
         return
       logger.info('state transition resolved by signal : ' + str(signal))
+    clock = self.startClock()
+    if self.machine is not None:
+      self.state = self.machine.run(state, *args, **kwargs)
+      if self.state.complete:
+        self.stopClock()
+      return
     while state.hasNext: # complete?
       logger.info(f'{self.name} resolving state : {state.current}')
+      if clock:
+        clock.enter(state.current)
       state = self.resolve[state.current](*args, **kwargs)
       if state.inTransition:
         break
       state.advance()
     self.state = state
+    if state.complete:
+      self.stopClock()
 
 # -------------------------------------------------------------- #
 # AppCooperator
@@ -179,9 +231,14 @@ class AppCooperator(AppActor):
         self.state.status = 'STARTED'
       elif self.state.status == 'STARTED':
         await self.runApp(*args, **kwargs)
+    except CancelledError:
+      # a cancelled run is not a failure, but its clock must be released
+      self.stopClock()
+      raise
     except Exception as ex:
       self.state.failed = True
       self.state.complete = True
+      self.stopClock(failed=True)
       self.onError(ex)
 
   # -------------------------------------------------------------- #
@@ -200,13 +257,23 @@ class AppCooperator(AppActor):
         # until all signals are received state.hasNext must remain False
         return
       logger.info('state transition resolved by signal : ' + str(signal))
+    clock = self.startClock()
+    if self.machine is not None:
+      self.state = await self.machine.arun(state, *args, **kwargs)
+      if self.state.complete:
+        self.stopClock()
+      return
     while state.hasNext: # complete?
       logger.info(f'{self.name} resolving state : {state.current}')
+      if clock:
+        clock.enter(state.current)
       state = await self.resolve[state.current](*args, **kwargs)
       if state.inTransition:
         break
       state.advance()
     self.state = state
+    if state.complete:
+      self.stopClock()
 
 # -------------------------------------------------------------- #
 # AppState
@@ -271,6 +338,137 @@ class AppState:
     if self.hasNext:
       self.current = self.next
 
+# -------------------------------------------------------------- #
+# StateMachine
+# ---------------------------------------------------------------#
+class StateMachine:
+  '''
+    Compiled form of the @iterate / @promote program design. Each state
+    is an integer id, the state delta, transition flags and promote packet
+    are held in arrays indexed by state id. A resolver method decorated by
+    @iterate is unwrapped, so that the delta is applied by the machine
+    instead of the decorator
+  '''
+  NULL = -1
+
+  def __init__(self, states):
+    self.states = states
+    self.stateId = {state: index for index, state in enumerate(states)}
+    self.stateId['NULL'] = self.NULL
+    size = len(states)
+    self.resolver = [None] * size
+    self.direct = [False] * size
+    self.delta = [None] * size
+    self.nextId = [self.NULL] * size
+    self.inTransition = [False] * size
+    self.hasNext = [False] * size
+    self.signalFrom = [()] * size
+    self.promote = [None] * size
+    # StateClock, bound by AppActor.startClock
+    self.clock = None
+
+  # -------------------------------------------------------------- #
+  # make
+  # ---------------------------------------------------------------#
+  @classmethod
+  def make(cls, resolvar, iterateMeta, promoteMeta=None):
+    promoteMeta = promoteMeta or {}
+    machine = cls(list(iterateMeta.keys()))
+    for index, state in enumerate(machine.states):
+      machine.compile(index, resolvar, iterateMeta[state], promoteMeta.get(state))
+    logger.info(f'{resolvar.name}, state machine is compiled : {machine.states}')
+    return machine
+
+  # -------------------------------------------------------------- #
+  # compile
+  # ---------------------------------------------------------------#
+  def compile(self, index, resolvar, stateMeta, promote):
+    state = self.states[index]
+    nextState = stateMeta.get('next', 'NULL')
+    if nextState not in self.stateId:
+      raise Exception(f'{state} next state {nextState} is not a program state')
+    method = getattr(resolvar, state)
+    func = getattr(method, '__wrapped__', None)
+    if func is not None and not asyncio.iscoroutinefunction(func):
+      self.resolver[index] = func.__get__(resolvar)
+      self.direct[index] = True
+    else:
+      self.resolver[index] = method
+    self.delta[index] = stateMeta
+    self.nextId[index] = self.stateId[nextState]
+    self.inTransition[index] = stateMeta.get('inTransition', False)
+    self.hasNext[index] = stateMeta.get('hasNext', False)
+    self.signalFrom[index] = tuple(stateMeta.get('signalFrom', []))
+    self.promote[index] = promote
+
+  # -------------------------------------------------------------- #
+  # quicken - a copy is returned, the handler adds the signal kwargs
+  # ---------------------------------------------------------------#
+  def quicken(self, current):
+    packet = self.promote[self.stateId[current]]
+    if packet is None:
+      raise KeyError(f'{current} does not have a promote packet')
+    return dict(packet)
+
+  # -------------------------------------------------------------- #
+  # resolve - returns the state and the next state id, or NULL if the
+  # -- state is in transition or the program has no next state
+  # ---------------------------------------------------------------#
+  def resolve(self, index, state, result):
+    if self.direct[index]:
+      state.__dict__.update(self.delta[index])
+      if self.inTransition[index] or not self.hasNext[index]:
+        return state, self.NULL
+      return state, self.nextId[index]
+    state = result
+    if state.inTransition or not state.hasNext:
+      return state, self.NULL
+    return state, self.stateId[state.next]
+
+  # -------------------------------------------------------------- #
+  # run - bulk mode, resolves states until a transition is reached
+  # -- or the program is complete
+  # ---------------------------------------------------------------#
+  def run(self, state, *args, **kwargs):
+    if not state.hasNext:
+      return state
+    index = self.stateId[state.current]
+    resolver, states, clock = self.resolver, self.states, self.clock
+    debug = logger.isEnabledFor(logging.DEBUG)
+    while True:
+      if debug:
+        logger.debug(f'resolving state : {states[index]}')
+      if clock:
+        clock.enter(states[index])
+      state, nextId = self.resolve(index, state, resolver[index](*args, **kwargs))
+      if nextId == self.NULL:
+        return state
+      index = nextId
+      state.current = states[index]
+
+  # -------------------------------------------------------------- #
+  # arun - coroutine version of run, for AppCooperator
+  # ---------------------------------------------------------------#
+  async def arun(self, state, *args, **kwargs):
+    if not state.hasNext:
+      return state
+    index = self.stateId[state.current]
+    resolver, direct, states, clock = self.resolver, self.direct, self.states, self.clock
+    debug = logger.isEnabledFor(logging.DEBUG)
+    while True:
+      if debug:
+        logger.debug(f'resolving state : {states[index]}')
+      if clock:
+        clock.enter(states[index])
+      result = resolver[index](*args, **kwargs)
+      if not direct[index]:
+        result = await result
+      state, nextId = self.resolve(index, state, result)
+      if nextId == self.NULL:
+        return state
+      index = nextId
+      state.current = states[index]
+
 # -------------------------------------------------------------- #
 # Hashable
 # ---------------------------------------------------------------#
@@ -306,6 +504,15 @@ class Hashable:
 class AppResolvar(Hashable, Terminal):
   def __init__(self, jobId):
     self._leveldb = HardhashContext.connector(contextId=jobId)
+    self._contextId = jobId
+
+  # -------------------------------------------------------------- #
+  # _aleveldb - awaitable connector for coroutine resolvers, it owns
+  # -- an I/O thread so it is made on first use
+  # ---------------------------------------------------------------#
+  @property
+  def _aleveldb(self):
+    return HardhashContext.asyncConnector(contextId=self._contextId)
 
   # -------------------------------------------------------------- #
   # destroy
@@ -1,7 +1,7 @@
 from apibase import Article, TaskError
 import importlib
 import logging
-import sys, uuid
+import sys, time, uuid
 
 logger = logging.getLogger('asyncio.server')
 
@@ -53,6 +53,15 @@ class AbstractHandler:
   def destroy(self, *args, **kwargs):
     raise NotImplementedError(f'{self.name}.destroy is an abstract method')
 
+  # -------------------------------------------------------------- #
+  # clearActors - drop the warm pools and cached classes of the job
+  # -- actors, so that a deleted or regenerated job does not reuse them
+  # ---------------------------------------------------------------#
+  def clearActors(self):
+    for brief in list(self.__dict__.values()):
+      if isinstance(brief, ActorBrief):
+        ActorPool.clear(brief.classToken)
+
   # -------------------------------------------------------------- #
   # prepare
   # ---------------------------------------------------------------#
@@ -214,3 +223,100 @@ class ActorCache(Article):
 
   def contains(self, taskId):
     return taskId in self._cache
+
+# -------------------------------------------------------------- #
+# ActorPool
+# -- warm pool of microservice actors for 1 classToken, keyed by
+# -- taskNum. Leased actors are reset before reuse, actors idle for
+# -- longer than IDLE_TIMEOUT are evicted
+# ---------------------------------------------------------------#
+class ActorPool:
+  IDLE_TIMEOUT = 300
+  MAX_IDLE = 4
+  _pool = {}
+  _klass = {}
+
+  def __init__(self, classToken):
+    self.classToken = classToken
+    self.actorKlass = self.getKlass(classToken)
+    self._idle = {}
+
+  @property
+  def name(self):
+    return f'{self.__class__.__name__}.{self.classToken}'
+
+  # -------------------------------------------------------------- #
+  # get
+  # ---------------------------------------------------------------#
+  @classmethod
+  def get(cls, classToken):
+    try:
+      return cls._pool[classToken]
+    except KeyError:
+      cls._pool[classToken] = pool = cls(classToken)
+      return pool
+
+  # -------------------------------------------------------------- #
+  # getKlass - resolve the actor class once per classToken
+  # ---------------------------------------------------------------#
+  @classmethod
+  def getKlass(cls, classToken):
+    try:
+      return cls._klass[classToken]
+    except KeyError:
+      moduleName, className = classToken.split(':')
+      module = sys.modules.get(moduleName)
+      if not module:
+        module = importlib.import_module(moduleName)
+      cls._klass[classToken] = klass = getattr(module, className)
+      return klass
+
+  # -------------------------------------------------------------- #
+  # clear
+  # ---------------------------------------------------------------#
+  @classmethod
+  def clear(cls, classToken=None):
+    if classToken:
+      cls._pool.pop(classToken, None)
+      cls._klass.pop(classToken, None)
+    else:
+      cls._pool.clear()
+      cls._klass.clear()
+
+  # -------------------------------------------------------------- #
+  # lease - a warm actor is reset before reuse, otherwise a new actor
+  # -- is created
+  # ---------------------------------------------------------------#
+  def lease(self, taskNum):
+    idle = self._idle.get(taskNum)
+    while idle:
+      actor, lastUsed = idle.pop()
+      if time.monotonic() - lastUsed > self.IDLE_TIMEOUT:
+        continue
+      try:
+        actor.reset()
+        return actor
+      except Exception:
+        logger.warning(f'{self.name}, actor {actor.actorId} reset failed, discarding it',
+                                                                    exc_info=True)
+    return self.actorKlass(taskNum, str(uuid.uuid4()))
+
+  # -------------------------------------------------------------- #
+  # release
+  # ---------------------------------------------------------------#
+  def release(self, taskNum, actor):
+    idle = self._idle.setdefault(taskNum, [])
+    if len(idle) < self.MAX_IDLE:
+      idle.append((actor, time.monotonic()))
+
+  # -------------------------------------------------------------- #
+  # evict - remove actors that have been idle for too long
+  # ---------------------------------------------------------------#
+  def evict(self):
+    expiry = time.monotonic() - self.IDLE_TIMEOUT
+    for taskNum in list(self._idle.keys()):
+      idle = [item for item in self._idle[taskNum] if item[1] > expiry]
+      if idle:
+        self._idle[taskNum] = idle
+      else:
+        del self._idle[taskNum]
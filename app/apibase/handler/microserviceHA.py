@@ -1,10 +1,8 @@
 from apibase import ApiRequest, Article, MicroserviceExecutor, Note
-from .handler import TaskHandler
+from .handler import ActorBrief, ActorPool, TaskHandler
 import asyncio
-import importlib
 import logging
 import os, sys
-import uuid
 
 logger = logging.getLogger('asyncio.broker')
 
@@ -39,7 +37,9 @@ class MicroserviceHandler(TaskHandler):
       subKey = f'{actorKey}:{microKey}'
       assemblyB.update(assemblyA)
       logger.info(f'{self.name}, applying {subKey} jobMeta : {assemblyB}')
-      self.__dict__[subKey] = ActorBrief(subKey, assemblyB)
+      self.__dict__[subKey] = brief = ActorBrief(subKey, assemblyB)
+      # a regenerated job may have rebuilt the actor module
+      ActorPool.clear(brief.classToken)
 
   # -------------------------------------------------------------- #
   # arrange
@@ -72,6 +72,8 @@ class MicroserviceHandler(TaskHandler):
       logger.error(f'{packet.taskKey}, microservice task errored', exc_info=True)
       raise
     finally:
+      # a failed group is discarded, its actors may hold broken state
+      actorGroup.release(discard=result.failed)
       await self.resume(result, packet)
 
   # -------------------------------------------------------------- #
@@ -179,25 +181,36 @@ class MicroserviceHB(MicroserviceHandler):
 # ---------------------------------------------------------------#
 class ActorGroup:
   def __init__(self, taskRange):
-    self.actorId = {taskNum:str(uuid.uuid4()) for taskNum in taskRange}
+    self.actorId = {}
     self.taskRange = taskRange
     self.actor = {}
+    self.pool = None
 
   # -------------------------------------------------------------- #
-  # arrange
+  # arrange - actors are leased from the classToken warm pool
   # ---------------------------------------------------------------#
   def arrange(self, classToken):
-    moduleName, className = classToken.split(':')
-    module = sys.modules.get(moduleName)
-    if not module:
-      module = importlib.import_module(moduleName)
-    actorKlass = getattr(module, className)
-    for taskNum, actorId in self.ordset:
-      logger.info(f'### job {taskNum}, actor id : {actorId}')
-      actor = actorKlass(taskNum, actorId)
+    self.pool = ActorPool.get(classToken)
+    for taskNum in self.taskRange:
+      actor = self.pool.lease(taskNum)
       self.actor[taskNum] = actor
+      self.actorId[taskNum] = actor.actorId
+      if logger.isEnabledFor(logging.INFO):
+        logger.info(f'### job {taskNum}, actor id : {actor.actorId}')
     return {'id': self.ids}
 
+  # -------------------------------------------------------------- #
+  # release - return the actors to the warm pool
+  # ---------------------------------------------------------------#
+  def release(self, discard=False):
+    if not self.pool:
+      return
+    if not discard:
+      for taskNum, actor in self.actor.items():
+        self.pool.release(taskNum, actor)
+    self.pool.evict()
+    self.pool = None
+
   def tell(self, taskNum):
     actor = self.actor[taskNum]
     return actor.actorId, actor.name
@@ -1,5 +1,5 @@
 from apibase import ApiRequest, Article, ServiceExecutor, TaskComplete, TaskError
-from .handler import ActorBrief, TaskHandler
+from .handler import ActorBrief, ActorPool, TaskHandler
 import asyncio
 import copy
 import importlib
@@ -24,7 +24,9 @@ class ServiceHA(TaskHandler):
   # ---------------------------------------------------------------#
   def apply(self, actorKey, jobMeta):
     logger.info(f'{self.name}, applying {actorKey} jobMeta : ' + str(jobMeta['assembly']))
-    self.__dict__[actorKey] = ActorBrief(actorKey, jobMeta['assembly'])
+    self.__dict__[actorKey] = brief = ActorBrief(actorKey, jobMeta['assembly'])
+    # a regenerated job may have rebuilt the actor module
+    ActorPool.clear(brief.classToken)
 
   # -------------------------------------------------------------- #
   # start
@@ -46,18 +48,14 @@ class ServiceHA(TaskHandler):
   def getActor(self, packet):
     actorKey, actorId, classToken = self[packet.actor].tell()
     logger.info(f'{self.jobId}, service actor : {actorKey},{classToken},{actorId}')
-    moduleName, className = classToken.split(':')
     if actorId:
       # state machine is promoted
       logger.info(f'{packet.taskKey}, resuming live actor ...')
       return (actorId, classToken)  
     logger.info(f'{packet.taskKey}, loading new actor ...')
-    module = sys.modules.get(moduleName)
-    if not module:
-      module = importlib.import_module(moduleName)
     actorId = str(uuid.uuid4())
     # must be an AppDirector derivative, parameters are fixed by protocol
-    actor = getattr(module, className)(actorId)
+    actor = ActorPool.getKlass(classToken)(actorId)
     self[packet.actor].actorId = actorId
     self.executor[actorId] = actor
     return (actorId, classToken)
@@ -101,10 +101,13 @@ class JobArrangement:
 # JobControler
 # ---------------------------------------------------------------#
 class JobControler(JobArrangement):
+  # requests that are routed to a handler by packet typeKey
+  routed = ('prepare','promote','restart','resume')
 
   def __init__(self, jobId):
     super().__init__(jobId)
     self.pendingFutures = set()
+    self._dispatch = {}
 
   def __getitem__(self, key):
     if key in self.__dict__:
@@ -149,6 +152,46 @@ class JobControler(JobArrangement):
     self.shutdownH = ShutdownHandler.make(jpacket.shutdownPolicy)
     typeKey = self.shutdownH.typeKey
     self._handler[typeKey] = self.shutdownH
+    self._dispatch = {}
+
+  # -------------------------------------------------------------- #
+  # dispatch - fast path, the (request, typeKey, actor) route is
+  # -- resolved once per arrangement
+  # ---------------------------------------------------------------#
+  def dispatch(self, request, packet):
+    try:
+      method, precede = self._dispatch[(request, packet.typeKey, packet.actor)]
+    except KeyError:
+      method, precede = self.route(request, packet)
+    if precede is None:
+      return method(packet)
+    packet.actor, packet.first = precede
+    try:
+      return method(packet)
+    except Exception as ex:
+      logger.error(f'{packet.taskKey}, handler error', exc_info=True)
+      raise TaskError(ex)
+
+  # -------------------------------------------------------------- #
+  # route - resolves and caches the dispatch entry, a routed entry
+  # -- holds the precede result : (actor, first)
+  # ---------------------------------------------------------------#
+  def route(self, request, packet):
+    routeKey = (request, packet.typeKey, packet.actor)
+    if request not in self.routed:
+      entry = (self[request], None)
+    else:
+      if packet.typeKey not in self._handler:
+        errmsg = f'{packet.taskKey}, {packet.typeKey} is NOT a registered handler'
+        logger.error(errmsg)
+        raise TaskError(errmsg)
+      actor = self.first if packet.actor == 'first' else packet.actor
+      method = getattr(self._handler[packet.typeKey], request)
+      entry = (method, (actor, actor == self.first))
+    if logger.isEnabledFor(logging.DEBUG):
+      logger.debug(f'{self.name}, new dispatch route {routeKey} : {entry}')
+    self._dispatch[routeKey] = entry
+    return entry
 
   # -------------------------------------------------------------- #
   # start
@@ -277,6 +320,7 @@ class JobControler(JobArrangement):
       logger.info(f'{packet.taskKey}, deleting service module ...\n{packet.body}')
       [f.cancel() for f in self.pendingFutures if not f.done()]
       self.pendingFutures.clear()
+      [handler.clearActors() for handler in self._handler.values()]
       return self[packet.typeKey].delete(packet, *args, **kwargs)
     except Exception as ex:
       logger.error(f'{self.name}, delete error', exc_info=True)
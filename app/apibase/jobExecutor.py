@@ -1,25 +1,281 @@
-__all__ = ('BaseExecutor','AdhocExecutor','ServiceExecutor','MicroserviceExecutor')
-
-from apibase import Article
-from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION
+__all__ = (
+  'BaseExecutor',
+  'AdhocExecutor',
+  'ExecutorRegistry',
+  'ManagedPool',
+  'ServiceExecutor',
+  'MicroserviceExecutor')
+
+from apibase import Article, DURATION, Metrics, SAMPLED
+from collections import deque
+from concurrent.futures import Executor, Future, FIRST_EXCEPTION
 from functools import partial
+from threading import Condition, Lock, Thread, current_thread
 import asyncio
 import inspect
 import logging
 import os, sys
+import simplejson as json
+import time
 
 # default task logger
 logger = logging.getLogger('asyncio.server')
 
+# -------------------------------------------------------------- #
+# ManagedPool
+# -- named thread pool with min/max workers, autoscaled from the queue
+# -- wait time. While the queued tasks outnumber the idle workers, a
+# -- scaler thread adds a worker each time the oldest queued task has
+# -- waited longer than waitThreshold, at most 1 worker per threshold
+# -- interval. So long running or mutually waiting tasks can not starve
+# -- the queue while the pool is below maxWorkers. A worker idle for
+# -- IDLE_TIMEOUT exits while the pool is above minWorkers
+# ---------------------------------------------------------------#
+class ManagedPool(Executor):
+  IDLE_TIMEOUT = 30
+  SMOOTHING = 0.2
+  WAIT_THRESHOLD = 0.05
+
+  def __init__(self, name, minWorkers, maxWorkers, waitThreshold=None):
+    self.name = name
+    self.minWorkers = minWorkers
+    self.maxWorkers = maxWorkers
+    self.waitThreshold = waitThreshold or self.WAIT_THRESHOLD
+    self.workers = 0
+    self.idle = 0
+    self.waitTime = 0.0
+    self.active = 0
+    self.completed = 0
+    self._lock = Lock()
+    self._ready = Condition(self._lock)
+    self._scaled = Condition(self._lock)
+    self._queue = deque()
+    self._threads = set()
+    self._scaler = None
+    self._serial = 0
+    self._shutdown = False
+
+  @property
+  def queueDepth(self):
+    return len(self._queue)
+
+  # -------------------------------------------------------------- #
+  # submit - the pool is filled to minWorkers on demand, above that
+  # -- the scaler decides from the queue wait time
+  # ---------------------------------------------------------------#
+  def submit(self, fn, *args, **kwargs):
+    future = Future()
+    with self._lock:
+      if self._shutdown:
+        raise RuntimeError(f'{self.name}, cannot submit a task after shutdown')
+      self._queue.append((future, time.monotonic(), fn, args, kwargs))
+      if self.workers < self.minWorkers:
+        self._addWorker()
+      else:
+        self._ready.notify()
+      if len(self._queue) > self.idle and self._scaler is None:
+        self._scaler = Thread(target=self._scale, name=f'{self.name}_scaler', daemon=True)
+        self._scaler.start()
+    return future
+
+  # -------------------------------------------------------------- #
+  # _scale - runs while the queued tasks outnumber the idle workers
+  # ---------------------------------------------------------------#
+  def _scale(self):
+    with self._lock:
+      try:
+        while not self._shutdown and len(self._queue) > self.idle \
+                                      and self.workers < self.maxWorkers:
+          waited = time.monotonic() - self._queue[0][1]
+          if waited >= self.waitThreshold:
+            self._addWorker()
+            # give the new worker 1 interval to take the oldest task
+            waited = 0.0
+          self._scaled.wait(self.waitThreshold - waited)
+      finally:
+        self._scaler = None
+
+  # -------------------------------------------------------------- #
+  # _addWorker - caller holds the lock
+  # ---------------------------------------------------------------#
+  def _addWorker(self):
+    self.workers += 1
+    self._serial += 1
+    if logger.isEnabledFor(logging.DEBUG):
+      logger.debug(f'{self.name}, adding worker, pool size : {self.workers}')
+    thread = Thread(target=self._work, name=f'{self.name}_{self._serial}', daemon=True)
+    self._threads.add(thread)
+    thread.start()
+
+  # -------------------------------------------------------------- #
+  # _work - worker loop
+  # ---------------------------------------------------------------#
+  def _work(self):
+    try:
+      while True:
+        item = self._next()
+        if item is None:
+          return
+        self._run(*item)
+    finally:
+      with self._lock:
+        self._threads.discard(current_thread())
+
+  # -------------------------------------------------------------- #
+  # _next - returns the next task, or None if the worker should exit.
+  # -- After shutdown, the queued tasks are still run
+  # ---------------------------------------------------------------#
+  def _next(self):
+    with self._lock:
+      while not self._queue:
+        if self._shutdown:
+          self.workers -= 1
+          return None
+        self.idle += 1
+        notified = self._ready.wait(self.IDLE_TIMEOUT)
+        self.idle -= 1
+        if not notified and not self._queue and self.workers > self.minWorkers:
+          self.workers -= 1
+          return None
+      return self._queue.popleft()
+
+  # -------------------------------------------------------------- #
+  # _run - measures the queue wait time of each task
+  # ---------------------------------------------------------------#
+  def _run(self, future, queuedAt, fn, args, kwargs):
+    waitTime = time.monotonic() - queuedAt
+    with self._lock:
+      self.active += 1
+      self.waitTime += self.SMOOTHING * (waitTime - self.waitTime)
+    try:
+      if not future.set_running_or_notify_cancel():
+        return
+      try:
+        result = fn(*args, **kwargs)
+      except BaseException as ex:
+        future.set_exception(ex)
+      else:
+        future.set_result(result)
+    finally:
+      with self._lock:
+        self.active -= 1
+        self.completed += 1
+
+  # -------------------------------------------------------------- #
+  # stats - queue depth and utilisation gauges, a worker is counted
+  # -- from its start until it exits, so active <= workers
+  # ---------------------------------------------------------------#
+  def stats(self):
+    with self._lock:
+      return {
+        'name': self.name,
+        'minWorkers': self.minWorkers,
+        'maxWorkers': self.maxWorkers,
+        'waitThreshold': self.waitThreshold,
+        'workers': self.workers,
+        'active': self.active,
+        'queueDepth': self.queueDepth,
+        'utilisation': self.active / self.workers if self.workers else 0.0,
+        'waitTime': self.waitTime,
+        'completed': self.completed
+      }
+
+  # -------------------------------------------------------------- #
+  # shutdown
+  # ---------------------------------------------------------------#
+  def shutdown(self, wait=True, cancel_futures=False):
+    with self._lock:
+      self._shutdown = True
+      if cancel_futures:
+        while self._queue:
+          self._queue.popleft()[0].cancel()
+      threads = list(self._threads)
+      self._ready.notify_all()
+      self._scaled.notify_all()
+    if wait:
+      for thread in threads:
+        thread.join()
+
+# -------------------------------------------------------------- #
+# ExecutorRegistry
+# -- 1 named pool per handler type. Worker limits are read from the
+# -- optional apiExecutors.json in apiBase, eg
+# -- {"microservice": {"minWorkers": 4, "maxWorkers": 64, "waitThreshold": 0.1}}
+# ---------------------------------------------------------------#
+class ExecutorRegistry:
+  _config = {}
+  _pool = {}
+  _lock = Lock()
+
+  # -------------------------------------------------------------- #
+  # __start__
+  # ---------------------------------------------------------------#
+  @classmethod
+  def __start__(cls, apiBase=None):
+    if not apiBase:
+      return
+    configPath = f'{apiBase}/apiExecutors.json'
+    if os.path.exists(configPath):
+      with open(configPath) as fhr:
+        cls._config = json.load(fhr)
+      logger.info(f'ExecutorRegistry, pool config : {cls._config}')
+
+  # -------------------------------------------------------------- #
+  # defaults - io bound handler pools may exceed the cpu count,
+  # -- but not by the previous factor of 10 per executor
+  # ---------------------------------------------------------------#
+  @staticmethod
+  def defaults():
+    cpuCount = len(os.sched_getaffinity(0))
+    return {'minWorkers': min(4, cpuCount), 'maxWorkers': min(32, cpuCount + 4)}
+
+  # -------------------------------------------------------------- #
+  # get
+  # ---------------------------------------------------------------#
+  @classmethod
+  def get(cls, name, **kwargs):
+    with cls._lock:
+      if name in cls._pool:
+        return cls._pool[name]
+      config = cls.defaults()
+      config.update(cls._config.get(name, {}))
+      config.update(kwargs)
+      if config['minWorkers'] > config['maxWorkers']:
+        config['minWorkers'] = config['maxWorkers']
+      logger.info(f'ExecutorRegistry, adding pool {name} : {config}')
+      pool = ManagedPool(name, config['minWorkers'], config['maxWorkers'],
+                                                config.get('waitThreshold'))
+      cls._pool[name] = pool
+      return pool
+
+  # -------------------------------------------------------------- #
+  # stats
+  # ---------------------------------------------------------------#
+  @classmethod
+  def stats(cls):
+    return {name: pool.stats() for name, pool in cls._pool.items()}
+
+  # -------------------------------------------------------------- #
+  # shutdown
+  # ---------------------------------------------------------------#
+  @classmethod
+  def shutdown(cls, wait=True):
+    with cls._lock:
+      for pool in cls._pool.values():
+        pool.shutdown(wait=wait)
+      cls._pool = {}
+
 # -------------------------------------------------------------- #
 # BaseExecutor
 # ---------------------------------------------------------------#
 class BaseExecutor:
-  _eventloop = None  
+  _eventloop = None
+  poolName = 'adhoc'
 
-  def __init__(self, demandFactor=10):
-    poolsize = len(os.sched_getaffinity(0)) * demandFactor
-    self.executor = ThreadPoolExecutor(poolsize)
+  def __init__(self, poolName=None, **kwargs):
+    if poolName:
+      self.poolName = poolName
+    self.executor = ExecutorRegistry.get(self.poolName, **kwargs)
 
   # -------------------------------------------------------------- #
   # name
@@ -39,8 +295,9 @@ class BaseExecutor:
   # start
   # ---------------------------------------------------------------#
   @staticmethod
-  def __start__():
+  def __start__(apiBase=None):
     BaseExecutor._eventloop = asyncio.get_event_loop()
+    ExecutorRegistry.__start__(apiBase)
 
   # -------------------------------------------------------------- #
   # getFuture
@@ -48,8 +305,8 @@ class BaseExecutor:
   def getFuture(self, actor, *args, **kwargs):
 
     if asyncio.iscoroutinefunction(actor.__call__):
-      logmsg = f'{self.name}, running coroutine {actor}'
-      logger.info(f'{logmsg}, args, kwargs : {args}, {kwargs}')   
+      logger.info('%s, running coroutine %s, args, kwargs : %s, %s',
+                                self.name, actor, args, kwargs, extra=SAMPLED)
       return asyncio.ensure_future(actor(*args, **kwargs))
     coro_or_future = actor.__call__(*args, **kwargs)
     if asyncio.futures.isfuture(coro_or_future):
@@ -57,9 +314,10 @@ class BaseExecutor:
     elif asyncio.iscoroutinefunction(coro_or_future):
       return asyncio.ensure_future(actor(*args, **kwargs))
     else:
-      logmsg = f'{self.name}, running {actor} in an executor future'
-      logger.info(f'{logmsg}, args, kwargs : {args}, {kwargs}')   
-      return self.eventloop.run_in_executor(None, partial(actor, *args, **kwargs))
+      logger.info('%s, running %s in an executor future, args, kwargs : %s, %s',
+                                self.name, actor, args, kwargs, extra=SAMPLED)
+      eventloop = self._eventloop or asyncio.get_event_loop()
+      return eventloop.run_in_executor(self.executor, partial(actor, *args, **kwargs))
 
 # -------------------------------------------------------------- #
 # AdhocExecutor
@@ -81,6 +339,7 @@ class AdhocExecutor(BaseExecutor):
 # ServiceExecutor
 # ---------------------------------------------------------------#
 class ServiceExecutor(AdhocExecutor):
+  poolName = 'service'
 
   def __init__(self, **kwargs):
     super().__init__(**kwargs)
@@ -152,6 +411,11 @@ class ServiceExecutor(AdhocExecutor):
 # MicroserviceExecutor
 # ---------------------------------------------------------------#
 class MicroserviceExecutor(AdhocExecutor):
+  poolName = 'microservice'
+  taskSeconds = Metrics.histogram('apipeer_task_seconds',
+                  'microservice task duration, submit to done', ('job','actor'), DURATION)
+  taskFailures = Metrics.meter('apipeer_task_failures_total',
+                  'microservice task failures', ('job','actor'))
 
   # -------------------------------------------------------------- #
   # destroy
@@ -174,6 +438,8 @@ class MicroserviceExecutor(AdhocExecutor):
     result = Article({'complete':True,'failed':False,'signal':201})
     futures = {self.getTask(actor, packet, taskNum): 
                       taskNum for taskNum, actor in actorGroup.ordActors}
+    onDone = partial(self.onTaskDone, packet.jobId, packet.actor, time.perf_counter())
+    [future.add_done_callback(onDone) for future in futures]
 
     try:
       done, pending = await asyncio.wait(futures.keys(), return_when=FIRST_EXCEPTION)
@@ -200,6 +466,16 @@ class MicroserviceExecutor(AdhocExecutor):
         result.merge({'taskNum':taskNum,'failed':True})
     return result
 
+  # -------------------------------------------------------------- #
+  # onTaskDone - per task duration, a cancelled task is not timed
+  # ---------------------------------------------------------------#
+  def onTaskDone(self, jobId, actor, started, future):
+    if future.cancelled():
+      return
+    self.taskSeconds.labels(jobId, actor).observe(time.perf_counter() - started)
+    if future.exception() is not None:
+      self.taskFailures.labels(jobId, actor).inc()
+
 # -------------------------------------------------------------- #
 # JobCache
 # ---------------------------------------------------------------#
@@ -1,7 +1,9 @@
 __all__ = ['JobProvider']
 from apibase import (AbstractTxnHost, ApiContext, ApiPacket, JobPacket, 
-    LeveldbHash, Note, TaskError, Terminal)
+    LeveldbHash, Note, SAMPLED, TaskError, Terminal)
 from .jobControler import JobControler
+from concurrent.futures import ThreadPoolExecutor
+from threading import RLock
 import copy
 import importlib
 import logging
@@ -61,84 +63,106 @@ class DependencyError(Exception):
 # JobProvider
 # ---------------------------------------------------------------#
 class JobProvider(AbstractProvider):
+  # generator MakeKit state is class level, so each generator module
+  # runs 1 generation at a time
+  _genLock = {}
 
   def __init__(self, jpacket):
     self.serverId = jpacket.serverId
     self._leveldb = LeveldbHash.get()
-    self.depth = 1
     self.dependency = copy.copy(jpacket.dependency)
 
-  @property
-  def hasNext(self):
-    return self.dependency != []
-
   # -------------------------------------------------------------- #
-  # make
+  # run - generates each dependency level concurrently, dealers are
+  # -- made in topological order, dependencies first
   # ---------------------------------------------------------------#
   @classmethod
   def run(cls, jpacket):
     dealers = {}
-    provider = cls.resolve(packet=jpacket)
-    while provider.hasNext:
-      gpacket = provider.next()
-      provider.make(dealers, gpacket)
+    provider = cls(jpacket)
+    graph = provider.resolve()
+    for level in provider.arrange(graph):
+      for jpacket in provider.generate(graph, level):
+        provider.make(dealers, jpacket)
     return dealers
 
   # -------------------------------------------------------------- #
   # make
   # ---------------------------------------------------------------#
-  def make(self, dealers, gpacket):
-    logger.info(f'{gpacket.jobId}, making job dependency {gpacket.eventKey}')
-    moduleName, className = gpacket.generator.split(':')
-    module = sys.modules.get(moduleName)
-    if not module:
-      module = importlib.import_module(moduleName)
-    genKlass = getattr(module, className)
-    logger.info(f'provider, job generation class : {className}')
-    jpacket = genKlass()(gpacket)
+  def make(self, dealers, jpacket):
     logger.info(f'job {jpacket.jobId} assembly : {jpacket.assembly}')
     controler = JobControler.make(jpacket)
     dealers[jpacket.jobId] = JobDealer.make(self.serverId, controler, jpacket)
 
   # -------------------------------------------------------------- #
-  # resolve
+  # resolve - returns the dependency graph reachable from the root
+  # -- job, using 1 metastore scan of the JDEP events
   # ---------------------------------------------------------------#
-  @classmethod
-  def resolve(cls, provider=None, packet=None):
-    if not provider:
-      provider = cls(packet)
-      logger.info(f'root job dependency list : {provider.dependency}')
-      if not packet.dependency:
-        return provider
-    if not provider.extended():
-      return provider
-    logger.info(f'job dependency list : {provider.dependency}')
-    if provider.depth > 10:
+  def resolve(self):
+    logger.info(f'root job dependency list : {self.dependency}')
+    events = {}
+    for metaDoc in self._leveldb.select('JDEP|', 'JDEP|~'):
+      if 'jobId' in metaDoc:
+        events[f'JDEP|{metaDoc["jobId"]}'] = metaDoc
+    graph = {}
+    pending = list(self.dependency)
+    while pending:
+      eventKey = pending.pop()
+      if eventKey in graph:
+        continue
+      try:
+        graph[eventKey] = metaDoc = events[eventKey]
+      except KeyError:
+        raise DependencyError(f'job dependency {eventKey} not found')
+      logger.info(f'{eventKey} dependency : {metaDoc["dependency"]}')
+      pending.extend(metaDoc['dependency'] or [])
+    return graph
+
+  # -------------------------------------------------------------- #
+  # arrange - topological sort into levels of independent jobs
+  # ---------------------------------------------------------------#
+  def arrange(self, graph):
+    depends = {eventKey: set(metaDoc['dependency'] or []) 
+                                  for eventKey, metaDoc in graph.items()}
+    levels = []
+    while depends:
+      level = sorted(eventKey for eventKey, depSet in depends.items() if not depSet)
+      if not level:
+        raise DependencyError(f'job dependency cycle detected : {list(depends)}')
+      levels.append(level)
+      for eventKey in level:
+        del depends[eventKey]
+      for depSet in depends.values():
+        depSet.difference_update(level)
+    if len(levels) > 10:
       raise DependencyError('dependency depth limit of 10 exceeded')
-    return cls.resolve(provider)
+    logger.info(f'job dependency levels : {levels}')
+    return levels
 
   # -------------------------------------------------------------- #
-  # extended
+  # generate - returns the generated job packets in level order
   # ---------------------------------------------------------------#
-  def extended(self):
-    eventKey = self.dependency[-1]
-    params = {'eventKey':eventKey,'itemKey':'dependency'}
-    nextDep = self.query(Note(params))
-    logger.info(f'next dependency : {nextDep}')
-    if nextDep:
-      self.dependency.extend(nextDep)
-      self.depth += 1
-    return nextDep != []
+  def generate(self, graph, level):
+    gpackets = [JobPacket(copy.deepcopy(graph[eventKey])) for eventKey in level]
+    if len(gpackets) == 1:
+      return [self.generateJob(gpackets[0])]
+    with ThreadPoolExecutor(max_workers=len(gpackets)) as executor:
+      futures = [executor.submit(self.generateJob, gpacket) for gpacket in gpackets]
+      return [future.result() for future in futures]
 
   # -------------------------------------------------------------- #
-  # next
+  # generateJob
   # ---------------------------------------------------------------#
-  def next(self):
-    eventKey = self.dependency.pop()
-    params = Note({'eventKey':eventKey})
-    jobMeta = self.query(params)
-    logger.info(f'next generate meta : {jobMeta}')
-    return JobPacket(jobMeta)
+  def generateJob(self, gpacket):
+    logger.info(f'{gpacket.jobId}, making job dependency {gpacket.eventKey}')
+    moduleName, className = gpacket.generator.split(':')
+    module = sys.modules.get(moduleName)
+    if not module:
+      module = importlib.import_module(moduleName)
+    genKlass = getattr(module, className)
+    logger.info(f'provider, job generation class : {className}')
+    with self._genLock.setdefault(genKlass.__module__, RLock()):
+      return genKlass()(gpacket)
 
 #----------------------------------------------------------------#
 # JobDealer
@@ -172,7 +196,7 @@ class JobDealer(AbstractTxnHost):
   async def perform(self, request, packet):
     try:
       jpacket = self.checkPacket(request, packet)
-      response = self.controler[request](jpacket)
+      response = self.controler.dispatch(request, jpacket)
       if jpacket.synchronous:
         await self.send(response,jpacket.actor)
     except Exception as ex:
@@ -183,11 +207,12 @@ class JobDealer(AbstractTxnHost):
   # checkPacket
   #----------------------------------------------------------------#
   def checkPacket(self, request, packet):
-    logmsg = f'{self.hostname}, got request {request}'
     if isinstance(packet, dict):
-      logger.info(f'{logmsg}\n{packet}')
+      if logger.isEnabledFor(logging.INFO):
+        logger.info('%s, got request %s\n%s', self.hostname, request, packet, extra=SAMPLED)
       return ApiPacket(packet)
-    logger.info(f'{logmsg}\n{packet.body}')
+    if logger.isEnabledFor(logging.INFO):
+      logger.info('%s, got request %s\n%s', self.hostname, request, packet.body, extra=SAMPLED)
     return packet
 
   #----------------------------------------------------------------#
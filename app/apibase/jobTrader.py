@@ -1,9 +1,10 @@
 __all__ = ['JobTrader']
-from apibase import AbstractTxnHost, TaskError
+from apibase import AbstractTxnHost, DURATION, ExecutorRegistry, Metrics, TaskError
 from .jobProvider import JobProvider
 from threading import RLock
 import asyncio
 import logging
+import time
 
 logger = logging.getLogger('asyncio.broker')
 
@@ -11,6 +12,11 @@ logger = logging.getLogger('asyncio.broker')
 # JobTrader - managers JobDealer lifecycle, creation and deletion
 # ---------------------------------------------------------------#
 class JobTrader:
+  generateSeconds = Metrics.histogram('apipeer_job_generate_seconds',
+                      'job generation duration, JobProvider run and install', ('job',), DURATION)
+  generateFailures = Metrics.meter('apipeer_job_generate_failures_total',
+                      'job generation or first promote failures', ('job',))
+
   def __init__(self, serverId):
     self.serverId = serverId
     self._cache = {}
@@ -61,11 +67,11 @@ class JobTrader:
   def install(self, jobId, dealers):
     dealer = dealers.pop(jobId)
     self._dcache[jobId] = []
-    self._install(jobId, dealer)
-    # install job dependency components
-    for djobId, dealer in dealers.items():
-      self._install(djobId, dealer)
+    # install job dependency components first, dealers are in topological order
+    for djobId, ddealer in dealers.items():
+      self._install(djobId, ddealer)
       self._dcache[jobId].append(djobId)
+    self._install(jobId, dealer)
 
   # -------------------------------------------------------------- #
   # install
@@ -84,16 +90,20 @@ class JobTrader:
   # ---------------------------------------------------------------#
   async def _create(self, jobId, jpacket):
     try:
+      started = time.perf_counter()
       jpacket.serverId = self.serverId
       dealers = await self.submit(JobProvider.run, jpacket)
       self.install(jobId, dealers)
+      self.generateSeconds.labels(jobId).observe(time.perf_counter() - started)
       if self.runNow(jpacket.runMode['startTime']):
         await self._cache[jobId].perform('promote',jpacket)
     except asyncio.CancelledError:
       logger.error(f'{self.name}, job {jobId} generation was canceled')
     except TaskError:
+      self.generateFailures.labels(jobId).inc()
       logger.error(f'{self.name}, job {jobId} generation errored')
     except Exception as ex:
+      self.generateFailures.labels(jobId).inc()
       logger.error(f'{self.name}, uncaught system error', exc_info=True)
 
   # -------------------------------------------------------------- #
@@ -153,8 +163,19 @@ class JobTrader:
       logger.error(f'{self.name}, uncaught system error', exc_info=True)
     finally:
       del self._cache[jobId]
+      Metrics.forget(jobId)
       logger.info(f'{self.name}, controler {jobId} is deleted')
 
+  # -------------------------------------------------------------- #
+  # stats - timing and throughput metrics, of jobId or all jobs if *
+  # ---------------------------------------------------------------#
+  def stats(self, packet):
+    jobId = None if packet.jobId == '*' else packet.jobId
+    response = Metrics.snapshot(jobId)
+    response['jobs'] = list(self._cache.keys())
+    response['pools'] = ExecutorRegistry.stats()
+    return [200, response]
+
   # -------------------------------------------------------------- #
   # Submit
   # ---------------------------------------------------------------#
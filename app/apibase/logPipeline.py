@@ -0,0 +1,180 @@
+__all__ = [
+  'JsonLineFormatter',
+  'LogPipeline',
+  'SAMPLED']
+
+# The MIT License
+#
+# Copyright (c) 2018 Peter A McGill
+#
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from collections import defaultdict
+import atexit
+import copy
+import logging
+import queue
+import simplejson as json
+import sys
+
+TEXT_FORMAT = '%(levelname)s:%(asctime)s,%(filename)s:%(lineno)d %(message)s'
+DATE_FORMAT = '%d-%m-%Y %I:%M:%S %p'
+
+# pass as extra to mark a high frequency message for sampling
+SAMPLED = {'sampled': True}
+
+# -------------------------------------------------------------- #
+# JsonLineFormatter - compact 1 line json record
+# ---------------------------------------------------------------#
+class JsonLineFormatter(logging.Formatter):
+
+  def format(self, record):
+    entry = {
+      'ts': round(record.created, 3),
+      'level': record.levelname,
+      'logger': record.name,
+      'src': f'{record.filename}:{record.lineno}',
+      'msg': record.getMessage()
+    }
+    if record.exc_text:
+      entry['exc'] = record.exc_text
+    elif record.exc_info:
+      entry['exc'] = self.formatException(record.exc_info)
+    return json.dumps(entry, separators=(',',':'), default=str)
+
+# -------------------------------------------------------------- #
+# SampleFilter - passes 1 in every N records marked as sampled,
+# -- counted per logging call site. Warnings and errors always pass
+# ---------------------------------------------------------------#
+class SampleFilter(logging.Filter):
+  def __init__(self):
+    super().__init__()
+    self._count = defaultdict(int)
+
+  def filter(self, record):
+    every = LogPipeline.sampleEvery
+    if every <= 1 or record.levelno >= logging.WARNING:
+      return True
+    if not getattr(record, 'sampled', False):
+      return True
+    siteKey = (record.name, record.lineno)
+    self._count[siteKey] += 1
+    return self._count[siteKey] % every == 1
+
+# -------------------------------------------------------------- #
+# LazyQueueHandler - the message and traceback text are formatted on
+# -- the logging thread, as QueueHandler does, since the args may be
+# -- mutated later and exc_info holds frames alive. The log line is
+# -- formatted by the listener thread, with the routed handler format
+# ---------------------------------------------------------------#
+class LazyQueueHandler(QueueHandler):
+  _exc = logging.Formatter()
+
+  def prepare(self, record):
+    record = copy.copy(record)
+    record.msg = record.getMessage()
+    record.args = None
+    if record.exc_info:
+      if not record.exc_text:
+        record.exc_text = self._exc.formatException(record.exc_info)
+      record.exc_info = None
+    return record
+
+# -------------------------------------------------------------- #
+# RoutingHandler - the listener handler, dispatches each record to
+# -- the file and stream handlers registered for its logger
+# ---------------------------------------------------------------#
+class RoutingHandler(logging.Handler):
+  def __init__(self):
+    super().__init__()
+    self._route = defaultdict(list)
+
+  def add(self, loggerName, handler):
+    self._route[loggerName].append(handler)
+
+  def handle(self, record):
+    for handler in self._route.get(record.name, ()):
+      if record.levelno >= handler.level:
+        handler.handle(record)
+
+  def close(self):
+    for handlers in self._route.values():
+      [handler.close() for handler in handlers]
+    super().close()
+
+# -------------------------------------------------------------- #
+# LogPipeline
+# -- every logger gets 1 QueueHandler, so a logging call only puts the
+# -- record on a queue. A background QueueListener formats and writes
+# -- the records to the registered file and stream handlers
+# ---------------------------------------------------------------#
+class LogPipeline:
+  logFormat = 'text'
+  sampleEvery = 1
+  _queue = None
+  _listener = None
+  _router = None
+  _sampler = None
+  _producer = {}
+
+  # -------------------------------------------------------------- #
+  # configure
+  # ---------------------------------------------------------------#
+  @classmethod
+  def configure(cls, logFormat=None, sampleEvery=None):
+    if logFormat:
+      cls.logFormat = logFormat
+    if sampleEvery:
+      cls.sampleEvery = int(sampleEvery)
+
+  # -------------------------------------------------------------- #
+  # start
+  # ---------------------------------------------------------------#
+  @classmethod
+  def start(cls):
+    if cls._listener:
+      return
+    cls._queue = queue.SimpleQueue()
+    cls._router = RoutingHandler()
+    cls._sampler = SampleFilter()
+    cls._listener = QueueListener(cls._queue, cls._router)
+    cls._listener.start()
+    atexit.register(cls.stop)
+
+  # -------------------------------------------------------------- #
+  # stop - drains the queue, then closes the handlers
+  # ---------------------------------------------------------------#
+  @classmethod
+  def stop(cls):
+    if not cls._listener:
+      return
+    cls._listener.stop()
+    cls._router.close()
+    cls._listener = None
+
+  # -------------------------------------------------------------- #
+  # formatter
+  # ---------------------------------------------------------------#
+  @classmethod
+  def formatter(cls):
+    if cls.logFormat == 'json':
+      return JsonLineFormatter()
+    return logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+  # -------------------------------------------------------------- #
+  # addHandler - route logger records to a file, or stdout by default
+  # ---------------------------------------------------------------#
+  @classmethod
+  def addHandler(cls, logger, logfile=None):
+    cls.start()
+    if logfile:
+      handler = RotatingFileHandler(logfile, maxBytes=5000000, backupCount=10)
+    else:
+      handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(cls.formatter())
+    cls._router.add(logger.name, handler)
+    if logger.name not in cls._producer:
+      producer = LazyQueueHandler(cls._queue)
+      producer.addFilter(cls._sampler)
+      logger.addHandler(producer)
+      cls._producer[logger.name] = producer
+    return handler
@@ -0,0 +1,394 @@
+__all__ = [
+  'DURATION',
+  'LATENCY',
+  'Histogram',
+  'Meter',
+  'Metrics',
+  'StateClock']
+
+# The MIT License
+#
+# Copyright (c) 2018 Peter A McGill
+#
+from bisect import bisect_left
+from functools import partial
+from threading import Lock
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger('asyncio.server')
+
+# histogram bucket upper bounds, in seconds
+LATENCY = (.0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0)
+DURATION = (.01, .05, .1, .5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+# meter rate window, in seconds
+RATE_WINDOW = 10
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# -------------------------------------------------------------- #
+# Histogram - bucketed observations of 1 label set. The bucket index
+# -- is found before the lock is taken, so the lock only guards a few
+# -- integer updates
+# ---------------------------------------------------------------#
+class Histogram:
+  kind = 'histogram'
+
+  def __init__(self, labels, buckets=LATENCY):
+    self.labels = labels
+    self.buckets = buckets
+    self.counts = [0] * (len(buckets) + 1)
+    self.count = 0
+    self.sum = 0.0
+    self.bytes = 0
+    self._lock = Lock()
+
+  # -------------------------------------------------------------- #
+  # observe
+  # ---------------------------------------------------------------#
+  def observe(self, value, nbytes=0):
+    index = bisect_left(self.buckets, value)
+    with self._lock:
+      self.counts[index] += 1
+      self.count += 1
+      self.sum += value
+      self.bytes += nbytes
+
+  # -------------------------------------------------------------- #
+  # quantile - the upper bound of the bucket holding the q rank
+  # ---------------------------------------------------------------#
+  def quantile(self, q):
+    rank = q * self.count
+    total = 0
+    for index, count in enumerate(self.counts):
+      total += count
+      if total >= rank and count:
+        return self.buckets[min(index, len(self.buckets) - 1)]
+    return None
+
+  def snapshot(self):
+    with self._lock:
+      count, total, nbytes = self.count, self.sum, self.bytes
+    return {
+      'count': count,
+      'sum': round(total, 6),
+      'mean': round(total / count, 6) if count else None,
+      'p50': self.quantile(.5),
+      'p95': self.quantile(.95),
+      'p99': self.quantile(.99),
+      'bytes': nbytes
+    }
+
+  # -------------------------------------------------------------- #
+  # expose - prometheus buckets are cumulative
+  # ---------------------------------------------------------------#
+  def expose(self, family, labels, lines):
+    with self._lock:
+      counts, count, total = list(self.counts), self.count, self.sum
+    cumulative = 0
+    for bound, bucketCount in zip(self.buckets + ('+Inf',), counts):
+      cumulative += bucketCount
+      lines.append(f'{family.name}_bucket{{{labels}{"," if labels else ""}le="{bound}"}} {cumulative}')
+    lines.append(f'{family.name}_sum{{{labels}}} {total}')
+    lines.append(f'{family.name}_count{{{labels}}} {count}')
+
+# -------------------------------------------------------------- #
+# Meter - counter with a rate over the last RATE_WINDOW seconds,
+# -- counted in 1 second slots
+# ---------------------------------------------------------------#
+class Meter:
+  kind = 'counter'
+
+  def __init__(self, labels):
+    self.labels = labels
+    self.count = 0
+    self.bytes = 0
+    self._slots = [0] * RATE_WINDOW
+    self._second = 0
+    self._lock = Lock()
+
+  # -------------------------------------------------------------- #
+  # inc
+  # ---------------------------------------------------------------#
+  def inc(self, count=1, nbytes=0):
+    second = int(time.monotonic())
+    with self._lock:
+      if second != self._second:
+        self._advance(second)
+      self._slots[second % RATE_WINDOW] += count
+      self.count += count
+      self.bytes += nbytes
+
+  # -------------------------------------------------------------- #
+  # _advance - clear the slots skipped since the last count
+  # ---------------------------------------------------------------#
+  def _advance(self, second):
+    for skipped in range(max(self._second + 1, second - RATE_WINDOW + 1), second + 1):
+      self._slots[skipped % RATE_WINDOW] = 0
+    self._second = second
+
+  # -------------------------------------------------------------- #
+  # rate - per second, over the rate window
+  # ---------------------------------------------------------------#
+  def rate(self):
+    with self._lock:
+      self._advance(int(time.monotonic()))
+      return sum(self._slots) / RATE_WINDOW
+
+  def snapshot(self):
+    rate = self.rate()
+    return {'count': self.count, 'rate': rate, 'bytes': self.bytes}
+
+  def expose(self, family, labels, lines):
+    lines.append(f'{family.name}{{{labels}}} {self.count}')
+
+# -------------------------------------------------------------- #
+# Family - 1 metric name, with a series per label value set
+# ---------------------------------------------------------------#
+class Family:
+  def __init__(self, name, helpText, labelNames, factory, kind, bytesName=None):
+    self.name = name
+    self.helpText = helpText
+    self.labelNames = labelNames
+    self.factory = factory
+    self.kind = kind
+    self.bytesName = bytesName
+    self.children = {}
+    self._lock = Lock()
+
+  # -------------------------------------------------------------- #
+  # labels - returns the series, bind it once where the labels are
+  # -- fixed to avoid the lookup in a hot path
+  # ---------------------------------------------------------------#
+  def labels(self, *values):
+    series = self.children.get(values)
+    if series is None:
+      with self._lock:
+        series = self.children.get(values)
+        if series is None:
+          series = self.children[values] = self.factory(values)
+    return series
+
+  # -------------------------------------------------------------- #
+  # remove - drop the series of a deleted job
+  # ---------------------------------------------------------------#
+  def remove(self, labelName, value):
+    if labelName not in self.labelNames:
+      return
+    index = self.labelNames.index(labelName)
+    with self._lock:
+      for values in [values for values in self.children if values[index] == value]:
+        del self.children[values]
+
+  def items(self):
+    with self._lock:
+      return list(self.children.items())
+
+  # -------------------------------------------------------------- #
+  # snapshot - series as dicts, only of jobId if it is a label
+  # ---------------------------------------------------------------#
+  def snapshot(self, jobId=None):
+    jobIndex = self.labelNames.index('job') if 'job' in self.labelNames else None
+    result = []
+    for values, series in self.items():
+      if jobId and jobIndex is not None and values[jobIndex] != jobId:
+        continue
+      entry = dict(zip(self.labelNames, values))
+      entry.update(series.snapshot())
+      result.append(entry)
+    return result
+
+  # -------------------------------------------------------------- #
+  # expose
+  # ---------------------------------------------------------------#
+  def expose(self, lines):
+    items = self.items()
+    lines.append(f'# HELP {self.name} {self.helpText}')
+    lines.append(f'# TYPE {self.name} {self.kind}')
+    for values, series in items:
+      series.expose(self, formatLabels(self.labelNames, values), lines)
+    if self.bytesName:
+      lines.append(f'# HELP {self.bytesName} {self.helpText}, payload bytes')
+      lines.append(f'# TYPE {self.bytesName} counter')
+      for values, series in items:
+        lines.append(f'{self.bytesName}{{{formatLabels(self.labelNames, values)}}} {series.bytes}')
+
+# -------------------------------------------------------------- #
+# formatLabels
+# ---------------------------------------------------------------#
+def formatLabels(labelNames, values):
+  return ','.join(f'{name}="{escape(value)}"' for name, value in zip(labelNames, values))
+
+def escape(value):
+  return str(value).replace('\\','\\\\').replace('"','\\"').replace('\n','\\n')
+
+# -------------------------------------------------------------- #
+# Metrics
+# -- in process registry of metric families. Observations are taken
+# -- by the hot paths, the aggregate is read by the stats api request
+# -- and by the optional prometheus text endpoint
+# ---------------------------------------------------------------#
+class Metrics:
+  host = '127.0.0.1'
+  port = None
+  _families = {}
+  _clocks = {}
+  _lock = Lock()
+  _server = None
+
+  # -------------------------------------------------------------- #
+  # configure - the prometheus endpoint is served if port is set
+  # ---------------------------------------------------------------#
+  @classmethod
+  def configure(cls, port=None, host=None):
+    if port:
+      cls.port = int(port)
+    if host:
+      cls.host = host
+
+  # -------------------------------------------------------------- #
+  # histogram
+  # ---------------------------------------------------------------#
+  @classmethod
+  def histogram(cls, name, helpText, labelNames=(), buckets=LATENCY, bytesName=None):
+    factory = partial(Histogram, buckets=buckets)
+    return cls._family(name, helpText, labelNames, factory, Histogram.kind, bytesName)
+
+  # -------------------------------------------------------------- #
+  # meter
+  # ---------------------------------------------------------------#
+  @classmethod
+  def meter(cls, name, helpText, labelNames=(), bytesName=None):
+    return cls._family(name, helpText, labelNames, Meter, Meter.kind, bytesName)
+
+  @classmethod
+  def _family(cls, name, helpText, labelNames, factory, kind, bytesName):
+    with cls._lock:
+      if name not in cls._families:
+        cls._families[name] = Family(name, helpText, tuple(labelNames), factory, kind, bytesName)
+      return cls._families[name]
+
+  # -------------------------------------------------------------- #
+  # forget - drop the series of a deleted job
+  # ---------------------------------------------------------------#
+  @classmethod
+  def forget(cls, jobId):
+    for family in list(cls._families.values()):
+      family.remove('job', jobId)
+    for key, clock in list(cls._clocks.items()):
+      if clock.jobId == jobId:
+        cls._clocks.pop(key, None)
+
+  # -------------------------------------------------------------- #
+  # snapshot - for the stats api request
+  # ---------------------------------------------------------------#
+  @classmethod
+  def snapshot(cls, jobId=None):
+    metrics = {name: family.snapshot(jobId) for name, family in list(cls._families.items())}
+    active = [clock.snapshot() for clock in list(cls._clocks.values())
+                                      if not jobId or clock.jobId == jobId]
+    return {'timestamp': time.time(), 'activeStates': active, 'metrics': metrics}
+
+  # -------------------------------------------------------------- #
+  # exposition - prometheus text format
+  # ---------------------------------------------------------------#
+  @classmethod
+  def exposition(cls):
+    lines = []
+    for family in list(cls._families.values()):
+      family.expose(lines)
+    lines.append('# HELP apipeer_state_active_seconds elapsed time of the current job state')
+    lines.append('# TYPE apipeer_state_active_seconds gauge')
+    for clock in list(cls._clocks.values()):
+      active = clock.snapshot()
+      labels = formatLabels(('job','actor','state'), (clock.jobId, clock.actor, active['state']))
+      lines.append(f'apipeer_state_active_seconds{{{labels}}} {active["elapsed"]}')
+    lines.append('')
+    return '\n'.join(lines)
+
+  # -------------------------------------------------------------- #
+  # serve - minimal http endpoint, GET /metrics
+  # ---------------------------------------------------------------#
+  @classmethod
+  async def serve(cls):
+    if not cls.port or cls._server:
+      return
+    cls._server = await asyncio.start_server(cls._handle, cls.host, cls.port)
+    logger.info(f'Metrics, prometheus endpoint : http://{cls.host}:{cls.port}/metrics')
+
+  @classmethod
+  async def _handle(cls, reader, writer):
+    try:
+      request = await reader.readuntil(b'\r\n\r\n')
+      method, path, _ = request.split(b' ', 2)
+      if method == b'GET' and path.split(b'?')[0] in (b'/', b'/metrics'):
+        status, body = '200 OK', cls.exposition().encode()
+      else:
+        status, body = '404 Not Found', b'not found\n'
+      header = f'HTTP/1.1 {status}\r\nContent-Type: {CONTENT_TYPE}\r\n' \
+                        f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'
+      writer.write(header.encode() + body)
+      await writer.drain()
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+      pass
+    finally:
+      writer.close()
+
+  # -------------------------------------------------------------- #
+  # shutdown
+  # ---------------------------------------------------------------#
+  @classmethod
+  def shutdown(cls):
+    if cls._server:
+      cls._server.close()
+      cls._server = None
+
+# -------------------------------------------------------------- #
+# StateClock - times each state of 1 actor state machine. A state
+# -- is timed from its entry to the entry of the next state, so a
+# -- state in transition includes the work that resolves it
+# ---------------------------------------------------------------#
+class StateClock:
+  seconds = Metrics.histogram('apipeer_state_seconds',
+                'job state duration, entry to next state entry', ('job','actor','state'), DURATION)
+  failures = Metrics.meter('apipeer_state_failures_total',
+                'job state failures', ('job','actor','state'))
+
+  def __init__(self, jobId, actor):
+    self.jobId = jobId
+    self.actor = actor
+    self.state = None
+    self.started = 0.0
+
+  # -------------------------------------------------------------- #
+  # enter - completes the prior state
+  # ---------------------------------------------------------------#
+  def enter(self, state):
+    now = time.perf_counter()
+    if self.state is None:
+      Metrics._clocks[id(self)] = self
+    else:
+      self.seconds.labels(self.jobId, self.actor, self.state).observe(now - self.started)
+    self.state, self.started = state, now
+
+  # -------------------------------------------------------------- #
+  # stop - the program is complete or has failed
+  # ---------------------------------------------------------------#
+  def stop(self, failed=False):
+    if self.state is None:
+      return
+    self.seconds.labels(self.jobId, self.actor, self.state).observe(time.perf_counter() - self.started)
+    if failed:
+      self.failures.labels(self.jobId, self.actor, self.state).inc()
+    self.state = None
+    Metrics._clocks.pop(id(self), None)
+
+  def snapshot(self):
+    return {
+      'job': self.jobId,
+      'actor': self.actor,
+      'state': self.state,
+      'elapsed': round(time.perf_counter() - self.started, 6)
+    }
@@ -1,5 +1,8 @@
 from .component import Article, Note
 from .connector import AbcConnector, Connector, ConnWATC, create_task, QuConnector
-from .provider import ConnProvider, MemCache
+from .multiplex import MuxStream, MuxTransport
+from .ringQueue import RingQueue
+from .shmConnector import ShmConnector, ShmListener
+from .provider import ConnPool, ConnProvider, MemCache
 from .txnHost import TxnHost
 from .unblock import toThread
\ No newline at end of file
@@ -27,6 +27,13 @@ class Note:
 
   def __setitem__(self, key, value):
     self.__dict__[key] = value
+
+  # keys are normalised at construction, so pickle restores the state as is
+  def __getstate__(self):
+    return self.__dict__
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
     
   @property
   def body(self):
@@ -114,17 +121,13 @@ class Note:
     if not isinstance(packet, dict):
       logger.warn("Note constructor expects packet to be a dict type")
       return packet
-    # self.__dict__.update(packet)
     for key, value in packet.items():
       if "-" in key:
         key = key.replace("-","_")
-      self.__dict__[key] = value
-    if not recursive:
-      return
-    for key, value in packet.items():
-      if isinstance(value, dict):
+      if recursive and isinstance(value, dict):
         # don't convert beyond first level
-        self.__dict__[key] = Note(packet=value, recursive=False)
+        value = Note(packet=value, recursive=False)
+      self.__dict__[key] = value
 
 #================================================================#
 # Article
@@ -138,21 +141,45 @@ class Article(Note):
       return cls(packet)
     return packet
 
-  # for default socket Connector
+  # for default socket Connector, an Article is pickled as is by __getstate__
+  # a dict packet is still accepted for compatibility
   @classmethod
-  def deserialize(cls, bpacket: bytearray):
+  def deserialize(cls, bpacket: bytes):
     packet = pickle.loads(bpacket)
-    logger.debug("Deserialized article packet : \n{}".format(packet))
     if isinstance(packet, dict):
       return cls(packet)
     return packet
 
+  # freeze - for a reference handoff, the article is read only from now on
+  def freeze(self)-> object:
+    self.__class__ = FrozenArticle
+    return self
 
   # QuConn equivalent of Conn using article.serialize - reduces Article to a raw dict collection
   def reducce(self)-> dict:
     return self.rawcopy(outNote=False,)
 
-  def serialize(self)-> bytearray:
-    packet = self.rawcopy(outNote=False, shallow=False)
-    logger.debug("Serialized article packet : \n{}".format(packet))
-    return bytearray(pickle.dumps(packet, pickleMode))
+  def serialize(self)-> bytes:
+    return pickle.dumps(self, pickleMode)
+
+#================================================================#
+# FrozenArticle - read only Article, for in-process queue handoff
+#===============================================================-#
+class FrozenArticle(Article):
+
+  def _frozen(self, *args, **kwargs):
+    raise TypeError(f"{self.__class__.__name__} is read only")
+
+  __call__ = __setattr__ = __delattr__ = __setitem__ = _frozen
+  delete = merge = remove = rename = _frozen
+
+  # restore is the only writer, once only by pickle
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+
+  def freeze(self)-> object:
+    return self
+
+  # pickle restores a frozen article as a writable Article
+  def __reduce_ex__(self, protocol):
+    return (Article, (), self.__dict__)
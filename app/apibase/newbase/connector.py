@@ -7,9 +7,14 @@ from datetime import datetime
 from typing import Any
 
 from .component import Article, Note
+from .ringQueue import RingQueue
 
 logger = logging.getLogger('asyncio')
 
+# asyncio.timeout (python 3.11) lets ConnWATC await io directly in the
+# calling task, otherwise each io call runs as a new task
+DIRECT_IO = hasattr(asyncio, "timeout")
+
 #-----------------------------------------------------------------#
 # create_task
 #-----------------------------------------------------------------#
@@ -59,40 +64,51 @@ class QuConnector:
   id: str
   _reader: Queue
   _writer: Queue
+  # the queue is in process, so articles are passed by reference. If frozen,
+  # the written article is read only, as the receiver now shares it
+  frozen: bool = False
+
+  #----------------------------------------------------------------//
+  # alive - for pool reuse, a stale unread reply means not reusable
+  #----------------------------------------------------------------//
+  @property
+  def alive(self) -> bool:
+    return self._reader.empty()
   
   #----------------------------------------------------------------//
   # close - simulate asyncio socket closure
   #----------------------------------------------------------------//
   async def close(self):
-    if not self._reader.empty():
-      for _ in range(self._reader.qsize()):
-        await self._reader.get()
-        self._reader.task_done()
-    if not self._writer.empty():
-      for _ in range(self._writer.qsize()):
-        await self._writer.get()
-        self._writer.task_done()
+    for queue in (self._reader, self._writer):
+      if isinstance(queue, RingQueue):
+        queue.clear()
+        continue
+      for _ in range(queue.qsize()):
+        queue.get_nowait()
+        queue.task_done()
 
   #----------------------------------------------------------------//
   # open
   # -- bandDesc set = (DUEL, SINGLE) where SINGLE band would apply 
   # -- for a PUSH / PULL arrangment
+  # -- capacity > 0 selects a bounded RingQueue for batched transfer
   #----------------------------------------------------------------//
   @classmethod
-  def open(cls, bandDesc="DUEL", cid="0") -> object:
+  def open(cls, bandDesc="DUEL", cid="0", frozen=False, capacity=0) -> object:
     if cid == "0":
       cid = datetime.now().strftime('%S%f')
+    newQueue = (lambda: RingQueue(capacity)) if capacity > 0 else Queue
     if bandDesc == "SINGLE":
-      conn = Queue()
-      return cls(cid, conn, conn)
-    return cls(cid, Queue(), Queue())
+      conn = newQueue()
+      return cls(cid, conn, conn, frozen)
+    return cls(cid, newQueue(), newQueue(), frozen)
   
   #----------------------------------------------------------------//
-  # _write
+  # _write - no copy, the article reference is queued
   #----------------------------------------------------------------//
   async def _write(self, payload):
-    if isinstance(payload, Article):
-      payload = payload.reducce()
+    if self.frozen and isinstance(payload, Article):
+      payload = payload.freeze()
     await self._writer.put(payload)
 
   #----------------------------------------------------------------//
@@ -104,11 +120,50 @@ class QuConnector:
       return Article.deducce(payload)
     return payload
 
+  #----------------------------------------------------------------//
+  # send_many - 1 consumer wakeup per batch on a RingQueue
+  #----------------------------------------------------------------//
+  async def send_many(self, payloads):
+    if self.frozen:
+      payloads = [payload.freeze() if isinstance(payload, Article) else payload 
+                                                          for payload in payloads]
+    if isinstance(self._writer, RingQueue):
+      await self._writer.put_many(payloads)
+      return
+    for payload in payloads:
+      await self._writer.put(payload)
+
+  #----------------------------------------------------------------//
+  # recv_many - waits for the first payload, then takes up to maxItems
+  # -- available payloads. maxWait None means wait without limit, 0
+  # -- means don't wait, otherwise [] is returned once maxWait expires
+  #----------------------------------------------------------------//
+  async def recv_many(self, maxItems=256, maxWait=None) -> list:
+    reader = self._reader
+    payloads = []
+    if reader.empty():
+      if maxWait == 0:
+        return payloads
+      try:
+        if maxWait is None:
+          payloads.append(await reader.get())
+        else:
+          payloads.append(await asyncio.wait_for(reader.get(), maxWait))
+      except asyncio.TimeoutError:
+        return payloads
+    if isinstance(reader, RingQueue):
+      payloads += reader.get_many(maxItems - len(payloads))
+    else:
+      while len(payloads) < maxItems and not reader.empty():
+        payloads.append(reader.get_nowait())
+    return [Article.deducce(payload) if isinstance(payload, dict) else payload 
+                                                          for payload in payloads]
+
   #----------------------------------------------------------------//
   # cloneReversed
   #----------------------------------------------------------------//
   def cloneReversed(self) -> object:
-    return QuConnector(self.id, self._writer, self._reader)
+    return QuConnector(self.id, self._writer, self._reader, self.frozen)
   
 #================================================================#
 # Connector
@@ -119,6 +174,13 @@ class Connector:
   _reader: StreamReader
   _writer: StreamWriter
 
+  #----------------------------------------------------------------//
+  # alive - for pool reuse, the peer has not closed the stream
+  #----------------------------------------------------------------//
+  @property
+  def alive(self) -> bool:
+    return not (self._writer.is_closing() or self._reader.at_eof())
+
   #----------------------------------------------------------------//
   # close
   #----------------------------------------------------------------//
@@ -158,7 +220,7 @@ class Connector:
 
     fsize = int.from_bytes(header[1:hsize],'little')
 
-    bpacket = await self._reader.read(fsize)
+    bpacket = await self._reader.readexactly(fsize)
     return Article.deserialize(bpacket)
 
   #----------------------------------------------------------------//
@@ -180,11 +242,13 @@ class ChannelProps:
   future: Future = field(init=False)
   timeout: int = field(init=False) 
   retries: int = field(init=False)
+  revoked: bool = field(init=False)
   config: InitVar[dict]
 
   def __post_init__(self, config):
     # self.future = SafeFuture(self.name)
     self.future = None
+    self.revoked = False
     self.timeout = config.get("timeout", 0)
     self.retries = config.get("retries", 0)
     
@@ -206,19 +270,48 @@ class ChannelProps:
     self.future = future
     # await self.future.put(future, onComplete)
 
+  # -------------------------------------------------------------- #
+  # perform - DIRECT_IO mode, the io coroutine is awaited in the caller
+  # -- task under a deadline. The caller task is the cancellable handle,
+  # -- so that cancel still ends the pending io with CancelledError
+  # ---------------------------------------------------------------#
+  async def perform(self, aw, timeout):
+    self.future = asyncio.current_task()
+    self.revoked = False
+    try:
+      if timeout == 0:
+        return await aw
+      async with asyncio.timeout(timeout):
+        return await aw
+    except asyncio.CancelledError:
+      if self.revoked:
+        # the io is cancelled, not the caller task
+        self.future.uncancel()
+      raise
+    finally:
+      self.future = None
+
   #-----------------------------------------------------------------#
-  # cancel
+  # cancel - in DIRECT_IO mode the handle is the caller task. Once the
+  # -- io future it waits on is done, the io has completed and the task
+  # -- is only waiting to resume, so a late cancel is a no-op, as it is
+  # -- for a done io task
   #-----------------------------------------------------------------#
   def cancel(self):
-    if self.future:
-      self.future.cancel()
+    if not self.future:
+      return
+    waiter = getattr(self.future, "_fut_waiter", None)
+    if waiter is not None and waiter.done():
+      return
+    self.revoked = True
+    self.future.cancel()
 
   # -------------------------------------------------------------- #
   # cancelled
   # ---------------------------------------------------------------#
   def cancelled(self):
     if self.future:
-      return self.future.cancelled()
+      return self.revoked or self.future.cancelled()
 
   #-----------------------------------------------------------------#
   # engaged
@@ -355,6 +448,8 @@ class ConnWATC:
   #----------------------------------------------------------------//
   async def recvWATC(self, timeout) -> object:
     # timeout time unit is seconds
+    if DIRECT_IO:
+      return await self.rprops.perform(self.conn._read(), timeout)
     future = create_task(self.conn._read())
     self.rprops.addFuture(future, self.name, "reading")
     if timeout == 0:
@@ -410,6 +505,8 @@ class ConnWATC:
   #----------------------------------------------------------------//
   async def sendWATC(self, payload, timeout):
     # timeout time unit is seconds
+    if DIRECT_IO:
+      return await self.wprops.perform(self.conn._write(payload), timeout)
     future = create_task(self.conn._write(payload))
     self.wprops.addFuture(future, self.name, "writing")
     if timeout == 0:
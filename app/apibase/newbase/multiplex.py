@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import pickle
+
+from asyncio import Queue
+from dataclasses import dataclass, field
+from typing import NamedTuple
+
+from .component import pickleMode
+from .connector import create_task, AbcConnector
+
+logger = logging.getLogger('asyncio')
+
+# frame kinds, OPEN is the first DATA frame of a locally opened stream
+DATA = 0
+CREDIT = 1
+CLOSE = 2
+OPEN = 3
+
+# default per stream window, in frames
+WINDOW = 64
+
+# end of stream marker
+CLOSED = object()
+
+#================================================================#
+# Frame - a payload tagged with its stream id. A Connector pickles
+# the frame, a QuConnector passes it by reference
+#===============================================================-#
+class Frame(NamedTuple):
+  sid: int
+  kind: int
+  payload: object = None
+
+  def serialize(self) -> bytes:
+    return pickle.dumps(tuple(self), pickleMode)
+
+#================================================================#
+# MuxStream - 1 logical stream of a MuxTransport. It is a connector,
+# so ConnWATC applies retries, statusCode and timedoutMode per stream
+#===============================================================-#
+@dataclass
+class MuxStream(AbcConnector):
+  sid: int
+  transport: object
+  window: int = WINDOW
+  credit: int = field(init=False)
+  closed: bool = field(init=False, default=False)
+  _announced: bool = field(init=False, default=False)
+  _consumed: int = field(init=False, default=0)
+  _inbox: Queue = field(init=False, default_factory=Queue)
+  _unblocked: asyncio.Event = field(init=False, default_factory=asyncio.Event)
+
+  def __post_init__(self):
+    self.credit = self.window
+
+  @property
+  def id(self):
+    return f"{self.transport.id}.{self.sid}"
+
+  @property
+  def alive(self) -> bool:
+    return not self.closed and self.transport.alive
+
+  #----------------------------------------------------------------//
+  # close - notify the peer, the stream id is released
+  #----------------------------------------------------------------//
+  async def close(self):
+    if self.closed:
+      return
+    self._closed()
+    if self.transport.alive:
+      await self.transport.send(Frame(self.sid, CLOSE))
+
+  #----------------------------------------------------------------//
+  # _read - a consumed frame is credited back in half window steps
+  #----------------------------------------------------------------//
+  async def _read(self):
+    payload = await self._inbox.get()
+    if payload is CLOSED:
+      self._inbox.put_nowait(CLOSED)
+      raise asyncio.IncompleteReadError(b'', None)
+    self._consumed += 1
+    if self._consumed >= self.window // 2:
+      consumed, self._consumed = self._consumed, 0
+      await self.transport.send(Frame(self.sid, CREDIT, consumed))
+    return payload
+
+  #----------------------------------------------------------------//
+  # _write - waits while the peer window is exhausted. The first frame
+  # -- of a local stream is sent as OPEN, so the peer creates it
+  #----------------------------------------------------------------//
+  async def _write(self, payload):
+    while self.credit <= 0:
+      if self.closed:
+        raise ConnectionResetError(f"{self.id} stream is closed")
+      self._unblocked.clear()
+      await self._unblocked.wait()
+    if self.closed:
+      raise ConnectionResetError(f"{self.id} stream is closed")
+    self.credit -= 1
+    kind = DATA if self._announced else OPEN
+    self._announced = True
+    await self.transport.send(Frame(self.sid, kind, payload))
+
+  #----------------------------------------------------------------//
+  # _closed - local or remote closure, wakes any pending io
+  #----------------------------------------------------------------//
+  def _closed(self):
+    self.closed = True
+    self.transport.streams.pop(self.sid, None)
+    self._inbox.put_nowait(CLOSED)
+    self._unblocked.set()
+
+  #----------------------------------------------------------------//
+  # _credit
+  #----------------------------------------------------------------//
+  def _credit(self, count):
+    self.credit += count
+    self._unblocked.set()
+
+#================================================================#
+# MuxTransport - carries many MuxStreams over 1 base connector
+# -- the opening side allocates odd stream ids, the accepting side
+# -- even ids, so both sides can open streams without collision
+#===============================================================-#
+@dataclass
+class MuxTransport:
+  conn: AbcConnector
+  initiator: bool = True
+  window: int = WINDOW
+  streams: dict = field(init=False, default_factory=dict)
+  alive: bool = field(init=False, default=True)
+  _nextSid: int = field(init=False)
+  _accepted: Queue = field(init=False, default_factory=Queue)
+  _wlock: asyncio.Lock = field(init=False, default_factory=asyncio.Lock)
+  _reader: asyncio.Task = field(init=False, default=None)
+
+  def __post_init__(self):
+    self._nextSid = 1 if self.initiator else 2
+
+  @property
+  def id(self):
+    return self.conn.id
+
+  @property
+  def name(self):
+    return f"MuxTransport-{self.id}"
+
+  #----------------------------------------------------------------//
+  # make - the demultiplexing reader is started immediately
+  #----------------------------------------------------------------//
+  @classmethod
+  def make(cls, conn: AbcConnector, initiator=True, window=WINDOW) -> object:
+    transport = cls(conn, initiator, window)
+    transport._reader = create_task(transport._demux())
+    return transport
+
+  #----------------------------------------------------------------//
+  # open - a new local stream
+  #----------------------------------------------------------------//
+  def open(self) -> MuxStream:
+    if not self.alive:
+      raise ConnectionResetError(f"{self.name} is closed")
+    sid = self._nextSid
+    self._nextSid += 2
+    stream = self.streams[sid] = MuxStream(sid, self, self.window)
+    return stream
+
+  #----------------------------------------------------------------//
+  # accept - the next stream opened by the peer, None once closed
+  #----------------------------------------------------------------//
+  async def accept(self) -> MuxStream:
+    return await self._accepted.get()
+
+  #----------------------------------------------------------------//
+  # serve - run acceptor(stream) as a task for each peer stream
+  #----------------------------------------------------------------//
+  async def serve(self, acceptor):
+    while True:
+      stream = await self.accept()
+      if stream is None:
+        return
+      create_task(acceptor(stream))
+
+  #----------------------------------------------------------------//
+  # send - frames are written whole, in order
+  #----------------------------------------------------------------//
+  async def send(self, frame: Frame):
+    async with self._wlock:
+      await self.conn._write(frame)
+
+  #----------------------------------------------------------------//
+  # close
+  #----------------------------------------------------------------//
+  async def close(self):
+    if self._reader:
+      self._reader.cancel()
+    self._shutdown()
+    await self.conn.close()
+
+  #----------------------------------------------------------------//
+  # _accept - a peer stream is created by its OPEN frame, it must have
+  # -- the peer sid parity and must not be open already
+  #----------------------------------------------------------------//
+  def _accept(self, sid):
+    if sid % 2 == self._nextSid % 2 or sid in self.streams:
+      logger.warn(f"{self.name}, dropped an invalid OPEN frame for stream {sid}")
+      return None
+    stream = self.streams[sid] = MuxStream(sid, self, self.window)
+    stream._announced = True
+    self._accepted.put_nowait(stream)
+    return stream
+
+  #----------------------------------------------------------------//
+  # _demux - routes each frame to its stream inbox. The inbox is not
+  # -- bounded, the sender credit window bounds it instead. A DATA
+  # -- frame of an unknown sid is a stream already closed on this
+  # -- side, eg a late reply after a timeout, so it is dropped
+  #----------------------------------------------------------------//
+  async def _demux(self):
+    try:
+      while self.alive:
+        sid, kind, payload = await self.conn._read()
+        stream = self.streams.get(sid)
+        if kind == OPEN:
+          stream = self._accept(sid)
+          if stream:
+            stream._inbox.put_nowait(payload)
+        elif kind == DATA:
+          if not stream:
+            logger.debug(f"{self.name}, dropped a frame of closed stream {sid}")
+            continue
+          stream._inbox.put_nowait(payload)
+        elif not stream:
+          continue
+        elif kind == CREDIT:
+          stream._credit(payload)
+        elif kind == CLOSE:
+          stream._closed()
+    except asyncio.CancelledError:
+      pass
+    except asyncio.IncompleteReadError:
+      logger.info(f"{self.name} connection was closed by peer")
+    except Exception:
+      logger.warn(f"{self.name} demultiplexing errored", exc_info=True)
+    finally:
+      self._shutdown()
+
+  #----------------------------------------------------------------//
+  # _shutdown
+  #----------------------------------------------------------------//
+  def _shutdown(self):
+    if not self.alive:
+      return
+    self.alive = False
+    for stream in list(self.streams.values()):
+      stream._closed()
+    self._accepted.put_nowait(None)
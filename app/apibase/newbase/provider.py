@@ -1,12 +1,17 @@
 import asyncio
 import logging
+import time
 
 from asyncio import Future, Queue
+from collections import deque
+from contextlib import asynccontextmanager
 from datetime import datetime
 from dataclasses import dataclass, field, InitVar
 
 from .component import Article, Note
 from .connector import create_task, AbcConnector, Connector, ConnWATC, QuConnector
+from .multiplex import MuxTransport
+from .shmConnector import ShmConnector, ShmListener
 
 logger = logging.getLogger('asyncio')
 
@@ -55,6 +60,148 @@ class MemCache:
   def remove(self, key) -> object:
     return self._cache.pop(key, None)
 
+#================================================================#
+# ConnPool - keyed pool of open connectors for reuse
+# -- idle connectors are reused most recent first. A connector is
+# -- closed when it fails the health check or exceeds idleTimeout,
+# -- except that minIdle connectors are retained for warm reuse
+#===============================================================-#
+@dataclass
+class ConnPool:
+  key: str
+  opener: object
+  minIdle: int = 0
+  maxSize: int = 8
+  idleTimeout: float = 60.0
+  size: int = field(init=False, default=0)
+  closed: bool = field(init=False, default=False)
+  _idle: deque = field(init=False, default_factory=deque)
+  _waiters: deque = field(init=False, default_factory=deque)
+
+  @property
+  def name(self):
+    return f"ConnPool-{self.key}"
+
+  #----------------------------------------------------------------//
+  # leased
+  #----------------------------------------------------------------//
+  @property
+  def leased(self) -> int:
+    return self.size - len(self._idle)
+
+  #----------------------------------------------------------------//
+  # acquire - reuse an idle connector, else open a new one while
+  # -- the pool is under maxSize, else wait for a release
+  #----------------------------------------------------------------//
+  async def acquire(self) -> AbcConnector:
+    while True:
+      if self.closed:
+        raise Exception(f"{self.name} is closed")
+      conn = self._reuse()
+      if conn:
+        return conn
+      if self.size < self.maxSize:
+        return await self._open()
+      waiter = asyncio.get_event_loop().create_future()
+      self._waiters.append(waiter)
+      try:
+        conn = await waiter
+      except asyncio.CancelledError:
+        # the released connector may already be handed over
+        if waiter.done() and not waiter.cancelled() and waiter.result():
+          self.release(waiter.result())
+        raise
+      if conn:
+        return conn
+
+  #----------------------------------------------------------------//
+  # release - discard if errored or unhealthy, else hand over to a
+  # -- waiter or return to the idle deque
+  #----------------------------------------------------------------//
+  def release(self, conn: AbcConnector, discard=False):
+    if discard or self.closed or not conn.alive:
+      self._discard(conn)
+      return
+    if self._wake(conn):
+      return
+    self._idle.append((conn, time.monotonic()))
+    self.prune()
+
+  #----------------------------------------------------------------//
+  # prune - close the oldest idle connectors that have timed out
+  #----------------------------------------------------------------//
+  def prune(self):
+    now = time.monotonic()
+    while len(self._idle) > self.minIdle:
+      conn, lastUsed = self._idle[0]
+      if now - lastUsed < self.idleTimeout:
+        return
+      self._idle.popleft()
+      self._discard(conn)
+
+  #----------------------------------------------------------------//
+  # warm - open connectors up to minIdle
+  #----------------------------------------------------------------//
+  async def warm(self):
+    while len(self._idle) < self.minIdle and self.size < self.maxSize:
+      conn = await self._open()
+      self._idle.append((conn, time.monotonic()))
+
+  #----------------------------------------------------------------//
+  # close
+  #----------------------------------------------------------------//
+  async def close(self):
+    self.closed = True
+    while self._waiters:
+      self._waiters.popleft().cancel()
+    while self._idle:
+      conn, _ = self._idle.popleft()
+      self.size -= 1
+      await conn.close()
+
+  #----------------------------------------------------------------//
+  # _discard
+  #----------------------------------------------------------------//
+  def _discard(self, conn: AbcConnector):
+    self.size -= 1
+    create_task(conn.close())
+    # a slot is free, so a waiter can open a new connector
+    self._wake(None)
+
+  #----------------------------------------------------------------//
+  # _open
+  #----------------------------------------------------------------//
+  async def _open(self) -> AbcConnector:
+    self.size += 1
+    try:
+      return await self.opener()
+    except Exception:
+      self.size -= 1
+      raise
+
+  #----------------------------------------------------------------//
+  # _reuse
+  #----------------------------------------------------------------//
+  def _reuse(self) -> AbcConnector:
+    now = time.monotonic()
+    while self._idle:
+      conn, lastUsed = self._idle.pop()
+      if now - lastUsed < self.idleTimeout and conn.alive:
+        return conn
+      self._discard(conn)
+    return None
+
+  #----------------------------------------------------------------//
+  # _wake
+  #----------------------------------------------------------------//
+  def _wake(self, conn) -> bool:
+    while self._waiters:
+      waiter = self._waiters.popleft()
+      if not waiter.done():
+        waiter.set_result(conn)
+        return True
+    return False
+
 #================================================================#
 # QuClient
 #===============================================================-#
@@ -185,11 +332,17 @@ class ConnProvider:
   port: int
   qclient: object = field(init=False, default_factory=object)
   connWATC: Note = field(init=False)
+  poolProps: dict = field(init=False)
+  pools: dict = field(init=False, default_factory=dict)
+  muxes: dict = field(init=False, default_factory=dict)
+  _muxLock: asyncio.Lock = field(init=False, default_factory=asyncio.Lock)
   config: InitVar[Note]
   
   def __post_init__(self, config: Note) -> object:
     logger.debug(f"ConnProvider constructing with transportMode : {self.tptMode}")
     self.connWATC = config.connWATC
+    connPool = config.get("connPool")
+    self.poolProps = connPool.body if isinstance(connPool, Note) else dict(connPool or {})
     qconn = QuConnector.open(cid="quChannel")
     qchannel = ConnWATC(qconn, config.connWATC)
     self.qclient = QuClient(qchannel)
@@ -198,9 +351,42 @@ class ConnProvider:
   # close
   #-----------------------------------------------------------------#
   async def close(self):
+    for pool in self.pools.values():
+      await pool.close()
+    self.pools.clear()
+    for transport in self.muxes.values():
+      await transport.close()
+    self.muxes.clear()
     if self.qclient:
       await self.qclient.close()
 
+  #-----------------------------------------------------------------#
+  # pool - the keyed connector pool, created on first use
+  #-----------------------------------------------------------------#
+  def pool(self, key="default") -> ConnPool:
+    if key not in self.pools:
+      opener = lambda: self.new(f"{key}-{datetime.now().strftime('%S%f')}")
+      self.pools[key] = ConnPool(key, opener, **self.poolProps)
+    return self.pools[key]
+
+  #-----------------------------------------------------------------#
+  # lease - pooled ConnWATC for 1 exchange, usage :
+  # -- async with provider.lease() as channel: ...
+  # -- the connector is discarded if the exchange errored, timed out
+  # -- or left an io future pending, else it is returned for reuse
+  #-----------------------------------------------------------------#
+  @asynccontextmanager
+  async def lease(self, key="default") -> ConnWATC:
+    pool = self.pool(key)
+    conn = await pool.acquire()
+    channel = ConnWATC(conn, self.connWATC)
+    discard = True
+    try:
+      yield channel
+      discard = channel.statusCode >= 300 or channel.engaged()
+    finally:
+      pool.release(conn, discard)
+
   #----------------------------------------------------------------//
   # newQuConn
   #----------------------------------------------------------------//
@@ -213,6 +399,18 @@ class ConnProvider:
   async def newSockConn(self, cid: str) -> Connector:
     return await Connector.open(self.hostName, self.port, cid)
 
+  #----------------------------------------------------------------//
+  # newShmConn - same host peer, port identifies the ShmListener
+  #----------------------------------------------------------------//
+  def newShmConn(self, cid: str) -> ShmConnector:
+    return ShmConnector.open(self.port, cid)
+
+  #-----------------------------------------------------------------#
+  # newShmServer
+  #-----------------------------------------------------------------#
+  def newShmServer(self, acceptor_s):
+    return ShmListener(self.port, acceptor_s)
+
   #-----------------------------------------------------------------#
   # newQuServer
   #-----------------------------------------------------------------#
@@ -228,6 +426,8 @@ class ConnProvider:
   async def new(self, cid="0") -> AbcConnector:
     if self.tptMode == "SOCKET":
       conn = await self.newSockConn(cid)
+    elif self.tptMode == "SHM":
+      conn = self.newShmConn(cid)
     else:
       conn = await self.qclient.open(cid)
     if not conn:
@@ -240,5 +440,17 @@ class ConnProvider:
   async def newWATC(self, config: Note, cid="0") -> ConnWATC:
     if not isinstance(config, Note) or not config.hasAttr("connWATC"):
       raise Exception("ConnWATC config requires a Note including connWATC attribute")
-    baseConn = self.new(cid)
+    baseConn = await self.new(cid)
     return ConnWATC(baseConn, config.connWATC)
+
+  #----------------------------------------------------------------//
+  # newMuxWATC - a ConnWATC over a new logical stream of the keyed
+  # -- multiplexed transport, which is opened on first use
+  #----------------------------------------------------------------//
+  async def newMuxWATC(self, key="default") -> ConnWATC:
+    async with self._muxLock:
+      transport = self.muxes.get(key)
+      if not transport or not transport.alive:
+        conn = await self.new(f"mux-{key}")
+        transport = self.muxes[key] = MuxTransport.make(conn)
+    return ConnWATC(transport.open(), self.connWATC)
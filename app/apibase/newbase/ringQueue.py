@@ -0,0 +1,155 @@
+import asyncio
+
+from asyncio import QueueEmpty, QueueFull
+from collections import deque
+
+#================================================================#
+# RingQueue - bounded asyncio.Queue variant on a ring buffer
+# -- items are moved in slices by put_many / get_many, and waiters
+# -- are woken once per batch, not once per item. A full ring applies
+# -- backpressure to the producer
+#===============================================================-#
+class RingQueue:
+  def __init__(self, capacity=4096):
+    size = 1 << max(capacity - 1, 1).bit_length()
+    self.capacity = capacity
+    self._ring = [None] * size
+    self._mask = size - 1
+    self._head = 0
+    self._tail = 0
+    self._getters = deque()
+    self._putters = deque()
+
+  def empty(self) -> bool:
+    return self._head == self._tail
+
+  def full(self) -> bool:
+    return self._tail - self._head >= self.capacity
+
+  def qsize(self) -> int:
+    return self._tail - self._head
+
+  # asyncio.Queue compatibility, RingQueue does not track unfinished tasks
+  def task_done(self):
+    pass
+
+  #----------------------------------------------------------------//
+  # clear - discard all items, for connector close
+  #----------------------------------------------------------------//
+  def clear(self):
+    self._ring = [None] * len(self._ring)
+    self._head = self._tail = 0
+    self._wakeup(self._putters, len(self._putters))
+
+  #----------------------------------------------------------------//
+  # put_nowait
+  #----------------------------------------------------------------//
+  def put_nowait(self, item):
+    if self.full():
+      raise QueueFull
+    self._ring[self._tail & self._mask] = item
+    self._tail += 1
+    self._wakeup(self._getters)
+
+  #----------------------------------------------------------------//
+  # get_nowait
+  #----------------------------------------------------------------//
+  def get_nowait(self) -> object:
+    if self.empty():
+      raise QueueEmpty
+    index = self._head & self._mask
+    item = self._ring[index]
+    self._ring[index] = None
+    self._head += 1
+    self._wakeup(self._putters)
+    return item
+
+  #----------------------------------------------------------------//
+  # put
+  #----------------------------------------------------------------//
+  async def put(self, item):
+    while self.full():
+      await self._wait(self._putters)
+    self.put_nowait(item)
+
+  #----------------------------------------------------------------//
+  # get
+  #----------------------------------------------------------------//
+  async def get(self) -> object:
+    while self.empty():
+      await self._wait(self._getters)
+    return self.get_nowait()
+
+  #----------------------------------------------------------------//
+  # put_many - writes as many items as fit, then waits for space
+  #----------------------------------------------------------------//
+  async def put_many(self, items):
+    items = list(items)
+    offset, total = 0, len(items)
+    while offset < total:
+      while self.full():
+        await self._wait(self._putters)
+      count = min(self.capacity - self.qsize(), total - offset)
+      self._copyIn(items, offset, count)
+      offset += count
+      self._wakeup(self._getters, count)
+
+  #----------------------------------------------------------------//
+  # get_many - up to maxItems available items, does not wait
+  #----------------------------------------------------------------//
+  def get_many(self, maxItems) -> list:
+    count = min(self.qsize(), maxItems)
+    if count <= 0:
+      return []
+    items = self._copyOut(count)
+    self._wakeup(self._putters, count)
+    return items
+
+  #----------------------------------------------------------------//
+  # _copyIn - slice assignment, in 2 parts if the write wraps around
+  #----------------------------------------------------------------//
+  def _copyIn(self, items, offset, count):
+    start = self._tail & self._mask
+    first = min(count, len(self._ring) - start)
+    self._ring[start:start+first] = items[offset:offset+first]
+    if first < count:
+      self._ring[0:count-first] = items[offset+first:offset+count]
+    self._tail += count
+
+  #----------------------------------------------------------------//
+  # _copyOut
+  #----------------------------------------------------------------//
+  def _copyOut(self, count) -> list:
+    start = self._head & self._mask
+    first = min(count, len(self._ring) - start)
+    items = self._ring[start:start+first]
+    self._ring[start:start+first] = [None] * first
+    if first < count:
+      items += self._ring[0:count-first]
+      self._ring[0:count-first] = [None] * (count - first)
+    self._head += count
+    return items
+
+  #----------------------------------------------------------------//
+  # _wait
+  #----------------------------------------------------------------//
+  async def _wait(self, waiters):
+    waiter = asyncio.get_event_loop().create_future()
+    waiters.append(waiter)
+    try:
+      await waiter
+    except asyncio.CancelledError:
+      if waiter.done() and not waiter.cancelled():
+        # pass the wakeup on to the next waiter
+        self._wakeup(waiters)
+      raise
+
+  #----------------------------------------------------------------//
+  # _wakeup
+  #----------------------------------------------------------------//
+  def _wakeup(self, waiters, count=1):
+    while waiters and count > 0:
+      waiter = waiters.popleft()
+      if not waiter.done():
+        waiter.set_result(None)
+        count -= 1
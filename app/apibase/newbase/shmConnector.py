@@ -0,0 +1,450 @@
+import asyncio
+import itertools
+import logging
+import os
+import pickle
+import re
+import stat
+import struct
+import sys
+import tempfile
+
+from dataclasses import dataclass, field
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+from .component import Article, pickleMode
+from .connector import AbcConnector
+
+logger = logging.getLogger('asyncio')
+
+# ring header, head and tail indices are on separate cache lines
+HEAD = 0
+TAIL = 64
+HEADER_SIZE = 128
+INDEX = struct.Struct('<Q')
+
+# frame header : length, kind
+FRAME = struct.Struct('<II')
+ARTICLE = 1
+RAW = 2
+PAD = 3
+
+RING_SIZE = 1 << 24
+
+# ring names are unique per process, the pid makes them unique per host
+ringSeq = itertools.count(1)
+RING_NAME = re.compile(r"apipeer-\d+-\d+")
+
+# fifos are created in a runtime directory private to the user, so a
+# peer can only attach rings and notify listeners of the same user
+RUNTIME_DIR = os.environ.get("APIPEER_RUNTIME") or f"{tempfile.gettempdir()}/apipeer-{os.getuid()}"
+
+#-----------------------------------------------------------------#
+# align8
+#-----------------------------------------------------------------#
+def align8(size: int) -> int:
+  return (size + 7) & ~7
+
+#-----------------------------------------------------------------#
+# checkPrivate - the file must be of the kind, owned by this user
+# -- and not accessible by group or others
+#-----------------------------------------------------------------#
+def checkPrivate(path: str, fstat: os.stat_result, isKind):
+  if not isKind(fstat.st_mode) or fstat.st_uid != os.getuid() or fstat.st_mode & 0o077:
+    raise PermissionError(f"{path} is not private to this user")
+
+#-----------------------------------------------------------------#
+# runtimeDir
+#-----------------------------------------------------------------#
+def runtimeDir() -> str:
+  os.makedirs(RUNTIME_DIR, mode=0o700, exist_ok=True)
+  checkPrivate(RUNTIME_DIR, os.lstat(RUNTIME_DIR), stat.S_ISDIR)
+  return RUNTIME_DIR
+
+#-----------------------------------------------------------------#
+# fifoPath - wakeup fifos are named after the shared memory segment
+#-----------------------------------------------------------------#
+def fifoPath(name: str, suffix: str) -> str:
+  return f"{runtimeDir()}/{name}.{suffix}"
+
+#-----------------------------------------------------------------#
+# openFifo - a symlink is refused, and the opened file is checked
+#-----------------------------------------------------------------#
+def openFifo(path: str, flags: int) -> int:
+  fd = os.open(path, flags | os.O_NONBLOCK | os.O_NOFOLLOW)
+  try:
+    checkPrivate(path, os.fstat(fd), stat.S_ISFIFO)
+  except PermissionError:
+    os.close(fd)
+    raise
+  return fd
+
+#================================================================#
+# Wakeup - a named fifo, opened read-write and non blocking so that
+# neither side blocks on open or sees EOF when the peer closes. The
+# owner creates the fifo, the peer attaches an existing one
+#===============================================================-#
+@dataclass
+class Wakeup:
+  path: str
+  owner: bool = True
+  fd: int = field(init=False)
+
+  def __post_init__(self):
+    if self.owner:
+      if os.path.lexists(self.path):
+        # the runtime directory is private, so this is a stale fifo
+        logger.warn(f"{self.path} already exists, it is replaced")
+        os.unlink(self.path)
+      os.mkfifo(self.path, 0o600)
+    self.fd = openFifo(self.path, os.O_RDWR)
+
+  #----------------------------------------------------------------//
+  # signal - a full pipe means a wakeup is pending anyway
+  #----------------------------------------------------------------//
+  def signal(self):
+    try:
+      os.write(self.fd, b'\0')
+    except BlockingIOError:
+      pass
+
+  #----------------------------------------------------------------//
+  # wait
+  #----------------------------------------------------------------//
+  async def wait(self):
+    loop = asyncio.get_event_loop()
+    future = loop.create_future()
+    loop.add_reader(self.fd, future.set_result, None)
+    try:
+      await future
+    finally:
+      loop.remove_reader(self.fd)
+    self.drain()
+
+  def drain(self):
+    try:
+      while os.read(self.fd, 4096):
+        pass
+    except BlockingIOError:
+      pass
+
+  def close(self, unlink=False):
+    os.close(self.fd)
+    if unlink and os.path.exists(self.path):
+      os.unlink(self.path)
+
+#================================================================#
+# ShmRing - single producer, single consumer ring of byte frames
+# -- in a shared memory segment. A frame never wraps, the tail end
+# -- of the ring is padded instead
+#===============================================================-#
+@dataclass
+class ShmRing:
+  name: str
+  owner: bool
+  capacity: int = RING_SIZE
+  shm: SharedMemory = field(init=False)
+  dataReady: Wakeup = field(init=False)
+  spaceReady: Wakeup = field(init=False)
+  _pending: int = field(init=False, default=0)
+
+  #----------------------------------------------------------------//
+  # the attaching side opens the private fifos first, they prove the
+  # -- segment was created by the same user
+  #----------------------------------------------------------------//
+  def __post_init__(self):
+    dataPath, spacePath = fifoPath(self.name, 'data'), fifoPath(self.name, 'space')
+    if self.owner:
+      self.capacity = align8(self.capacity)
+      self.shm = SharedMemory(self.name, create=True, size=HEADER_SIZE + self.capacity)
+      self.shm.buf[:HEADER_SIZE] = bytes(HEADER_SIZE)
+    try:
+      self.dataReady = Wakeup(dataPath, self.owner)
+      try:
+        self.spaceReady = Wakeup(spacePath, self.owner)
+      except Exception:
+        self.dataReady.close(self.owner)
+        raise
+    except Exception:
+      if self.owner:
+        self.shm.close()
+        self.shm.unlink()
+      raise
+    if not self.owner:
+      try:
+        self.shm = attachShm(self.name)
+      except Exception:
+        self.dataReady.close()
+        self.spaceReady.close()
+        raise
+      self.capacity = self.shm.size - HEADER_SIZE
+
+  @property
+  def buf(self) -> memoryview:
+    return self.shm.buf
+
+  def _load(self, offset) -> int:
+    return INDEX.unpack_from(self.buf, offset)[0]
+
+  def _store(self, offset, index):
+    INDEX.pack_into(self.buf, offset, index)
+
+  #----------------------------------------------------------------//
+  # put - 1 copy into shared memory, waits while the ring is full
+  #----------------------------------------------------------------//
+  async def put(self, kind: int, data):
+    size = len(data) if not isinstance(data, memoryview) else data.nbytes
+    frameSize = align8(FRAME.size + size)
+    if frameSize > self.capacity // 2:
+      raise ValueError(f"{self.name}, frame size {size} exceeds the ring capacity")
+    while True:
+      tail = self._load(TAIL)
+      position = tail % self.capacity
+      padding = self.capacity - position
+      if padding >= frameSize:
+        padding = 0
+      if self.capacity - (tail - self._load(HEAD)) >= padding + frameSize:
+        break
+      await self.spaceReady.wait()
+    offset = HEADER_SIZE + position
+    if padding:
+      FRAME.pack_into(self.buf, offset, padding - FRAME.size, PAD)
+      offset = HEADER_SIZE
+    FRAME.pack_into(self.buf, offset, size, kind)
+    start = offset + FRAME.size
+    self.buf[start:start+size] = data if not isinstance(data, memoryview) else data.cast('B')
+    self._store(TAIL, tail + padding + frameSize)
+    self.dataReady.signal()
+
+  #----------------------------------------------------------------//
+  # get - returns (kind, memoryview) of the next frame. The view is
+  # -- into shared memory, and is valid until the next get
+  #----------------------------------------------------------------//
+  async def get(self) -> tuple:
+    self.release()
+    while True:
+      head = self._load(HEAD)
+      if head == self._load(TAIL):
+        await self.dataReady.wait()
+        continue
+      offset = HEADER_SIZE + head % self.capacity
+      size, kind = FRAME.unpack_from(self.buf, offset)
+      if kind == PAD:
+        self._store(HEAD, head + FRAME.size + size)
+        continue
+      self._pending = align8(FRAME.size + size)
+      start = offset + FRAME.size
+      return kind, self.buf[start:start+size]
+
+  #----------------------------------------------------------------//
+  # release - frees the space of the last frame
+  #----------------------------------------------------------------//
+  def release(self):
+    if self._pending:
+      self._store(HEAD, self._load(HEAD) + self._pending)
+      self._pending = 0
+      self.spaceReady.signal()
+
+  #----------------------------------------------------------------//
+  # close - the owner removes the segment and fifos
+  #----------------------------------------------------------------//
+  def close(self):
+    self.dataReady.close(self.owner)
+    self.spaceReady.close(self.owner)
+    try:
+      self.shm.close()
+    except BufferError:
+      logger.warn(f"{self.name}, a frame view is still referenced at close")
+    if self.owner:
+      self.shm.unlink()
+
+#-----------------------------------------------------------------#
+# attachShm - the creator owns the segment, so the attaching process
+# must not let its resource tracker unlink it at exit
+#-----------------------------------------------------------------#
+def attachShm(name: str) -> SharedMemory:
+  if sys.version_info >= (3, 13):
+    return SharedMemory(name, track=False)
+  shm = SharedMemory(name)
+  resource_tracker.unregister(shm._name, "shared_memory")
+  return shm
+
+#================================================================#
+# ShmConnector - same host transport over a pair of shared memory
+# rings. An Article is pickled into the ring, a bytes-like payload is
+# written raw and read back as a zero copy memoryview, which is valid
+# until the next _read
+#===============================================================-#
+@dataclass
+class ShmConnector(AbcConnector):
+  id: str
+  _reader: ShmRing
+  _writer: ShmRing
+  closed: bool = field(init=False, default=False)
+
+  @property
+  def alive(self) -> bool:
+    return not self.closed
+
+  #----------------------------------------------------------------//
+  # create - the opening side owns both rings. The ring name is not
+  # -- derived from cid, which is not unique across connectors
+  #----------------------------------------------------------------//
+  @classmethod
+  def create(cls, cid: str, capacity=RING_SIZE) -> object:
+    ringName = f"apipeer-{os.getpid()}-{next(ringSeq)}"
+    if cid == "0":
+      cid = ringName
+    writer = ShmRing(f"{ringName}-a", True, capacity)
+    try:
+      reader = ShmRing(f"{ringName}-b", True, capacity)
+    except Exception:
+      writer.close()
+      raise
+    return cls(cid, reader, writer)
+
+  #----------------------------------------------------------------//
+  # attach - the accepting side, rings are reversed
+  #----------------------------------------------------------------//
+  @classmethod
+  def attach(cls, ringName: str) -> object:
+    if not RING_NAME.fullmatch(ringName):
+      raise ValueError(f"{ringName} is not a ShmConnector ring name")
+    reader = ShmRing(f"{ringName}-a", False)
+    try:
+      writer = ShmRing(f"{ringName}-b", False)
+    except Exception:
+      reader.close()
+      raise
+    return cls(ringName, reader, writer)
+
+  @property
+  def ringName(self) -> str:
+    return self._reader.name[:-2]
+
+  #----------------------------------------------------------------//
+  # open - create the rings, then notify the ShmListener on port
+  #----------------------------------------------------------------//
+  @classmethod
+  def open(cls, port: int, cid: str, capacity=RING_SIZE) -> object:
+    conn = cls.create(cid, capacity)
+    try:
+      ShmListener.notify(port, conn.ringName)
+    except OSError:
+      conn._close()
+      logger.error(f"no ShmListener is serving on port {port}", exc_info=True)
+      raise
+    return conn
+
+  #----------------------------------------------------------------//
+  # close
+  #----------------------------------------------------------------//
+  async def close(self):
+    self._close()
+
+  def _close(self):
+    if self.closed:
+      return
+    self.closed = True
+    self._reader.close()
+    self._writer.close()
+
+  #----------------------------------------------------------------//
+  # _read
+  #----------------------------------------------------------------//
+  async def _read(self) -> object:
+    kind, view = await self._reader.get()
+    if kind == RAW:
+      return view
+    packet = pickle.loads(view)
+    view.release()
+    self._reader.release()
+    if isinstance(packet, dict):
+      return Article(packet)
+    return packet
+
+  #----------------------------------------------------------------//
+  # _write
+  #----------------------------------------------------------------//
+  async def _write(self, payload):
+    if isinstance(payload, (bytes, bytearray, memoryview)):
+      await self._writer.put(RAW, payload)
+      return
+    await self._writer.put(ARTICLE, pickle.dumps(payload, pickleMode))
+
+#================================================================#
+# ShmListener - rendezvous for ShmConnector.open, a named fifo per
+# port that the opening side writes its connector id to
+#===============================================================-#
+@dataclass
+class ShmListener:
+  port: int
+  acceptor: object
+  wakeup: Wakeup = field(init=False)
+  status: str = field(init=False, default="INIT")
+
+  def __post_init__(self):
+    self.wakeup = Wakeup(fifoPath(f"apipeer-{self.port}", "shm"))
+
+  @property
+  def name(self):
+    return f"ShmListener-{self.port}"
+
+  #----------------------------------------------------------------//
+  # notify
+  #----------------------------------------------------------------//
+  @staticmethod
+  def notify(port: int, ringName: str):
+    fd = openFifo(fifoPath(f"apipeer-{port}", "shm"), os.O_WRONLY)
+    try:
+      os.write(fd, f"{ringName}\n".encode())
+    finally:
+      os.close(fd)
+
+  #----------------------------------------------------------------//
+  # serve_forever - attach each notified connector for the acceptor.
+  # -- Like QuServer, the acceptor is called with (reader, writer).
+  # -- A failed attach or acceptor call drops that connector only
+  #----------------------------------------------------------------//
+  async def serve_forever(self):
+    self.status = "RUNNING"
+    loop = asyncio.get_event_loop()
+    buffer = b''
+    while self.status == "RUNNING":
+      future = loop.create_future()
+      loop.add_reader(self.wakeup.fd, future.set_result, None)
+      try:
+        await future
+      finally:
+        loop.remove_reader(self.wakeup.fd)
+      try:
+        buffer += os.read(self.wakeup.fd, 4096)
+      except BlockingIOError:
+        continue
+      *ringNames, buffer = buffer.split(b'\n')
+      if len(buffer) > 4096:
+        logger.warn(f"{self.name} dropped an unterminated ring name")
+        buffer = b''
+      for ringName in ringNames:
+        ringName = ringName.decode(errors="replace")
+        logger.debug(f"{self.name} is attaching connector {ringName}")
+        try:
+          conn = ShmConnector.attach(ringName)
+        except Exception:
+          logger.error(f"{self.name} failed to attach connector {ringName}", exc_info=True)
+          continue
+        try:
+          self.acceptor(conn._reader, conn._writer)
+        except Exception:
+          logger.error(f"{self.name} acceptor failed for connector {ringName}", exc_info=True)
+          conn._close()
+
+  #----------------------------------------------------------------//
+  # shutdown - the serve_forever task is cancelled by the caller
+  #----------------------------------------------------------------//
+  async def shutdown(self):
+    logger.debug(f"{self.name} is shutting down ...")
+    self.status = "CLOSED"
+    asyncio.get_event_loop().remove_reader(self.wakeup.fd)
+    self.wakeup.close(unlink=True)
@@ -9,6 +9,21 @@ from .protocol import Protocol
 
 logger = None
 
+#-----------------------------------------------------------------#
+# requires - precompiled required field check. Plain keys are tested
+# against the article __dict__ in 1 set operation, dotted keys fall
+# back to Note.hasAttr
+#-----------------------------------------------------------------#
+def requires(*keys):
+  plain = frozenset(key for key in keys if "." not in key)
+  dotted = tuple(key for key in keys if "." in key)
+  def check(note: Note) -> bool:
+    if not plain <= note.__dict__.keys():
+      return False
+    return not dotted or note.hasAttr(*dotted)
+  check.required = keys
+  return check
+
 #=================================================================#
 # Contract - Generic data mining contract routine
 #=================================================================#
@@ -22,6 +37,9 @@ class Contract(Protocol):
   statusCode: int = field(init=False)
   stopping: bool = field(init=False)
   turns: int = field(init=False, default_factory=int)
+  # pipelined handshake, the peer does not wait for the handshake ack
+  pipelined: bool = field(init=False, default=False)
+  pipedArticle: Article = field(init=False, default=None)
   logRef: InitVar[str]
   
   def __post_init__(self, logRef: str):
@@ -91,9 +109,9 @@ class Contract(Protocol):
     self.stopping = True
     if self.disconnected:
       pass
-    elif article and article.hasAttr("statusCode") and article.statusCode >= 300:
+    elif article and article.get("statusCode", 0) >= 300:
       logger.info(f"{self.id} session peer has errored, closing ...")
-    elif article and article.hasAttr("complete") and article.complete:
+    elif article and article.get("complete"):
       logger.info(f"{self.id} session is now complete, closing ...")
     else:
       # logger.debug(f"Article parsed ok. {self.id} is still engaged ...")
@@ -155,6 +173,44 @@ class Contract(Protocol):
   def quickening(self):
     return False
 
+  #-----------------------------------------------------------------#
+  # receive -- an article piped with the handshake is consumed first
+  #-----------------------------------------------------------------#
+  async def receive(self) -> Article:
+    if self.pipedArticle:
+      article, self.pipedArticle = self.pipedArticle, None
+      return article
+    return await super().receive()
+
+  #-----------------------------------------------------------------#
+  # run
+  # -- a daemon contract in steady RUNNING state skips the per turn
+  # -- state transition, engaged evaluates the exit reason after
+  #-----------------------------------------------------------------#
+  async def run(self):
+    while self.engaged:
+      if self.status == "RUNNING" and self.isDaemon:
+        await self.runSteady()
+      else:
+        await self.perform()
+
+  #-----------------------------------------------------------------#
+  # runSteady -- perform for RUNNING state, in a tight loop
+  #-----------------------------------------------------------------#
+  async def runSteady(self):
+    running = self.method["RUNNING"]
+    while not self.stopping and self.turns != 0 and self.statusCode < 300:
+      if self.quickening():
+        article = running(None)
+        if not article:
+          continue
+      else:
+        article = await self.receive()
+        if self.disengaged(article):
+          return
+      running(article)
+      self.turns -= 1
+
   #-----------------------------------------------------------------#
   # _running
   # -- handshaking with the remote MiningDealer
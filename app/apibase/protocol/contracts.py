@@ -5,10 +5,15 @@ from asyncio import Task
 from dataclasses import dataclass, field, InitVar
 from scraperski.component import Article, AbcConnector, ConnWATC, Note
 from scraperski.utils import create_task
-from .contract import Contract
+from .contract import Contract, requires
 
 logger = None
 
+brokerConfig = requires("brokerPolicy","broker_connWATC","maxTurns")
+dealerConfig = requires("dealer_connWATC","dealerPolicy","maxTurns")
+handshake = requires("peerKey","scope","sessionId")
+handshakeAck = requires("peerKey","value")
+
 #=================================================================#
 # ContractA - Data mining contract routine for peer A
 #=================================================================#
@@ -20,11 +25,11 @@ class ContractA(Contract):
     super().__post_init__(logRef)
     global logger
     logger = logging.getLogger(logRef)
-    required = ("brokerPolicy","broker_connWATC","maxTurns")
-    if not self.config.hasAttr(*required):
-      errmsg = f"One or more required config params are missing\nRequired : {required}"
+    if not brokerConfig(self.config):
+      errmsg = f"One or more required config params are missing\nRequired : {brokerConfig.required}"
       raise Exception(errmsg)
     self.policy = self.config.annote("brokerPolicy")
+    self.pipelined = bool(self.policy.get("pipelined"))
     self.turns = self.config.maxTurns
 
   #-----------------------------------------------------------------#
@@ -74,18 +79,21 @@ class ContractA(Contract):
   # -- implements handshaking protocol A1
   #-----------------------------------------------------------------#
   def _starting(self, article: Article):
-    required = ("peerKey","scope","sessionId")
     errmsg = "{} remote host handshake failed\nReason : {}"
-    if article.hasAttr(*required):
-      peerKey, scope, sessionId = article.tell(*required)
+    if handshake(article):
+      peerKey, scope, sessionId = article.tell(*handshake.required)
       if article.scope == "handshake":
         self.sessionId = sessionId
         logger.debug(f"{self.id} sessionId {sessionId} retrieval from {peerKey} succeeded")
       else:
         reason = f"Unexpected scope parameter: {scope}"
         raise Exception(errmsg.format(self.id, reason))
+      # the first payload may be piped with the handshake
+      payload = article.get("payload")
+      if payload is not None:
+        self.pipedArticle = Article(payload) if isinstance(payload, dict) else payload
     else:
-      reason = f"One or more required params are missing. Required : {required}"
+      reason = f"One or more required params are missing. Required : {handshake.required}"
       raise Exception(errmsg.format(self.id, reason))
 
 #=================================================================#
@@ -99,11 +107,13 @@ class ContractB(Contract):
     super().__post_init__(logRef)
     global logger
     logger = logging.getLogger(logRef)
-    required = ("dealer_connWATC","dealerPolicy","maxTurns")
-    if not self.config.hasAttr(*required):
-      errmsg = f"One or more required config params are missing\nRequired : {required}"
+    if not dealerConfig(self.config):
+      errmsg = f"One or more required config params are missing\nRequired : {dealerConfig.required}"
       raise Exception(errmsg)
     self.policy = self.config.annote("dealerPolicy")
+    self.pipelined = bool(self.policy.get("pipelined"))
+    self.awaitingAck = False
+    self.firstPayload = None
     self.turns = self.config.maxTurns
 
   #-----------------------------------------------------------------#
@@ -124,9 +134,10 @@ class ContractB(Contract):
   #----------------------------------------------------------------//
   # start
   #----------------------------------------------------------------//
-  def start(self, baseConn: AbcConnector, sessionId: str) -> Task:
+  def start(self, baseConn: AbcConnector, sessionId: str, firstPayload=None) -> Task:
     logger.debug(f"{self.id} is starting a new session : {sessionId} ...")
     self.sessionId = sessionId
+    self.firstPayload = firstPayload
     baseConn.id = self.id
     config = self.config.annote("dealer_connWATC")
     self.conn = ConnWATC(baseConn, config)
@@ -139,16 +150,15 @@ class ContractB(Contract):
   # _started
   #-----------------------------------------------------------------#
   def _started(self, article: Article):
-    required = ("peerKey","value")
     errmsg = "{} remote host handshake failed\nReason : {}"
-    if article.hasAttr(*required):
-      peerKey, result = article.tell(*required)
+    if handshakeAck(article):
+      peerKey, result = article.tell(*handshakeAck.required)
       if result != "ok":
         reason = "Remote host handshake result is not ok"
         raise Exception(errmsg.format(self.id, reason))
       logger.debug(f"{self.id} sessionId handshake succeeded with {peerKey}")
     else:
-      reason = f"One or more required params are missing\nRequired : {required}"
+      reason = f"One or more required params are missing\nRequired : {handshakeAck.required}"
       raise Exception(errmsg.format(self.id, reason))
 
   #-----------------------------------------------------------------#
@@ -156,9 +166,34 @@ class ContractB(Contract):
   # -- implements handshaking protocol A1
   #-----------------------------------------------------------------#
   def _starting(self, article: Article):
-    article = Article({
+    packet = {
       "sessionId": self.sessionId,
       "peerKey": self.id,
-      "scope": "handshake"})
+      "scope": "handshake"}
+    if self.firstPayload is not None:
+      packet["payload"] = self.firstPayload
     logger.debug(f"{self.id} is sending the sessionId {self.sessionId} as handshake token")
-    self.send(article)
+    self.send(Article(packet))
+
+  #-----------------------------------------------------------------#
+  # receive
+  # -- in pipelined mode, the handshake ack is verified on arrival
+  #-----------------------------------------------------------------#
+  async def receive(self) -> Article:
+    article = await super().receive()
+    if self.awaitingAck and article.get("scope") == "handshake":
+      self.awaitingAck = False
+      self._started(article)
+      article = await super().receive()
+    return article
+
+  #-----------------------------------------------------------------#
+  # stateTransition
+  # -- in pipelined mode, RUNNING follows the handshake send without
+  # -- waiting for the ack round trip
+  #-----------------------------------------------------------------#
+  def stateTransition(self):
+    super().stateTransition()
+    if self.pipelined and self.status == "STARTED":
+      self.awaitingAck = True
+      self.status = "RUNNING"
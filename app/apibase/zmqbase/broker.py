@@ -4,7 +4,7 @@ __all__ = ['ZmqDatasource']
 #
 # Copyright (c) 2019 Peter A McGill
 #
-from apibase import Article, AbstractDatasource
+from apibase import Article, AbstractDatasource, Metrics
 from threading import Event 
 import asyncio
 import logging
@@ -65,6 +65,9 @@ class ZmqDatasource(AbstractDatasource):
 # ZmqMessageBroker
 #----------------------------------------------------------------#		
 class ZmqMessageBroker(ZmqDatasource):
+  messages = Metrics.meter('apipeer_broker_messages_total',
+                'broker messages relayed', ('broker','direction'), 'apipeer_broker_bytes_total')
+
   def __init__(self, brokerId, sockets, requestAddr, responseAddr):
     self.brokerId = brokerId
     self.sockets = sockets
@@ -72,6 +75,8 @@ class ZmqMessageBroker(ZmqDatasource):
     self.responseAddr = responseAddr
     self.active = Event()
     self._future = None
+    self.requests = self.messages.labels(brokerId, 'request')
+    self.responses = self.messages.labels(brokerId, 'response')
 
   #----------------------------------------------------------------#
   # title
@@ -113,6 +118,7 @@ class ZmqMessageBroker(ZmqDatasource):
       frontend, backend = self.sockets
       while self.active.is_set():
         packet = await backend.recv_multipart()
+        self.responses.inc(1, sum(map(len, packet)))
         await frontend.send_multipart(packet)
       logger.info(f'{self.title}, broker backend is complete')
     except zmq.ContextTerminated as ex:
@@ -133,6 +139,7 @@ class ZmqMessageBroker(ZmqDatasource):
       frontend, backend = self.sockets
       while self.active.is_set():
         packet = await frontend.recv_multipart()
+        self.requests.inc(1, sum(map(len, packet)))
         await backend.send_multipart(packet)
       logger.info(f'{self.title}, broker frontend is complete')
     except zmq.ContextTerminated as ex:
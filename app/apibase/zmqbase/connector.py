@@ -6,7 +6,7 @@ __all__ = [
 #
 # Copyright (c) 2018 Peter A McGill
 #
-from apibase import AbstractConnector
+from apibase import AbstractConnector, SAMPLED, jsonDefault
 import logging
 
 logger = logging.getLogger('asyncio.broker')
@@ -81,5 +81,6 @@ class ApiConnector(ZmqConnector):
   async def send(self, packet, sender=None):
     if not sender:
       sender = self.cid
-    logger.info(f'!!! {sender}, {self.cid} is sending a message : {packet}')
-    await self.sock.send_json(packet)
\ No newline at end of file
+    if logger.isEnabledFor(logging.INFO):
+      logger.info('!!! %s, %s is sending a message : %s', sender, self.cid, packet, extra=SAMPLED)
+    await self.sock.send_json(packet, default=jsonDefault)
\ No newline at end of file
@@ -32,28 +32,20 @@ class Application(ApiResource):
     self._resource[key] = value
     
   def delete(self, routeUri, handler):
-    route, paramKey, params = Router.parseUri(routeUri)
-    logger.debug(f'route, paramKey, params : {route}, {paramKey}, {params}')    
     # delete request, endpoint configuration
-    self._router['delete'][route] = (paramKey, params, handler)
+    self._router['delete'].add(routeUri, handler)
 
   def get(self, routeUri, handler):
-    route, paramKey, params = Router.parseUri(routeUri)
-    logger.debug(f'route, paramKey, params : {route}, {paramKey}, {params}')
     # get request, endpoint configuration
-    self._router['get'][route] = (paramKey, params, handler)
+    self._router['get'].add(routeUri, handler)
 
   def post(self, routeUri, handler):
-    route, paramKey, params = Router.parseUri(routeUri)
-    logger.debug(f'route, paramKey, params : {route}, {paramKey}, {params}')
     # post request, endpoint configuration
-    self._router['post'][route] = (paramKey, params, handler)
+    self._router['post'].add(routeUri, handler)
 
   def put(self, routeUri, handler):
-    route, paramKey, params = Router.parseUri(routeUri)
-    logger.debug(f'route, paramKey, params : {route}, {paramKey}, {params}')
     # put request, endpoint configuration
-    self._router['put'][route] = (paramKey, params, handler)
+    self._router['put'].add(routeUri, handler)
 
   @property
   def on_shutdown(self):
@@ -63,12 +55,9 @@ class Application(ApiResource):
     [await shutdown(self) for shutdown in self._shutdown]  
 
 #----------------------------------------------------------------#
-# Router
+# Router - 1 route tree per request method
 #----------------------------------------------------------------#		
 class Router:
-  ROUTE_RE = re.compile(r'(\{[_a-zA-Z][^{}]*(?:\{[^{}]*\}[^{}]*)*\})')
-  METHOD_RE = re.compile(r'\{([_a-zA-Z]+)\}')
-
   def __init__(self):
     self._delete = EndPoint()
     self._get = EndPoint()
@@ -79,102 +68,117 @@ class Router:
     _request = f'_{request}'
     return getattr(self, _request)
 
-  @classmethod
-  def parseUri(cls, routeUri):
-    routeUri = routeUri.strip()
-    assert routeUri.startswith('/')
-    assert not routeUri.endswith('/')
-    if not cls.ROUTE_RE.search(routeUri):
-      logger.info(f'route[P0], {routeUri}')    
-      return routeUri, 'P0', []
-
-    params = []
-    route = '/'
-    for nextItem in cls.ROUTE_RE.split(routeUri):
-      logger.debug(f'parseUri, route uri {routeUri} next item : {nextItem}')
-      if cls.METHOD_RE.search(nextItem):
-        nextItem = cls.METHOD_RE.match(nextItem).group(1)
-        params.append(nextItem)
-      elif nextItem == '/':
+#----------------------------------------------------------------#
+# RouteNode - route tree node, 1 per path segment. A route param is
+# -- declared as {name} or {name:type}, where type is str, int or float.
+# -- A node has at most 1 param child per type, eg /job/{id:int} and
+# -- /job/{name} can coexist, they are tried in CONVERT order
+#----------------------------------------------------------------#		
+class RouteNode:
+  PARAM_RE = re.compile(r'^\{([_a-zA-Z][_a-zA-Z0-9]*)(?::([a-z]+))?\}$')
+  CONVERT = {'int': int, 'float': float, 'str': str}
+  RANK = {typeKey: rank for rank, typeKey in enumerate(CONVERT)}
+
+  def __init__(self):
+    self.static = {}
+    # param children, as [typeKey, paramName, node] in RANK order
+    self.params = []
+    self.route = None
+    self.handler = None
+
+  #----------------------------------------------------------------#
+  # addParam - returns the param child for the type
+  #----------------------------------------------------------------#		
+  def addParam(self, route, segment, paramName, typeKey):
+    for param in self.params:
+      if param[0] != typeKey:
+        continue
+      if param[1] != paramName:
+        raise Exception(f'route {route}, param {segment} conflicts with {param[1]}')
+      return param[2]
+    node = RouteNode()
+    self.params.append([typeKey, paramName, node])
+    self.params.sort(key=lambda param: self.RANK[param[0]])
+    return node
+
+  #----------------------------------------------------------------#
+  # add
+  #----------------------------------------------------------------#		
+  def add(self, segments, route, handler):
+    node = self
+    for segment in segments:
+      matched = self.PARAM_RE.match(segment)
+      if not matched:
+        node = node.static.setdefault(segment, RouteNode())
         continue
-      if not params:
-        # drop the trailing slash
-        route = nextItem[:-1]
-    paramKey = f'P{len(params)}'        
-    logger.info(f'paramatized route[{paramKey}], {route}, {params}')    
-    return route, paramKey, params
+      paramName, typeKey = matched.group(1), matched.group(2) or 'str'
+      if typeKey not in self.CONVERT:
+        raise Exception(f'route {route}, param type {typeKey} is not supported')
+      node = node.addParam(route, segment, paramName, typeKey)
+    if node.handler is not None:
+      logger.warning(f'route {route} is already registered, replacing it')
+    node.route = route
+    node.handler = handler
+
+  #----------------------------------------------------------------#
+  # match - static segments are preferred over params, then each
+  # -- param child is tried until the rest of the uri matches
+  #----------------------------------------------------------------#		
+  def match(self, segments, index, args):
+    if index == len(segments):
+      return self if self.handler is not None else None
+    segment = segments[index]
+    child = self.static.get(segment)
+    if child is not None:
+      node = child.match(segments, index + 1, args)
+      if node is not None:
+        return node
+    for typeKey, paramName, param in self.params:
+      try:
+        args[paramName] = self.CONVERT[typeKey](segment)
+      except ValueError:
+        continue
+      node = param.match(segments, index + 1, args)
+      if node is not None:
+        return node
+      del args[paramName]
+    return None
 
 #----------------------------------------------------------------#
 # EndPoint
 #----------------------------------------------------------------#		
 class EndPoint:
   def __init__(self):
-    self._resource = {}
-
-  def __setitem__(self, route, resourceArgs):
-    paramKey, params, handler = resourceArgs
-    if route not in self._resource:
-      self._resource[route] = RequestResource(route)
-    self._resource[route][paramKey] = (params, handler)
+    self._root = RouteNode()
+
+  @staticmethod
+  def split(uri):
+    uri = uri.strip()
+    assert uri.startswith('/')
+    return uri.strip('/').split('/') if uri != '/' else []
+
+  #----------------------------------------------------------------#
+  # add - each route has its own handler instance
+  #----------------------------------------------------------------#		
+  def add(self, routeUri, handlerClass):
+    routeUri = routeUri.strip()
+    logger.info(f'route {routeUri}, resource handler class : {handlerClass.__name__}')
+    self._root.add(self.split(routeUri), routeUri, handlerClass())
 
   def resolve(self, reqUri, packet):
-    logger.info(f'resolving request uri: {reqUri}')
-    for resource in self._resource.values():
-      matched = resource.matches(reqUri)
-      if matched:
-        break
-    if not matched:
+    args = {}
+    node = self._root.match(self.split(reqUri), 0, args)
+    if node is None:
       raise Exception(f'no registered routes matched the request uri {reqUri}')
-    return resource.make(reqUri, packet)
+    return node.handler, ApiRequest(node.route, args, packet)
 
   async def __call__(self, reqUrl, packet):
     request, reqUri = reqUrl.split(':')
     handler, request = self.resolve(reqUri, packet)
-    logger.info(f'handler request : {request}')
+    if logger.isEnabledFor(logging.DEBUG):
+      logger.debug(f'handler request : {request}')
     await handler[request](request)
 
-#----------------------------------------------------------------#
-# RequestResource
-#----------------------------------------------------------------#		
-class RequestResource:
-  _handler = {}
-  def __init__(self, route):
-    self._route = route
-    self._params = {}
-
-  def __setitem__(self, paramKey, resourceArgs):
-    params, handlerClass = resourceArgs
-    self._params[paramKey] = params
-    logger.info(f'{paramKey} resource handler class : {handlerClass.__name__}')
-    if handlerClass not in self._handler or self._handler[paramKey].__class__ != handlerClass:
-      self._handler[paramKey] = handlerClass()
-
-  def make(self, reqUri, packet):
-    if reqUri == self._route:
-      return self._handler['P0'], ApiRequest(self._route, {}, packet)
-    paramKey, values = self.parse(reqUri)
-    params = self._params[paramKey]
-    args = dict(zip(params, values))
-    return self._handler[paramKey], ApiRequest(self._route, args, packet)
-
-  def parse(self, reqUri):
-    #drop the starting slash, to match the parse convention
-    argsUri = reqUri.replace(self._route,'')[1:]
-    values = argsUri.split('/')
-    paramKey = f'P{len(values)}'
-    return paramKey, values
-
-  def matches(self, reqUri):
-    reqUri = reqUri.strip()
-    if not reqUri.startswith(self._route):
-      return False
-    if reqUri == self._route:
-      logger.debug(f'simple route found : {reqUri}')
-      return True
-    paramKey, values = self.parse(reqUri)
-    logger.debug(f'matches, resolved paramKey for request uri {reqUri} is {paramKey}')
-    return paramKey in self._handler
-
 #----------------------------------------------------------------#
 # ApiRequest
 #----------------------------------------------------------------#		
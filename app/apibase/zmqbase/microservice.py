@@ -47,6 +47,13 @@ class AbstractMicroservice:
   def prepare(cls):
     raise NotImplementedError(f'{cls.__name__}.prepare is an abstract method')
 
+  # -------------------------------------------------------------- #
+  # reset - called when a pooled actor is leased for a new task,
+  # -- override to clear any per-task state
+  # ---------------------------------------------------------------#
+  def reset(self):
+    pass
+
   def __call__(self, jobId, taskNum, *args, **kwargs):
     raise NotImplementedError(f'{self.name}.__call__ is an abstract method')
 
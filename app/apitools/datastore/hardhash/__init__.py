@@ -1,9 +1,10 @@
-from . import (providerHdh, connectorHdh, contextHdh)
+from . import (providerHdh, connectorHdh, contextHdh, serverHdh)
 
 __all__ = []
-for submod in (providerHdh, connectorHdh, contextHdh):
+for submod in (providerHdh, connectorHdh, contextHdh, serverHdh):
     __all__.extend(submod.__all__)
 
 from .providerHdh import *
 from .connectorHdh import *
 from .contextHdh import *
+from .serverHdh import *
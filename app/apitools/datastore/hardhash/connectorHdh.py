@@ -1,6 +1,12 @@
-__all__ = ['LeveldbConnector']
-from apibase import AbstractConnector, ConnectorError, Note, LeveldbHash
+__all__ = ['AsyncLeveldbConnector','LeveldbConnector','WriteBuffer']
+from apibase import AbstractConnector, ConnectorError, Metrics, Note, LeveldbHash
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
 from threading import RLock
+from time import perf_counter
+import asyncio
+import leveldb
 import logging
 import pickle
 
@@ -11,6 +17,19 @@ except AttributeError:
 
 logger = logging.getLogger('asyncio.broker')
 
+# leveldb call latency and payload bytes by operation. The series are
+# -- bound here, so an observation does not look up its labels
+hhSeconds = Metrics.histogram('apipeer_hardhash_seconds',
+              'hardhash leveldb call latency', ('op',), bytesName='apipeer_hardhash_bytes_total')
+hhGet = hhSeconds.labels('get')
+hhPut = hhSeconds.labels('put')
+hhDelete = hhSeconds.labels('delete')
+hhSelect = hhSeconds.labels('select')
+hhBatch = hhSeconds.labels('batch')
+# write-behind puts are timed by the batch write that carries them
+hhQueued = Metrics.meter('apipeer_hardhash_queued_total',
+              'hardhash write-behind puts').labels()
+
 class DatastoreError(Exception):
   pass
 
@@ -24,6 +43,7 @@ class LeveldbConnector(AbstractConnector):
     self._cid = connId
     self._pickleMode = pickleMode
     self._lock = RLock()
+    self._wbuffer = None
 
   @property
   def cid(self):
@@ -59,7 +79,10 @@ class LeveldbConnector(AbstractConnector):
   #----------------------------------------------------------------#		
   def get(self, key):
     try:
-      return pickle.loads(self._leveldb.Get(key.encode()))
+      started = perf_counter()
+      bValue = self._leveldb.Get(key.encode())
+      hhGet.observe(perf_counter() - started, len(bValue))
+      return pickle.loads(bValue)
     except KeyError as ex:
       logger.warn(f'__getitem__ failed, dbkey : {key}')
       raise
@@ -79,7 +102,10 @@ class LeveldbConnector(AbstractConnector):
   #----------------------------------------------------------------#		
   def append(self, key, value):
     try:
-      valueA = pickle.loads(self._leveldb.Get(key.encode()))
+      started = perf_counter()
+      bValue = self._leveldb.Get(key.encode())
+      hhGet.observe(perf_counter() - started, len(bValue))
+      valueA = pickle.loads(bValue)
     except KeyError as ex:
       valueA = []
     valueA.append(value)
@@ -96,6 +122,34 @@ class LeveldbConnector(AbstractConnector):
       logger.error(f'_bytes failed, dbkey : {key}', exc_info=True)
       raise ConnectorError(ex)
 
+  #----------------------------------------------------------------#
+  # batch - while a write buffer is bound, put and bput are deferred
+  # -- until the buffer owner calls WriteBuffer.flush
+  #----------------------------------------------------------------#		
+  def batch(self, wbuffer=None):
+    if not wbuffer:
+      wbuffer = WriteBuffer.make(self._leveldb)
+    self._wbuffer = wbuffer
+    return wbuffer
+
+  #----------------------------------------------------------------#
+  # unbatch
+  #----------------------------------------------------------------#		
+  def unbatch(self):
+    self._wbuffer = None
+
+  #----------------------------------------------------------------#
+  # _put
+  #----------------------------------------------------------------#		
+  def _put(self, bKey, bValue):
+    if self._wbuffer is not None:
+      self._wbuffer.put(bKey, bValue)
+      hhQueued.inc(1, len(bValue))
+    else:
+      started = perf_counter()
+      self._leveldb.Put(bKey, bValue)
+      hhPut.observe(perf_counter() - started, len(bValue))
+
   #----------------------------------------------------------------#
   # bput - if value is already bytes or bytearray
   #----------------------------------------------------------------#		
@@ -104,7 +158,7 @@ class LeveldbConnector(AbstractConnector):
       bValue = value
       if not isinstance(bValue, (bytes, bytearray)):
         bValue = pickle.dumps(value, self._pickleMode)
-      self._leveldb.Put(key.encode(), bValue)
+      self._put(key.encode(), bValue)
     except Exception as ex:
       logger.error(f'put failed, dbkey : {key}', exc_info=True)
       raise ConnectorError(ex)
@@ -116,7 +170,7 @@ class LeveldbConnector(AbstractConnector):
     try:
       with self._lock:
         bValue = pickle.dumps(value, self._pickleMode)
-        self._leveldb.Put(key.encode(), bValue)
+        self._put(key.encode(), bValue)
     except Exception as ex:
       logger.error(f'put failed, dbkey : {key}', exc_info=True)
       raise ConnectorError(ex)
@@ -133,7 +187,307 @@ class LeveldbConnector(AbstractConnector):
       raise ConnectorError(ex)
 
 #----------------------------------------------------------------#
-# ResultSet
+# AsyncLeveldbConnector - awaitable connector for coroutine actors
+# -- all leveldb calls run on a dedicated I/O thread, so the eventloop
+# -- never blocks on storage. Puts are write-behind : every put in the
+# -- same loop tick is coalesced into one WriteBuffer, which is written
+# -- after the tick. A read or a scan first submits the pending batch, 
+# -- and the single I/O thread guarantees it sees the prior puts
+#----------------------------------------------------------------#		
+class AsyncLeveldbConnector(AbstractConnector):
+  SCAN_SIZE = 1000
+
+  def __init__(self, leveldb, connId, pickleMode=DEFAULT_PROTOCOL):
+    self._leveldb = leveldb
+    self._cid = connId
+    self._pickleMode = pickleMode
+    self._conn = LeveldbConnector(leveldb, connId, pickleMode)
+    self._io = ThreadPoolExecutor(1, thread_name_prefix=f'hardhash-{connId}')
+    self._wbuffer = None
+    self._written = None
+    self._error = None
+    self._combiner = {}
+
+  @property
+  def cid(self):
+    return self._cid
+
+  #----------------------------------------------------------------#
+  # make
+  #----------------------------------------------------------------#
+  @classmethod
+  def make(cls, leveldb, connId):
+    return cls(leveldb, connId)
+
+  #----------------------------------------------------------------#
+  # __getitem__ - returns an awaitable
+  #----------------------------------------------------------------#		
+  def __getitem__(self, key):
+    return self.get(key)
+
+  #----------------------------------------------------------------#
+  # __setitem__ - write-behind put
+  #----------------------------------------------------------------#		
+  def __setitem__(self, key, value):
+    self._enqueue(key.encode(), pickle.dumps(value, self._pickleMode))
+
+  #----------------------------------------------------------------#
+  # _submit - run a sync call on the I/O thread, after the pending batch
+  #----------------------------------------------------------------#		
+  def _submit(self, func, *args):
+    self._flush()
+    if self._error:
+      error, self._error = self._error, None
+      raise ConnectorError(error)
+    return asyncio.get_event_loop().run_in_executor(self._io, partial(func, *args))
+
+  #----------------------------------------------------------------#
+  # _enqueue - coalesce puts in this loop tick
+  #----------------------------------------------------------------#		
+  def _enqueue(self, bKey, bValue):
+    if self._wbuffer is None:
+      self._wbuffer = WriteBuffer.make(self._leveldb)
+      asyncio.get_event_loop().call_soon(self._flush)
+    self._wbuffer.put(bKey, bValue)
+    hhQueued.inc(1, len(bValue))
+
+  #----------------------------------------------------------------#
+  # _flush - submit the pending batch to the I/O thread
+  #----------------------------------------------------------------#		
+  def _flush(self):
+    if self._wbuffer is None:
+      return
+    wbuffer, self._wbuffer = self._wbuffer, None
+    self._written = asyncio.get_event_loop().run_in_executor(self._io, wbuffer.flush)
+    self._written.add_done_callback(self._onWritten)
+
+  #----------------------------------------------------------------#
+  # _onWritten - a write-behind error is raised by the next request
+  #----------------------------------------------------------------#		
+  def _onWritten(self, future):
+    if not future.cancelled() and future.exception():
+      self._error = future.exception()
+
+  #----------------------------------------------------------------#
+  # drain - wait until all pending puts are written
+  #----------------------------------------------------------------#		
+  async def drain(self):
+    self._flush()
+    if self._written is not None:
+      await self._written
+    if self._error:
+      error, self._error = self._error, None
+      raise ConnectorError(error)
+
+  #----------------------------------------------------------------#
+  # get
+  #----------------------------------------------------------------#		
+  async def get(self, key):
+    return await self._submit(self._conn.get, key)
+
+  #----------------------------------------------------------------#
+  # delete
+  #----------------------------------------------------------------#		
+  async def delete(self, key):
+    return await self._submit(self._delete, key.encode())
+
+  def _delete(self, bKey):
+    started = perf_counter()
+    self._leveldb.Delete(bKey)
+    hhDelete.observe(perf_counter() - started)
+
+  #----------------------------------------------------------------#
+  # append - read-modify-write, serialized by the I/O thread
+  #----------------------------------------------------------------#		
+  async def append(self, key, value):
+    await self._submit(self._conn.append, key, value)
+
+  #----------------------------------------------------------------#
+  # put
+  #----------------------------------------------------------------#		
+  async def put(self, key, value):
+    try:
+      self._enqueue(key.encode(), pickle.dumps(value, self._pickleMode))
+    except Exception as ex:
+      logger.error(f'put failed, dbkey : {key}', exc_info=True)
+      raise ConnectorError(ex)
+
+  #----------------------------------------------------------------#
+  # bput - if value is already bytes or bytearray
+  #----------------------------------------------------------------#		
+  async def bput(self, key, value):
+    bValue = value
+    if not isinstance(bValue, (bytes, bytearray)):
+      bValue = pickle.dumps(value, self._pickleMode)
+    self._enqueue(key.encode(), bValue)
+
+  #----------------------------------------------------------------#
+  # combine - assemble a record from the segments of several tree
+  # -- nodes, the combined header and record are put when done
+  #----------------------------------------------------------------#		
+  async def combine(self, nodeName, payload):
+    if not nodeName:
+      nodeName, combiner = Combiner.make(self._cput, payload)
+      self._combiner[nodeName] = combiner
+      return
+    combiner = self._combiner[nodeName]
+    modeKey = payload.pop(0)
+    combiner[modeKey](*payload)
+    if combiner.done:
+      self._combiner.pop(combiner.nodeName)
+
+  def _cput(self, key, value):
+    self._enqueue(key.encode(), pickle.dumps(value, self._pickleMode))
+
+  #----------------------------------------------------------------#
+  # select - async iterator, the scan is fetched in SCAN_SIZE chunks
+  #----------------------------------------------------------------#		
+  async def select(self, startKey, endKey, incValue=True):
+    resultSet = await self._submit(self._conn.select, startKey, endKey, incValue)
+    while True:
+      chunk = await self._submit(self._fetch, resultSet)
+      for item in chunk:
+        yield item
+      if len(chunk) < self.SCAN_SIZE:
+        break
+
+  def _fetch(self, resultSet):
+    return list(islice(resultSet, self.SCAN_SIZE))
+
+  #----------------------------------------------------------------#
+  # close
+  #----------------------------------------------------------------#		
+  async def close(self):
+    await self.drain()
+    self._io.shutdown(wait=False)
+
+  #----------------------------------------------------------------#
+  # shutdown - drain and close for a sync caller, eg a context destroy.
+  # -- The I/O thread is joined once it has written every submitted
+  # -- batch, then the batch of this loop tick is written in order
+  #----------------------------------------------------------------#		
+  def shutdown(self):
+    self._io.shutdown(wait=True)
+    if self._wbuffer is not None:
+      wbuffer, self._wbuffer = self._wbuffer, None
+      try:
+        wbuffer.flush()
+      except Exception as ex:
+        self._error = ex
+    if self._error:
+      error, self._error = self._error, None
+      raise ConnectorError(error)
+
+#----------------------------------------------------------------#
+# Combiner
+#----------------------------------------------------------------#		
+class Combiner:
+  def __init__(self, putFunc, payload):
+    self._put = putFunc
+    self._cache = {}
+    self.done = False
+    # payload installs :
+    # nodeName : the dbkey owner
+    # dbkey : the header and record dbkeys for the combined write
+    # order : the segment order of the combined record
+    self.__dict__.update(payload)
+
+  @property
+  def name(self):
+    return f'{self.__class__.__name__}'
+
+  @classmethod
+  def make(cls, putFunc, payload):
+    combiner = cls(putFunc, payload)
+    return (payload['nodeName'], combiner)
+
+  def __getitem__(self, modeKey):
+    try:
+      return getattr(self, f'add_{modeKey}')
+    except AttributeError:
+      raise ConnectorError(f'{self.name}, combiner mode key {modeKey} is invalid')
+
+  #----------------------------------------------------------------#
+  # add_columns
+  #----------------------------------------------------------------#		
+  def add_columns(self, nodeName, columns):
+    if not nodeName:
+      nodeName = self.nodeName
+    self._cache[nodeName] = [columns]
+
+  #----------------------------------------------------------------#
+  # add_record - the owner record is last, so then write and finish
+  #----------------------------------------------------------------#		
+  def add_record(self, nodeName, record):
+    if nodeName:
+      self._cache[nodeName].append(record)
+      return
+    self._cache[self.nodeName].append(record)
+    self._write(0)
+    self._write(1)
+    self.done = True
+
+  #----------------------------------------------------------------#
+  # _write
+  #----------------------------------------------------------------#		
+  def _write(self, index):
+    record = []
+    for key in self.order:
+      record.extend(self._cache[key][index])
+    self._put(self.dbkey[index], record)
+
+#----------------------------------------------------------------#
+# WriteBuffer - leveldb WriteBatch wrapper, shareable by multiple
+# -- connectors bound to the same leveldb instance
+#----------------------------------------------------------------#		
+class WriteBuffer:
+  def __init__(self, db):
+    self._leveldb = db
+    self.reset()
+
+  #----------------------------------------------------------------#
+  # make
+  #----------------------------------------------------------------#
+  @classmethod
+  def make(cls, db):
+    return cls(db)
+
+  #----------------------------------------------------------------#
+  # reset
+  #----------------------------------------------------------------#		
+  def reset(self):
+    self._batch = leveldb.WriteBatch()
+    self.size = 0
+    self.nbytes = 0
+
+  #----------------------------------------------------------------#
+  # put
+  #----------------------------------------------------------------#		
+  def put(self, bKey, bValue):
+    self._batch.Put(bKey, bValue)
+    self.size += 1
+    self.nbytes += len(bValue)
+
+  #----------------------------------------------------------------#
+  # flush - write the pending batch in one leveldb call
+  #----------------------------------------------------------------#		
+  def flush(self):
+    if not self.size:
+      return 0
+    try:
+      started = perf_counter()
+      self._leveldb.Write(self._batch, sync=False)
+      hhBatch.observe(perf_counter() - started, self.nbytes)
+    except Exception as ex:
+      logger.error(f'batch write failed, size : {self.size}', exc_info=True)
+      raise ConnectorError(ex)
+    size = self.size
+    self.reset()
+    return size
+
+#----------------------------------------------------------------#
+# ResultSet - RangeIter is lazy, so a select is timed by its fetches
+# -- when the scan is exhausted or closed, not by the consumer between
 #----------------------------------------------------------------#		
 class ResultSet():
   def __init__(self, dbIter, incValue):
@@ -143,11 +497,19 @@ class ResultSet():
   @classmethod
   def make(cls, dbIter, incValue):
     resultSet = cls(dbIter, incValue)
-    while True:
-      try:
-        yield resultSet.__next()
-      except StopIteration:      
-        break
+    elapsed = 0.0
+    try:
+      while True:
+        started = perf_counter()
+        try:
+          record = resultSet.__next()
+        except StopIteration:
+          break
+        finally:
+          elapsed += perf_counter() - started
+        yield record
+    finally:
+      hhSelect.observe(elapsed)
 
   def __nextVal(self):
     key, value = self.dbIter.__next__()
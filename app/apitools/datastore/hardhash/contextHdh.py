@@ -1,8 +1,9 @@
 __all__ = ['HardhashContext']
 from apibase import AbstractDatasource, AbstractSystemUnit, ConnectorError, Note, TaskError
 from datetime import datetime
-from .connectorHdh import LeveldbConnector
+from .connectorHdh import AsyncLeveldbConnector, LeveldbConnector
 from .providerHdh import HardhashCache
+from .serverHdh import HardhashClient, HardhashServer
 import leveldb
 import logging
 import os, subprocess
@@ -61,9 +62,12 @@ class LeveldbDatasource(AbstractDatasource, AbstractSystemUnit):
 # ---------------------------------------------------------------------------#    
 class HardhashContext(HardhashCache):
   _instance = {}
+  _remote = {}
 
   def __init__(self, contextId, datasource):
     super().__init__(contextId, LeveldbConnector, datasource)
+    self._server = None
+    self._owner = os.getpid()
 
   @classmethod
   def get(cls, contextId='metastore'):
@@ -75,12 +79,59 @@ class HardhashContext(HardhashCache):
 
   @classmethod
   def connector(cls, contextId='metastore', connId='hardhash'):
+    client = cls.remote(contextId, connId)
+    if client:
+      return client
     try:
       context = cls._instance[contextId]
     except KeyError:
       cls._instance[contextId] = context = cls.make(contextId)
     return context._get(connId)
 
+  #----------------------------------------------------------------#
+  # asyncConnector - awaitable connector for coroutine actors
+  #----------------------------------------------------------------#
+  @classmethod
+  def asyncConnector(cls, contextId='metastore', connId='hardhash-async'):
+    context = cls.get(contextId)
+    connector = context.cache.get(connId)
+    if connector:
+      return connector
+    return context.addConn(connId, AsyncLeveldbConnector)
+
+  #----------------------------------------------------------------#
+  # serve - storage server mode, so that client processes can share
+  # -- the job datastore, returns the server address for HardhashClient
+  #----------------------------------------------------------------#
+  @classmethod
+  def serve(cls, contextId, hostAddr=None):
+    context = cls.get(contextId)
+    if not context._server:
+      leveldb = context._datasource.get()
+      context._server = HardhashServer.make(contextId, leveldb, hostAddr)
+      context._server.start()
+      os.environ[HardhashServer.addressKey(contextId)] = context._server.address
+    return context._server.address
+
+  #----------------------------------------------------------------#
+  # remote - a worker process started after serve does not own the
+  # -- job datastore, leveldb is locked by the serving process. So
+  # -- connector returns a HardhashClient for the published address
+  #----------------------------------------------------------------#
+  @classmethod
+  def remote(cls, contextId, connId):
+    address = os.environ.get(HardhashServer.addressKey(contextId))
+    if not address:
+      return None
+    context = cls._instance.get(contextId)
+    if context and context._owner == os.getpid():
+      return None
+    try:
+      return cls._remote[(contextId, connId)]
+    except KeyError:
+      cls._remote[(contextId, connId)] = client = HardhashClient.make(address, connId)
+    return client
+
   @classmethod
   def destroy(cls, contextId=None):
     try:
@@ -110,6 +161,18 @@ class HardhashContext(HardhashCache):
   #----------------------------------------------------------------#
   def _destroy(self):
     logger.info(f'{self.name}, destroying resources ...')
+    if self._server:
+      os.environ.pop(HardhashServer.addressKey(self.contextId), None)
+      self._server.stop()
+      self._server = None
+    # async connectors write behind, so drain them before the datastore
+    # -- is deleted, and stop their I/O thread
+    for connId, connector in self.cache.items():
+      if isinstance(connector, AsyncLeveldbConnector):
+        try:
+          connector.shutdown()
+        except ConnectorError as ex:
+          logger.error(f'{self.name}, {connId} pending writes failed : {ex}')
     del self.cache
     self._datasource.destroy()
 
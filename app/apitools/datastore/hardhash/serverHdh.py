@@ -0,0 +1,566 @@
+__all__ = ['HardhashClient','HardhashServer']
+
+# The MIT License
+#
+# Copyright (c) 2018 Peter A McGill
+#
+from apibase import ConnectorError
+from .connectorHdh import Combiner, DEFAULT_PROTOCOL, WriteBuffer
+from itertools import count
+from threading import Event, Thread
+import io
+import json
+import logging
+import os, stat
+import pickle
+import tempfile
+import zmq
+
+logger = logging.getLogger('asyncio.broker')
+
+#----------------------------------------------------------------#
+# Hardhash wire protocol - nothing a client sends is unpickled
+# -- request  : [op, seq, *frames]
+# -- response : [seq, status, *frames]
+# -- BATCH frames are a json header of ops, performed in order, then
+# -- 1 value frame per PUT, eg
+# -- [["PUT", key], ["GET", key], ["APPEND", key, value]], bValue
+# -- APPEND values and COMBINE payloads are json values. The response
+# -- frame is the result of the last op, or status NIL if it is None
+# -- SELECT header is [startKey, endKey, incValue, batchSize, credit]
+# -- the server sends at most credit chunks with status MORE, and the
+# -- client sends CREDIT to request more, END marks the last chunk.
+# -- A chunk has 1 frame per value, or per key if incValue is false
+#----------------------------------------------------------------#
+BATCH = b'BATCH'
+SELECT = b'SELECT'
+CREDIT = b'CREDIT'
+CLOSE = b'CLOSE'
+OK = b'OK'
+NIL = b'NIL'
+MORE = b'MORE'
+END = b'END'
+ERR = b'ERR'
+
+BATCH_OPS = ('PUT','GET','APPEND','DELETE','COMBINE')
+MAX_CREDIT = 64
+
+#----------------------------------------------------------------#
+# the server binds an ipc socket in a private runtime directory, so
+# -- only processes of the same user can connect
+#----------------------------------------------------------------#
+RUNTIME_DIR = os.environ.get('APIPEER_RUNTIME') or f'{tempfile.gettempdir()}/apipeer-{os.getuid()}'
+
+def runtimeDir():
+  os.makedirs(RUNTIME_DIR, mode=0o700, exist_ok=True)
+  fstat = os.lstat(RUNTIME_DIR)
+  if (not stat.S_ISDIR(fstat.st_mode) or fstat.st_uid != os.getuid() 
+                                        or fstat.st_mode & 0o077):
+    raise ConnectorError(f'runtime directory {RUNTIME_DIR} is not private')
+  return RUNTIME_DIR
+
+#----------------------------------------------------------------#
+# PlainUnpickler - APPEND extends a stored list in place, the list
+# -- is loaded without resolving any global, so a stored value can
+# -- not run code in the server
+#----------------------------------------------------------------#
+class PlainUnpickler(pickle.Unpickler):
+  def find_class(self, module, name):
+    raise pickle.UnpicklingError(f'{module}.{name} is not a plain value')
+
+def plainLoads(bValue):
+  return PlainUnpickler(io.BytesIO(bValue)).load()
+
+#----------------------------------------------------------------#
+# readOps - the whole BATCH request is validated before any op is
+# -- performed, and each PUT is paired with its value
+#----------------------------------------------------------------#
+def readOps(frames):
+  if not frames:
+    raise ConnectorError('BATCH request has no header')
+  header, values = json.loads(frames[0]), iter(frames[1:])
+  if not isinstance(header, list):
+    raise ConnectorError('BATCH header is not a list of ops')
+  ops = []
+  for op in header:
+    if not isinstance(op, list) or len(op) < 2 or op[0] not in BATCH_OPS:
+      raise ConnectorError(f'{op} is not a hardhash request')
+    if op[0] == 'PUT':
+      bValue = next(values, None)
+      if bValue is None:
+        raise ConnectorError(f'PUT {op[1]} has no value frame')
+      op.append(bValue)
+    ops.append(op)
+  return ops
+
+#----------------------------------------------------------------#
+# RangeScan - a live leveldb range iterator, fetched in chunks
+#----------------------------------------------------------------#
+class RangeScan:
+  def __init__(self, rangeIter, incValue, batchSize):
+    self._iter = rangeIter
+    self.incValue = incValue
+    self.batchSize = batchSize
+
+  def fetch(self):
+    chunk = []
+    for item in self._iter:
+      chunk.append(item[1] if self.incValue else item)
+      if len(chunk) == self.batchSize:
+        break
+    return chunk
+
+#----------------------------------------------------------------#
+# HardhashServer - serves 1 job datastore to many client processes
+# -- runs in its own thread with a sync zmq context, so leveldb calls
+# -- never block the peer eventloop
+#----------------------------------------------------------------#
+class HardhashServer:
+  POLL_TIMEOUT = 100
+  _serial = count()
+
+  def __init__(self, contextId, leveldb, pickleMode=DEFAULT_PROTOCOL):
+    self.contextId = contextId
+    self._leveldb = leveldb
+    self._pickleMode = pickleMode
+    self._combiner = {}
+    self._scans = {}
+    self._stopped = Event()
+    self._thread = None
+    self.context = None
+    self.sock = None
+    self.address = None
+    self._ipcPath = None
+
+  @property
+  def name(self):
+    return f'{self.__class__.__name__}-{self.contextId}'
+
+  #----------------------------------------------------------------#
+  # addressKey - serve publishes the address in this environment key,
+  # -- so that worker processes started later can connect
+  #----------------------------------------------------------------#
+  @staticmethod
+  def addressKey(contextId):
+    return f'APIPEER_HARDHASH_{contextId}'
+
+  #----------------------------------------------------------------#
+  # make
+  #----------------------------------------------------------------#
+  @classmethod
+  def make(cls, contextId, leveldb, hostAddr=None):
+    server = cls(contextId, leveldb)
+    server.bind(hostAddr)
+    return server
+
+  #----------------------------------------------------------------#
+  # bind - by default the server binds a private ipc socket, a tcp
+  # -- hostAddr is accepted for a trusted network only
+  #----------------------------------------------------------------#
+  def bind(self, hostAddr=None):
+    self.context = zmq.Context()
+    self.sock = self.context.socket(zmq.ROUTER)
+    if hostAddr:
+      port = self.sock.bind_to_random_port(hostAddr)
+      self.address = f'{hostAddr}:{port}'
+    else:
+      self._ipcPath = f'{runtimeDir()}/hardhash-{os.getpid()}-{next(self._serial)}'
+      if os.path.lexists(self._ipcPath):
+        os.unlink(self._ipcPath)
+      self.address = f'ipc://{self._ipcPath}'
+      self.sock.bind(self.address)
+    logger.info(f'{self.name}, bound to {self.address}')
+
+  #----------------------------------------------------------------#
+  # start
+  #----------------------------------------------------------------#
+  def start(self):
+    self._thread = Thread(target=self.run, name=self.name, daemon=True)
+    self._thread.start()
+    return self.address
+
+  #----------------------------------------------------------------#
+  # stop - the server thread owns the socket, so it is signalled to
+  # -- close the socket and the context as it leaves the run loop
+  #----------------------------------------------------------------#
+  def stop(self, timeout=5):
+    self._stopped.set()
+    if not self._thread:
+      self.close()
+    else:
+      self._thread.join(timeout)
+      if self._thread.is_alive():
+        logger.warn(f'{self.name}, server thread is busy, it will close on leaving')
+        return
+    logger.info(f'{self.name} is stopped')
+
+  #----------------------------------------------------------------#
+  # close
+  #----------------------------------------------------------------#
+  def close(self):
+    self._scans.clear()
+    self._combiner.clear()
+    self.sock.close(linger=0)
+    self.context.term()
+    if self._ipcPath and os.path.lexists(self._ipcPath):
+      os.unlink(self._ipcPath)
+
+  #----------------------------------------------------------------#
+  # run - a malformed request is logged and dropped, it can only be
+  # -- answered if its identity and seq frames were read
+  #----------------------------------------------------------------#
+  def run(self):
+    poller = zmq.Poller()
+    poller.register(self.sock, zmq.POLLIN)
+    try:
+      while not self._stopped.is_set():
+        if not poller.poll(self.POLL_TIMEOUT):
+          continue
+        identity = op = seq = None
+        try:
+          frames = self.sock.recv_multipart()
+          if len(frames) < 3:
+            raise ConnectorError(f'request has {len(frames)} frames, at least 3 are required')
+          identity, op, seq, *frames = frames
+          self.handle(identity, op, seq, frames)
+        except Exception as ex:
+          logger.error(f'{self.name}, {op} request failed', exc_info=True)
+          if seq is not None:
+            self.sock.send_multipart([identity, seq, ERR, str(ex).encode()])
+    finally:
+      self.close()
+
+  #----------------------------------------------------------------#
+  # handle
+  #----------------------------------------------------------------#
+  def handle(self, identity, op, seq, frames):
+    if op == BATCH:
+      result = self.perform(identity, readOps(frames))
+      if result is None:
+        self.sock.send_multipart([identity, seq, NIL])
+      else:
+        self.sock.send_multipart([identity, seq, OK, result])
+    elif op == SELECT:
+      startKey, endKey, incValue, batchSize, credit = json.loads(frames[0])
+      if not isinstance(batchSize, int) or batchSize < 1:
+        raise ConnectorError(f'SELECT batch size {batchSize} is not valid')
+      rangeIter = self._leveldb.RangeIter(startKey.encode(), endKey.encode(), include_value=bool(incValue))
+      self._scans[(identity, seq)] = RangeScan(rangeIter, incValue, batchSize)
+      self.stream(identity, seq, credit)
+    elif op == CREDIT:
+      self.stream(identity, seq, int(frames[0]))
+    elif op == CLOSE:
+      self._scans.pop((identity, seq), None)
+    else:
+      raise ConnectorError(f'{op} is not a hardhash request')
+
+  #----------------------------------------------------------------#
+  # perform - puts are collected in one write batch, which is written
+  # -- before any read, so that ops apply in request order. The result
+  # -- of the last op is returned
+  #----------------------------------------------------------------#
+  def perform(self, identity, ops):
+    wbuffer = WriteBuffer.make(self._leveldb)
+    result = None
+    for op in ops:
+      request, args = op[0], op[1:]
+      if request == 'PUT':
+        wbuffer.put(args[0].encode(), args[1])
+        result = None
+        continue
+      if request == 'COMBINE':
+        result = self._COMBINE(wbuffer, identity, *args)
+        continue
+      wbuffer.flush()
+      result = self[request](*args)
+    wbuffer.flush()
+    return result
+
+  def __getitem__(self, request):
+    try:
+      return getattr(self, f'_{request}')
+    except AttributeError:
+      raise ConnectorError(f'{request} is not a hardhash request')
+
+  #----------------------------------------------------------------#
+  # _GET - returns the stored bytes, the client unpickles
+  #----------------------------------------------------------------#
+  def _GET(self, key):
+    try:
+      return self._leveldb.Get(key.encode())
+    except KeyError:
+      return None
+
+  #----------------------------------------------------------------#
+  # _DELETE
+  #----------------------------------------------------------------#
+  def _DELETE(self, key):
+    self._leveldb.Delete(key.encode())
+
+  #----------------------------------------------------------------#
+  # _APPEND
+  #----------------------------------------------------------------#
+  def _APPEND(self, key, value):
+    bKey = key.encode()
+    try:
+      valueA = plainLoads(self._leveldb.Get(bKey))
+    except KeyError:
+      valueA = []
+    if not isinstance(valueA, list):
+      raise ConnectorError(f'{key} value is not a list')
+    valueA.append(value)
+    self._leveldb.Put(bKey, pickle.dumps(valueA, self._pickleMode))
+
+  #----------------------------------------------------------------#
+  # _COMBINE - combiner state is kept per client, so that 2 client
+  # -- processes combining the same node do not share it
+  #----------------------------------------------------------------#
+  def _COMBINE(self, wbuffer, identity, nodeName, payload):
+    def put(key, value):
+      wbuffer.put(key.encode(), pickle.dumps(value, self._pickleMode))
+    if not nodeName:
+      if not isinstance(payload, dict):
+        raise ConnectorError('COMBINE payload is not a json object')
+      nodeName, combiner = Combiner.make(put, payload)
+      self._combiner[(identity, nodeName)] = combiner
+      return
+    combiner = self._combiner[(identity, nodeName)]
+    combiner._put = put
+    modeKey = payload.pop(0)
+    combiner[modeKey](*payload)
+    if combiner.done:
+      self._combiner.pop((identity, combiner.nodeName))
+
+  #----------------------------------------------------------------#
+  # stream - send up to credit chunks of a range scan
+  #----------------------------------------------------------------#
+  def stream(self, identity, seq, credit):
+    scanKey = (identity, seq)
+    scan = self._scans.get(scanKey)
+    if scan is None:
+      return
+    for _ in range(min(credit, MAX_CREDIT)):
+      chunk = scan.fetch()
+      status = MORE if len(chunk) == scan.batchSize else END
+      self.sock.send_multipart([identity, seq, status, *chunk])
+      if status == END:
+        del self._scans[scanKey]
+        break
+
+#----------------------------------------------------------------#
+# HardhashClient - sync client for a HardhashServer, HardhashContext
+# -- .connector returns it in a worker process started after serve.
+# -- Write ops are pipelined : they are sent as
+# -- 1 BATCH message per PIPELINE_SIZE ops, with up to MAX_INFLIGHT
+# -- unacknowledged batches
+#----------------------------------------------------------------#
+class HardhashClient:
+  PIPELINE_SIZE = 500
+  MAX_INFLIGHT = 8
+  SCAN_SIZE = 1000
+  SCAN_CREDIT = 2
+
+  def __init__(self, address, connId, pickleMode=DEFAULT_PROTOCOL):
+    self.address = address
+    self._cid = connId
+    self._pickleMode = pickleMode
+    self._ops = []
+    self._values = []
+    self._seq = 0
+    self._inflight = []
+    self.context = zmq.Context()
+    self.sock = self.context.socket(zmq.DEALER)
+    self.sock.connect(address)
+
+  @property
+  def cid(self):
+    return self._cid
+
+  @property
+  def name(self):
+    return f'{self.__class__.__name__}.{self._cid}'
+
+  #----------------------------------------------------------------#
+  # make
+  #----------------------------------------------------------------#
+  @classmethod
+  def make(cls, address, connId='hardhash'):
+    return cls(address, connId)
+
+  def __getitem__(self, key):
+    return self.get(key)
+
+  def __setitem__(self, key, value):
+    self.put(key, value)
+
+  def __delitem__(self, key):
+    self.delete(key)
+
+  #----------------------------------------------------------------#
+  # _send
+  #----------------------------------------------------------------#
+  def _send(self, op, *frames):
+    self._seq += 1
+    seq = str(self._seq).encode()
+    self.sock.send_multipart([op, seq, *frames])
+    return seq
+
+  #----------------------------------------------------------------#
+  # _recv - replies arrive in request order
+  #----------------------------------------------------------------#
+  def _recv(self, seq):
+    rseq, status, *frames = self.sock.recv_multipart()
+    if rseq != seq:
+      raise ConnectorError(f'{self.name}, reply {rseq} is out of order, expected {seq}')
+    if status == ERR:
+      raise ConnectorError(f'{self.name}, hardhash request failed : {frames[0].decode()}')
+    return status, frames
+
+  #----------------------------------------------------------------#
+  # _ack - wait for the oldest unacknowledged batch
+  #----------------------------------------------------------------#
+  def _ack(self):
+    self._recv(self._inflight.pop(0))
+
+  #----------------------------------------------------------------#
+  # _batch - the pipelined ops as BATCH frames, each op is json encoded
+  # -- when it is enqueued, so an invalid value fails in the caller
+  #----------------------------------------------------------------#
+  def _batch(self):
+    header = f'[{",".join(self._ops)}]'.encode()
+    frames = [header, *self._values]
+    self._ops, self._values = [], []
+    return frames
+
+  #----------------------------------------------------------------#
+  # _submit - send the pipelined ops, without waiting for the reply
+  #----------------------------------------------------------------#
+  def _submit(self):
+    if not self._ops:
+      return
+    frames = self._batch()
+    while len(self._inflight) >= self.MAX_INFLIGHT:
+      self._ack()
+    self._inflight.append(self._send(BATCH, *frames))
+
+  #----------------------------------------------------------------#
+  # _request - send the pipelined ops with op, and wait for the result
+  #----------------------------------------------------------------#
+  def _request(self, *op):
+    self._ops.append(json.dumps(op))
+    seq = self._send(BATCH, *self._batch())
+    while self._inflight:
+      self._ack()
+    status, frames = self._recv(seq)
+    return None if status == NIL else frames[0]
+
+  #----------------------------------------------------------------#
+  # _enqueue - a PUT value is sent as a raw frame
+  #----------------------------------------------------------------#
+  def _enqueue(self, *op, bValue=None):
+    self._ops.append(json.dumps(op))
+    if bValue is not None:
+      self._values.append(bValue)
+    if len(self._ops) >= self.PIPELINE_SIZE:
+      self._submit()
+
+  #----------------------------------------------------------------#
+  # get
+  #----------------------------------------------------------------#
+  def get(self, key):
+    bValue = self._request('GET', key)
+    if bValue is None:
+      raise KeyError(key)
+    return pickle.loads(bValue)
+
+  #----------------------------------------------------------------#
+  # put
+  #----------------------------------------------------------------#
+  def put(self, key, value):
+    self._enqueue('PUT', key, bValue=pickle.dumps(value, self._pickleMode))
+
+  #----------------------------------------------------------------#
+  # bput - if value is already bytes or bytearray
+  #----------------------------------------------------------------#
+  def bput(self, key, value):
+    if not isinstance(value, (bytes, bytearray)):
+      value = pickle.dumps(value, self._pickleMode)
+    self._enqueue('PUT', key, bValue=bytes(value))
+
+  #----------------------------------------------------------------#
+  # append - value is a json value, the server never unpickles
+  #----------------------------------------------------------------#
+  def append(self, key, value):
+    self._enqueue('APPEND', key, value)
+
+  #----------------------------------------------------------------#
+  # delete
+  #----------------------------------------------------------------#
+  def delete(self, key):
+    self._enqueue('DELETE', key)
+
+  #----------------------------------------------------------------#
+  # combine
+  #----------------------------------------------------------------#
+  def combine(self, nodeName, payload):
+    self._enqueue('COMBINE', nodeName, payload)
+
+  #----------------------------------------------------------------#
+  # batch - the client is already pipelined, so batch mode is a
+  # -- passthru to satisfy the normaliser engine protocol
+  #----------------------------------------------------------------#
+  def batch(self, wbuffer=None):
+    return self
+
+  def unbatch(self):
+    self.flush()
+
+  #----------------------------------------------------------------#
+  # flush - send the pending ops and wait for all acknowledgements
+  #----------------------------------------------------------------#
+  def flush(self):
+    size = len(self._ops)
+    self._submit()
+    while self._inflight:
+      self._ack()
+    return size
+
+  #----------------------------------------------------------------#
+  # select - the scan is streamed in SCAN_SIZE chunks, SCAN_CREDIT
+  # -- chunks are kept in flight by returning 1 credit per chunk read.
+  # -- other requests must not be made until the scan is consumed
+  #----------------------------------------------------------------#
+  def select(self, startKey, endKey, incValue=True):
+    self.flush()
+    payload = [startKey, endKey, incValue, self.SCAN_SIZE, self.SCAN_CREDIT]
+    seq = self._send(SELECT, json.dumps(payload).encode())
+    inflight = self.SCAN_CREDIT
+    try:
+      while True:
+        status, chunk = self._recv(seq)
+        inflight -= 1
+        if status == END:
+          seq = None
+        else:
+          self.sock.send_multipart([CREDIT, seq, b'1'])
+          inflight += 1
+        for item in chunk:
+          yield pickle.loads(item) if incValue else item.decode()
+        if seq is None:
+          return
+    finally:
+      if seq is not None:
+        # the scan was abandoned, drain the chunks in flight
+        self.sock.send_multipart([CLOSE, seq, b''])
+        for _ in range(inflight):
+          status, chunk = self._recv(seq)
+          if status == END:
+            break
+
+  #----------------------------------------------------------------#
+  # close
+  #----------------------------------------------------------------#
+  def close(self):
+    self.flush()
+    self.sock.close(linger=0)
+    self.context.term()
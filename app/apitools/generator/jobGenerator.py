@@ -38,7 +38,8 @@ class AbstractMakeKit(Terminal):
 
   @classmethod
   def __start__(cls, genPacket):
-    packet = genPacket.copy()
+    # Article.copy is read only, export returns a mutable shallow dict
+    packet = genPacket.export()
     for key, value in packet.items():
       if isinstance(value,dict):
         packet[key] = Article(value)
@@ -138,7 +139,10 @@ class AbstractGenerator:
       logger.warn(f'make.build condition is negative, aborting {self.moduleName} build ...')
     else:
       self.build(jobMeta)
-    self.importModule()
+    if self.cached and self.moduleName in sys.modules:
+      logger.info(f'{self.moduleName} build is unchanged, skipping reload ...')
+    else:
+      self.importModule()
     return Article(jobMeta)
 
   # ------------------------------------------------------------ #
@@ -1,9 +1,10 @@
 #from github import Github, GithubException
 from jinja2 import Environment, PackageLoader, Template
-from apibase import Article, FilePacket, Note, Terminal
+from apibase import Article, FilePacket, Note, Terminal, json
 from apitools import HardhashContext
 from . import AbstractMakeKit, AbstractGenerator, RenderError
 from copy import copy
+import hashlib
 import importlib
 import logging
 import os, sys
@@ -62,7 +63,12 @@ class JobGeneratorA1(MakeKit, AbstractGenerator):
     logger.info(f'deploying codes to {self.moduleName} ...')
 
   # -------------------------------------------------------------- #
-  # build
+  # build - make.build modes :
+  # -- build : build only if the module does not exist
+  # -- rebuild : always build
+  # -- cached : rebuild only if the release, jobMeta or module tree has
+  # --   changed since the last recorded build
+  # -- nobuild : never build
   # ---------------------------------------------------------------#
   def build(self, jobMeta):
     if os.path.exists(self.modulePath):
@@ -71,8 +77,13 @@ class JobGeneratorA1(MakeKit, AbstractGenerator):
     elif self.make.build == 'nobuild':
       errmsg = f'{self.jobId}, build is disabled but modulePath does not exist'
       raise Exception(f'{errmsg}\nmodule path : {self.modulePath}')
+    buildCache = BuildCache(jobMeta)
+    if self.make.build == 'cached' and buildCache.restore():
+      self['cached'] = True
+      return
     self.deploy(jobMeta)
     self.render(jobMeta)
+    buildCache.save()
     
   # -------------------------------------------------------------- #
   # deploy
@@ -444,11 +455,14 @@ class CodeDeployment(MakeKit):
     subPath = self.assets['subPath']  
     assetPath = f'{self.productPath}/{subPath}'
     logger.info(f'loading {jobMeta.jobId} meta assets in {assetPath}')
+    # metaDocs are kept for the build cache, the product path is removed on cleanup
+    self['metaDocs'] = {}
     for metaFile in self.assets['metaFiles']:
       metaPath = f'{assetPath}/{metaFile}'
       packet = FilePacket.open(metaPath)
       logger.info(f'{self.name}, loading item : {packet.eventKey}')
       hardhash[packet.eventKey] = packet.metaDoc
+      self.metaDocs[packet.eventKey] = packet.metaDoc
 
   # -------------------------------------------------------------- #
   # copyDeploy
@@ -487,4 +501,91 @@ class CodeDeployment(MakeKit):
     archivePath = f'{self.apiBase}/project/archive/{owner}-{releaseTag}'
     self.method = 'copy' if os.path.exists(archivePath) else 'extract'
     self.deploy()
-    self.loadMeta(Note(jobMeta))
\ No newline at end of file
+    self.loadMeta(Note(jobMeta))
+
+# -------------------------------------------------------------- #
+# BuildCache - content addressed record of the last module build,
+# -- keyed on releaseTag, jobMeta and the release template files. Every
+# -- build is recorded, only the cached build mode restores a record
+# ---------------------------------------------------------------#
+class BuildCache(MakeKit):
+
+  def __init__(self, jobMeta):
+    self.dbKey = f'JBLD|{self.jobId}'
+    self.buildKey = self.getBuildKey(jobMeta)
+
+  @property
+  def name(self):
+    return f'{self.__class__.__name__}'
+
+  # -------------------------------------------------------------- #
+  # getBuildKey
+  # ---------------------------------------------------------------#
+  def getBuildKey(self, jobMeta):
+    gitUser, owner, product, releaseTag = self.releaseInfo
+    hasher = hashlib.sha1(releaseTag.encode())
+    hasher.update(json.dumps(jobMeta, sort_keys=True, default=str).encode())
+    tmpltPath = f'{self.apiBase}/project/archive/{owner}-{releaseTag}/{product}/build'
+    if os.path.exists(tmpltPath):
+      for fileName in sorted(os.listdir(tmpltPath)):
+        hasher.update(fileName.encode())
+        with open(f'{tmpltPath}/{fileName}','rb') as fhr:
+          hasher.update(fhr.read())
+    return hasher.hexdigest()
+
+  # -------------------------------------------------------------- #
+  # getManifest - digest of the rendered module tree
+  # ---------------------------------------------------------------#
+  def getManifest(self):
+    hasher = hashlib.sha1()
+    for dirPath, dirNames, fileNames in os.walk(self.modulePath):
+      dirNames[:] = sorted(name for name in dirNames if name != '__pycache__')
+      for fileName in sorted(fileNames):
+        if fileName.endswith('.pyc'):
+          continue
+        filePath = f'{dirPath}/{fileName}'
+        hasher.update(os.path.relpath(filePath, self.modulePath).encode())
+        with open(filePath,'rb') as fhr:
+          hasher.update(fhr.read())
+    return hasher.hexdigest()
+
+  # -------------------------------------------------------------- #
+  # restore - returns True if the current module tree is reusable
+  # ---------------------------------------------------------------#
+  def restore(self):
+    try:
+      record = self._leveldb[self.dbKey]
+    except KeyError:
+      logger.info(f'{self.name}, {self.jobId} build record not found')
+      return False
+    if record['buildKey'] != self.buildKey:
+      logger.info(f'{self.name}, {self.jobId} build key has changed, rebuilding ...')
+      return False
+    if not os.path.exists(self.modulePath) or record['manifest'] != self.getManifest():
+      logger.info(f'{self.name}, {self.jobId} module tree has changed, rebuilding ...')
+      return False
+    logger.info(f'{self.name}, {self.jobId} build is current, skipping render ...')
+    self.loadMeta(record['metaDocs'])
+    return True
+
+  # -------------------------------------------------------------- #
+  # loadMeta - CodeDeployment.loadMeta equivalent, sourced from the record
+  # ---------------------------------------------------------------#
+  def loadMeta(self, metaDocs):
+    hardhash = HardhashContext.connector(self.jobId)
+    hardhash['apiBase'] = self.apiBase
+    for eventKey, metaDoc in metaDocs.items():
+      logger.info(f'{self.name}, loading item : {eventKey}')
+      hardhash[eventKey] = metaDoc
+
+  # -------------------------------------------------------------- #
+  # save
+  # ---------------------------------------------------------------#
+  def save(self):
+    record = {
+      'buildKey': self.buildKey,
+      'manifest': self.getManifest(),
+      'metaDocs': self.metaDocs or {}
+    }
+    self._leveldb[self.dbKey] = record
+    logger.info(f'{self.name}, {self.jobId} build record saved')
@@ -3,10 +3,24 @@
 # Copyright (c) 2018 Peter A McGill
 #
 from apibase import json, Note, Article
+import hashlib
 import logging
+import os
+import pickle
+import stat
+import sys
+import tempfile
 
 logger = logging.getLogger('asyncio.microservice')
 
+# bump when the compiled tree layout changes, to invalidate existing plans
+PLAN_VERSION = b'2'
+
+# compiled plans are cached outside the project source tree, in a
+# -- directory private to the user, because a plan is unpickled
+PLAN_CACHE = os.environ.get('APIPEER_PLAN_CACHE') or \
+                              f'{tempfile.gettempdir()}/apipeer-plans-{os.getuid()}'
+
 # -------------------------------------------------------------- #
 # AbstractProvider
 # ---------------------------------------------------------------#
@@ -27,20 +41,43 @@ class AbstractProvider(Article):
       return self.__dict__[name]
 
   # -------------------------------------------------------------- #
-  # __start__
+  # __start__ - the compiled schema plan is reused while the schema
+  # -- file content is unchanged
   # ---------------------------------------------------------------#
   @classmethod
   def __start__(cls, metaFile):
-    if not cls._nodeTree:
-      with open(metaFile,'r') as fhr:
-        try:
-          schema = Note(json.load(fhr))
-          provider = cls.make(schema)
-          logger.debug(f'########## schema is loaded, maxLevel : {provider.maxLevel}')
-          del provider
-        except ValueError as ex:
-          errmsg = 'json load error: ' + str(ex) 
-          raise Exception(errmsg)
+    if cls._nodeTree:
+      return
+    with open(metaFile,'rb') as fhr:
+      content = fhr.read()
+    schemaPlan = SchemaPlan.make(cls, metaFile, content)
+    plan = schemaPlan.load()
+    if plan:
+      cls.restore(plan)
+      return
+    try:
+      schema = Note(json.loads(content))
+      provider = cls.make(schema)
+      logger.debug(f'########## schema is loaded, maxLevel : {provider.maxLevel}')
+      del provider
+    except ValueError as ex:
+      errmsg = 'json load error: ' + str(ex) 
+      raise Exception(errmsg)
+    schemaPlan.dump(cls.compile())
+
+	#------------------------------------------------------------------#
+	# compile - returns the picklable plan
+	#------------------------------------------------------------------#
+  @classmethod
+  def compile(cls):
+    raise NotImplementedError(f'{cls.__name__}.compile is an abstract method')
+
+	#------------------------------------------------------------------#
+	# restore - applies a loaded plan
+	#------------------------------------------------------------------#
+  @classmethod
+  def restore(cls, plan):
+    raise NotImplementedError(f'{cls.__name__}.restore is an abstract method')
 
   def get(self):
     raise NotImplementedError(f'{self.name}.get is an abstract method')
@@ -57,4 +94,148 @@ class AbstractProvider(Article):
 	#------------------------------------------------------------------#
   @classmethod
   def apply(cls, moduleName):
-    raise NotImplementedError(f'{cls.__name__}.apply is an abstract method')
\ No newline at end of file
+    raise NotImplementedError(f'{cls.__name__}.apply is an abstract method')
+
+#------------------------------------------------------------------#
+# dynamicKlass - TreeNode and TableRow classes are mixed with the
+# - project TaskMember class at runtime, so cache each synthesis.
+# - The cache is keyed by class path, so a reloaded module replaces
+# - its prior synthesis instead of adding another
+#------------------------------------------------------------------#
+_dynamicKlass = {}
+
+def klassPath(klass):
+  return f'{klass.__module__}.{klass.__qualname__}'
+
+def dynamicKlass(baseKlass, MemberKlass):
+  dynamicKey = (klassPath(baseKlass), klassPath(MemberKlass))
+  Klass = _dynamicKlass.get(dynamicKey)
+  if Klass and Klass.__bases__ == (baseKlass, MemberKlass):
+    return Klass
+  className = f'{baseKlass.__name__}-TaskMember'
+  Klass = type(className,(baseKlass,MemberKlass),{})
+  logger.info(f'{baseKlass.__name__}, new dynamic class : {Klass.__name__} ')
+  _dynamicKlass[dynamicKey] = Klass
+  return Klass
+
+#------------------------------------------------------------------#
+# renew - unpickle factory for dynamic class instances, pickle can
+# - only reference the base and member classes by module path
+#------------------------------------------------------------------#
+def renew(baseKlass, MemberKlass):
+  Klass = dynamicKlass(baseKlass, MemberKlass)
+  return Klass.__new__(Klass)
+
+#------------------------------------------------------------------#
+# codeDigest - the plan pickles instances of the provider, node and
+# - TaskMember classes, which are defined in the provider class module
+# - packages. Hash the source of those packages, so that a class code
+# - change invalidates the plan without a PLAN_VERSION bump
+#------------------------------------------------------------------#
+def codeDigest(provider, hasher):
+  packages = set()
+  for klass in provider.__mro__:
+    module = sys.modules.get(klass.__module__)
+    if getattr(module, '__file__', None):
+      packages.add(os.path.dirname(module.__file__))
+    if klass is AbstractProvider:
+      break
+  for package in sorted(packages):
+    for fileName in sorted(os.listdir(package)):
+      if fileName.endswith('.py'):
+        hasher.update(fileName.encode())
+        with open(f'{package}/{fileName}','rb') as fhr:
+          hasher.update(fhr.read())
+
+#------------------------------------------------------------------#
+# isPrivate - owned by this user, no group or other access
+#------------------------------------------------------------------#
+def isPrivate(fstat):
+  return fstat.st_uid == os.getuid() and not fstat.st_mode & 0o077
+
+#------------------------------------------------------------------#
+# planCache - returns the PLAN_CACHE directory, made with mode 0700 if
+# - it does not exist. An existing directory that another user owns or
+# - can access is refused, so a planted plan is never unpickled
+#------------------------------------------------------------------#
+def planCache():
+  os.makedirs(PLAN_CACHE, mode=0o700, exist_ok=True)
+  fstat = os.lstat(PLAN_CACHE)
+  if not stat.S_ISDIR(fstat.st_mode) or not isPrivate(fstat):
+    raise PermissionError(f'{PLAN_CACHE} is not a private directory of this user')
+  return PLAN_CACHE
+
+#------------------------------------------------------------------#
+# SchemaPlan
+# - on-disk pickled plan, stored in the PLAN_CACHE directory and keyed
+# - by the schema content and class source hash
+#------------------------------------------------------------------#
+class SchemaPlan:
+  def __init__(self, planPath, digest):
+    self.planPath = planPath
+    self.digest = digest
+
+  @property
+  def name(self):
+    return f'{self.__class__.__name__}'
+
+	#------------------------------------------------------------------#
+	# make
+	#------------------------------------------------------------------#
+  @classmethod
+  def make(cls, provider, metaFile, content):
+    hasher = hashlib.sha1(PLAN_VERSION)
+    hasher.update(klassPath(provider).encode())
+    hasher.update(content)
+    codeDigest(provider, hasher)
+    # 1 plan file per provider and schema file, a stale plan is replaced
+    planKey = hashlib.sha1(f'{klassPath(provider)}|{os.path.realpath(metaFile)}'.encode())
+    schemaName = os.path.splitext(os.path.basename(metaFile))[0]
+    planPath = f'{PLAN_CACHE}/{schemaName}-{planKey.hexdigest()[:16]}.plan'
+    return cls(planPath, hasher.hexdigest())
+
+	#------------------------------------------------------------------#
+	# load - returns None if the plan is missing, stale, unreadable or
+	# - not private to this user
+	#------------------------------------------------------------------#
+  def load(self):
+    try:
+      planCache()
+      fd = os.open(self.planPath, os.O_RDONLY | os.O_NOFOLLOW)
+    except FileNotFoundError:
+      return None
+    except OSError as ex:
+      logger.warn(f'{self.name}, {self.planPath} is not loaded : {ex}')
+      return None
+    try:
+      with os.fdopen(fd,'rb') as fhr:
+        if not isPrivate(os.fstat(fhr.fileno())):
+          logger.warn(f'{self.name}, {self.planPath} is not private, ignoring it')
+          return None
+        digest, plan = pickle.load(fhr)
+    except Exception as ex:
+      logger.warn(f'{self.name}, {self.planPath} load failed : {ex}')
+      return None
+    if digest != self.digest:
+      logger.info(f'{self.name}, {self.planPath} is stale')
+      return None
+    logger.info(f'{self.name}, compiled schema loaded : {self.planPath}')
+    return plan
+
+	#------------------------------------------------------------------#
+	# dump - a failure is not fatal, the schema is compiled next time
+	#------------------------------------------------------------------#
+  def dump(self, plan):
+    tempPath = f'{self.planPath}.{os.getpid()}'
+    fd = None
+    try:
+      planCache()
+      fd = os.open(tempPath, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+      with os.fdopen(fd,'wb') as fhw:
+        pickle.dump((self.digest, plan), fhw, pickle.HIGHEST_PROTOCOL)
+      os.replace(tempPath, self.planPath)
+      logger.info(f'{self.name}, compiled schema saved : {self.planPath}')
+    except Exception as ex:
+      logger.warn(f'{self.name}, {self.planPath} save failed : {ex}')
+      if fd is not None and os.path.exists(tempPath):
+        os.remove(tempPath)
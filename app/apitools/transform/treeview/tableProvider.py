@@ -25,6 +25,20 @@ class TableProviderA(AbstractProvider):
     del instance._nodes
     cls._instance = instance
 
+	#------------------------------------------------------------------#
+	# restore - apply an instance loaded from a compiled schema plan
+	#------------------------------------------------------------------#
+  @classmethod
+  def restore(cls, instance):
+    cls._instance = instance
+
+	#------------------------------------------------------------------#
+	# __reduce__ - AbstractProvider.__getattr__ defeats the default
+  # - __setstate__ lookup, so rebuild from the attribute dict
+	#------------------------------------------------------------------#
+  def __reduce__(self):
+    return (self.__class__, (self.__dict__,))
+
 	#------------------------------------------------------------------#
 	# get
 	#------------------------------------------------------------------#
@@ -5,6 +5,7 @@ __all__ = ['TableRowRNA1','TableRowFKA1','AbstractTaskMember']
 # Copyright (c) 2018 Peter A McGill
 #
 from apibase import Article, Note, TaskError
+from .provider import dynamicKlass, renew
 import logging
 
 logger = logging.getLogger('asyncio.microservice')
@@ -81,11 +82,18 @@ class TableRow(AbstractRow):
   # ---------------------------------------------------------------#
   @classmethod
   def make(cls, MemberKlass):
-    className = f'{cls.__name__}-TaskMember'
-    RowKlass = type(className,(cls,MemberKlass),{})
-    logger.info(f'{cls.__name__}, new dynamic class : {RowKlass.__name__} ')
+    RowKlass = dynamicKlass(cls, MemberKlass)
     return RowKlass()
 
+  # -------------------------------------------------------------- #
+  # __reduce__ - runtime attributes are set again by arrange
+  # ---------------------------------------------------------------#
+  def __reduce__(self):
+    baseKlass, MemberKlass = type(self).__bases__
+    state = {key: value for key, value in self.__dict__.items() if key != '_hh'}
+    state['_hh'] = None
+    return (renew, (baseKlass, MemberKlass), state)
+
 # -------------------------------------------------------------- #
 # TableRowRNA1
 # ---------------------------------------------------------------#
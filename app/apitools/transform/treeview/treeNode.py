@@ -7,6 +7,7 @@ __all__ = [
 # Copyright (c) 2018 Peter A McGill
 #
 from apibase import TaskError
+from .provider import dynamicKlass, renew
 import logging
 
 logger = logging.getLogger('asyncio.microservice')
@@ -30,6 +31,15 @@ class AbstractTreeNode:
   def __repr__(self):
     return f'{self.name}.{self.nodeName}'
 
+	#------------------------------------------------------------------#
+	# __reduce__ - runtime attributes are set again by arrange
+	#------------------------------------------------------------------#
+  def __reduce__(self):
+    baseKlass, MemberKlass = type(self).__bases__
+    state = {key: value for key, value in self.__dict__.items() 
+                                  if key not in ('_hh','seqnum')}
+    return (renew, (baseKlass, MemberKlass), state)
+
 	#------------------------------------------------------------------#
 	# apply
 	#------------------------------------------------------------------#
@@ -55,9 +65,7 @@ class AbstractTreeNode:
 	#------------------------------------------------------------------#
   @classmethod
   def make(cls, nodeName, config, MemberKlass):
-    className = f'{cls.__name__}-TaskMember'
-    NodeKlass = type(className,(cls,MemberKlass),{})
-    logger.info(f'{cls.__name__}, new dynamic class : {NodeKlass.__name__} ')
+    NodeKlass = dynamicKlass(cls, MemberKlass)
     node = NodeKlass(config)
     node.nodeName = nodeName
     tableName, level = nodeName.split('|')
@@ -49,6 +49,20 @@ class TreeProviderA(AbstractProvider):
   def get(cls):
     return cls._nodeTree
 
+	#------------------------------------------------------------------#
+	# compile
+	#------------------------------------------------------------------#
+  @classmethod
+  def compile(cls):
+    return {'nodeTree': cls._nodeTree}
+
+	#------------------------------------------------------------------#
+	# restore
+	#------------------------------------------------------------------#
+  @classmethod
+  def restore(cls, plan):
+    cls._nodeTree = plan['nodeTree']
+
   # -------------------------------------------------------------- #
   # getLevel
   # ---------------------------------------------------------------#
@@ -0,0 +1,478 @@
+# The MIT License
+#
+# Copyright (c) 2018 Peter A McGill
+#
+'''
+  End to end benchmark of the dataconvertA1 pipelines on a local peer
+
+  A synthetic input is generated into a temporary job source repo, the
+  job is submitted by ApiLoader through the ApiServer control socket,
+  exactly as apiAgent does, and each resolver of the job state machines
+  is timed
+
+    cd app
+    python -m benchmark.dataconvertA1 xmltocsv --records 20000
+    python -m benchmark.dataconvertA1 csvtojson --records 20000 --fanout 3
+    python -m benchmark.dataconvertA1 datastream --records 200 --blob-kb 512
+
+  A state span is from its resolver entry to the next state entry of
+  the same actor, so the span of a state in transition includes the
+  microservice work that resolves it. The result is written as json to
+  benchmark/results, and is compared with --baseline if given
+'''
+from apibase import (addHandler, ApiLoader, ApiServer, ApiPeer, AppCooperator,
+                                                  Metrics, StateMachine)
+from apitools import HardhashContext
+from benchmark.synthetic import NodeSchema, makeCsvTarball, makeXmlFragments
+from dataclasses import dataclass, field
+from datetime import datetime
+import argparse
+import asyncio
+import copy
+import json
+import logging
+import os, sys
+import platform
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+
+apiBase = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+logger = logging.getLogger('asyncio.benchmark')
+addHandler(logger)
+logger.setLevel(logging.INFO)
+
+# -------------------------------------------------------------- #
+# Scenario - the job and the synthetic input it reads
+# ---------------------------------------------------------------#
+@dataclass
+class Scenario:
+  jobId: str
+  inputPath: str
+  xformPath: str
+  generate: object
+  # the states whose span measures the scenario throughput
+  focus: tuple = ()
+
+PROJECT = 'project/dataconvertA1'
+XMLREPO = 'volume/volbankAE/bankAA/auditAA/finAnlysA1/loansBB/profitA1'
+CSVREPO = 'volume/volbankAE/bankAA/loansBB/profitA1/auditAA/finAnlysA1'
+
+SCENARIOS = {
+  'xmltocsv': Scenario('xmltocsvR103',
+      f'{XMLREPO}/xmltocsvR103.xml',
+      f'{PROJECT}/xmltocsvR103/component/assets/xmlXformA1.json',
+      makeXmlFragments,
+      ('serviceA.NORMALISE_XML','serviceA.COMPOSE_CSV_FILES')),
+  'csvtojson': Scenario('csvtojsonR107',
+      f'{CSVREPO}/csvtojsonR107.tar.gz',
+      f'{PROJECT}/csvtojsonR107/component/assets/jsonXformA1.json',
+      makeCsvTarball,
+      ('serviceA.NORMALISE_CSV','serviceA.COMPILE_JSON')),
+  # datastream carries the xmltocsv tar gzipfile to clientB, the input
+  # -- records carry a blob so that the streamed file is large
+  'datastream': Scenario('xmltocsvR103',
+      f'{XMLREPO}/xmltocsvR103.xml',
+      f'{PROJECT}/xmltocsvR103/component/assets/xmlXformA1.json',
+      makeXmlFragments,
+      ('clientB.DOWNLOAD_ZIPFILE',))
+}
+
+# -------------------------------------------------------------- #
+# StateTimer
+# -- completion is watched on AppCooperator.apply, which every actor
+# -- runs with or without a compiled StateMachine. The job is complete
+# -- when the first actor state is complete, or failed if it has failed.
+# -- The resolvers of every StateMachine compiled while it is installed
+# -- are also timed, otherwise the report is taken from the StateClock
+# ---------------------------------------------------------------#
+@dataclass
+class StateTimer:
+  jobId: str
+  jobRepo: object = None
+  firstActor: str = 'serviceA'
+  entries: list = field(default_factory=list)
+  active: dict = field(default_factory=dict)
+  resolvars: dict = field(default_factory=dict)
+  # actor class name to module name, eg ServiceA to serviceA
+  actors: dict = field(default_factory=dict)
+  done: asyncio.Future = None
+  _make: object = None
+  _apply: object = None
+
+  # -------------------------------------------------------------- #
+  # install
+  # ---------------------------------------------------------------#
+  def install(self, loop):
+    self.done = loop.create_future()
+    self._make = StateMachine.__dict__['make']
+    self._apply = AppCooperator.__dict__['apply']
+    timer, make, apply = self, self._make.__func__, self._apply
+
+    def timedMake(cls, resolvar, *args, **kwargs):
+      machine = make(cls, resolvar, *args, **kwargs)
+      timer.wrap(machine, resolvar)
+      return machine
+
+    async def watchedApply(actor, *args, **kwargs):
+      actorKey = timer.actorKey(actor)
+      if actorKey and actor.state.status == 'STOPPED':
+        timer.started(actor, actorKey)
+      try:
+        await apply(actor, *args, **kwargs)
+      finally:
+        if actorKey:
+          timer.observe(actor, actorKey)
+
+    StateMachine.make = classmethod(timedMake)
+    AppCooperator.apply = watchedApply
+
+  # -------------------------------------------------------------- #
+  # remove
+  # ---------------------------------------------------------------#
+  def remove(self):
+    if self._make:
+      StateMachine.make = self._make
+    if self._apply:
+      AppCooperator.apply = self._apply
+
+  # -------------------------------------------------------------- #
+  # actorKey - actor modules are named after the actor, eg serviceA.
+  # -- None if the actor is not of the benchmark job
+  # ---------------------------------------------------------------#
+  def actorKey(self, actor):
+    jobId, actorKey = type(actor).__module__.split('.')[-2:]
+    return actorKey if jobId == self.jobId else None
+
+  # -------------------------------------------------------------- #
+  # started - the job meta is loaded by now, so the job source repo
+  # -- is relocated before the first actor reads it
+  # ---------------------------------------------------------------#
+  def started(self, actor, actorKey):
+    self.actors[actor.name] = actorKey
+    self.resolvars.setdefault(actorKey, actor.resolve)
+    if self.jobRepo and actorKey == self.firstActor:
+      self.jobRepo.relocate(self.jobId)
+
+  # -------------------------------------------------------------- #
+  # observe
+  # ---------------------------------------------------------------#
+  def observe(self, actor, actorKey):
+    state = actor.state
+    if actorKey != self.firstActor or self.done.done() or not state.complete:
+      return
+    if state.failed:
+      self.done.set_exception(Exception(f'{self.jobId}, {actorKey} failed in state {state.current}'))
+    else:
+      self.done.set_result(None)
+
+  # -------------------------------------------------------------- #
+  # wrap
+  # ---------------------------------------------------------------#
+  def wrap(self, machine, resolvar):
+    jobId, actor = type(resolvar).__module__.split('.')[-2:]
+    if jobId != self.jobId:
+      return
+    self.resolvars[actor] = resolvar
+    for index, state in enumerate(machine.states):
+      machine.resolver[index] = self.timed(machine.resolver[index], f'{actor}.{state}')
+
+  # -------------------------------------------------------------- #
+  # timed - an async resolver is timed when its coroutine completes
+  # ---------------------------------------------------------------#
+  def timed(self, resolver, stateKey):
+    timer = self
+
+    async def awaited(coro, started):
+      result = await coro
+      timer.leave(stateKey, started)
+      return result
+
+    def wrapper(*args, **kwargs):
+      started = time.perf_counter()
+      timer.entries.append((stateKey, started))
+      result = resolver(*args, **kwargs)
+      if asyncio.iscoroutine(result):
+        return awaited(result, started)
+      timer.leave(stateKey, started)
+      return result
+
+    return wrapper
+
+  def leave(self, stateKey, started):
+    self.active[stateKey] = self.active.get(stateKey, 0.0) + time.perf_counter() - started
+
+  # -------------------------------------------------------------- #
+  # clockReport - the StateClock spans, if no machine was compiled.
+  # -- The clock does not split out the resolver time
+  # ---------------------------------------------------------------#
+  def clockReport(self):
+    states = {}
+    for entry in Metrics.snapshot(self.jobId)['metrics'].get('apipeer_state_seconds', []):
+      actorKey = self.actors.get(entry['actor'])
+      if actorKey is None:
+        continue
+      states[f'{actorKey}.{entry["state"]}'] = {
+                'span': round(entry['sum'], 6), 'active': None, 'calls': entry['count']}
+    return states
+
+  # -------------------------------------------------------------- #
+  # report - span and active (resolver) seconds by actor.state
+  # ---------------------------------------------------------------#
+  def report(self):
+    if not self.entries:
+      return self.clockReport()
+    states, lastEntry = {}, {}
+    for stateKey, started in self.entries:
+      actor = stateKey.split('.')[0]
+      if actor in lastEntry:
+        priorKey, priorStart = lastEntry[actor]
+        states[priorKey]['span'] += started - priorStart
+      lastEntry[actor] = (stateKey, started)
+      timing = states.setdefault(stateKey, {'span': 0.0, 'active': 0.0, 'calls': 0})
+      timing['calls'] += 1
+    # the last state of an actor spans its own resolver only
+    for stateKey, started in lastEntry.values():
+      states[stateKey]['span'] += self.active.get(stateKey, 0.0) / states[stateKey]['calls']
+    for stateKey, timing in states.items():
+      timing['active'] = self.active.get(stateKey, 0.0)
+    return {stateKey: {key: round(value, 6) for key, value in timing.items()}
+                                        for stateKey, timing in states.items()}
+
+# -------------------------------------------------------------- #
+# JobRepo - a temporary job source repo, so the tree volume is not
+# -- written. The repo paths of the job REPO meta are relocated into
+# -- it, the meta sysPath is relative to apiBase. The REPO meta is
+# -- restored on exit
+# ---------------------------------------------------------------#
+class JobRepo:
+  def __init__(self, jobId):
+    self.root = tempfile.mkdtemp(prefix=f'benchmark-{jobId}-')
+    self.restore = None
+
+  def path(self, repoPath):
+    return f'{self.root}/{repoPath}'
+
+  def relocate(self, jobId):
+    hardhash = HardhashContext.connector(jobId)
+    repoKey = f'REPO|{jobId}'
+    metaDoc = hardhash[repoKey]
+    self.restore = (hardhash, repoKey, copy.deepcopy(metaDoc))
+    for item in metaDoc.values():
+      sysPath = self.path(item['sysPath'])
+      for category in item.get('consumerCategories', []):
+        os.makedirs(f'{sysPath}/{category}', exist_ok=True)
+      item['sysPath'] = os.path.relpath(sysPath, apiBase)
+    hardhash[repoKey] = metaDoc
+    logger.info(f'{jobId}, job source repo is relocated to {self.root}')
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    if self.restore:
+      hardhash, repoKey, metaDoc = self.restore
+      try:
+        hardhash[repoKey] = metaDoc
+      except Exception as ex:
+        logger.warning(f'{repoKey} is not restored : {ex}')
+    shutil.rmtree(self.root, ignore_errors=True)
+
+# -------------------------------------------------------------- #
+# peakRss - kilobytes on linux, bytes on macos
+# ---------------------------------------------------------------#
+def peakRss():
+  scale = 1 if sys.platform == 'darwin' else 1024
+  return {
+    'self': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+    'children': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+  }
+
+# -------------------------------------------------------------- #
+# revision - the git commit of the tree, if available
+# ---------------------------------------------------------------#
+def revision():
+  try:
+    return subprocess.run(['git','rev-parse','--short','HEAD'], cwd=apiBase,
+                  capture_output=True, text=True, check=True).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+# -------------------------------------------------------------- #
+# outputSize - the datastream outfile written by clientB
+# ---------------------------------------------------------------#
+def outputSize(timer):
+  resolvar = timer.resolvars.get('clientB')
+  if resolvar is None:
+    return None
+  try:
+    workspace = resolvar._leveldb[f'{timer.jobId}|datastream|workspace']
+    outfile = resolvar._leveldb[f'{timer.jobId}|datastream|outfile']
+    return os.path.getsize(f'{workspace}/{outfile}')
+  except (KeyError, OSError):
+    return None
+
+# -------------------------------------------------------------- #
+# runJob - starts the local peer, as apiAgent does, and submits the
+# -- job manifest. Returns once the job is complete
+# ---------------------------------------------------------------#
+async def runJob(timer, options):
+  servicesFile = f'benchmark/results/{timer.jobId}Services.json'
+  manifest = {
+    'mode': {'join': ['services']},
+    'services': [{
+      'jobId': timer.jobId,
+      'typeKey': 'Service',
+      'actor': 'first',
+      'caller': 'controler',
+      'dependency': [f'JDEP|{timer.jobId}'],
+      'synchronous': 'True',
+      'runMode': {'startTime': {'relative': True, 'offset': 0}}
+    }]
+  }
+  with open(f'{apiBase}/{servicesFile}', 'w') as fhw:
+    json.dump(manifest, fhw, indent=2)
+
+  ApiPeer.make(apiBase)
+  server = ApiServer.make(options.hostAddr, options.port)
+  peer = asyncio.gather(server.start(), server())
+  try:
+    loader = ApiLoader.make(apiBase)
+    loader.run([options.resources, servicesFile])
+    await asyncio.wait_for(asyncio.shield(timer.done), options.timeout)
+  finally:
+    await server.terminate()
+    peer.cancel()
+    os.remove(f'{apiBase}/{servicesFile}')
+
+# -------------------------------------------------------------- #
+# compare - per state span ratio against a baseline result
+# ---------------------------------------------------------------#
+def compare(result, baselinePath, tolerance):
+  with open(baselinePath) as fhr:
+    baseline = json.load(fhr)
+  regressed = []
+  for stateKey, timing in result['states'].items():
+    prior = baseline['states'].get(stateKey)
+    if not prior or not prior['span']:
+      continue
+    ratio = timing['span'] / prior['span']
+    status = 'REGRESSED' if ratio > 1 + tolerance else 'ok'
+    if ratio > 1 + tolerance:
+      regressed.append(stateKey)
+    logger.info(f'{stateKey:<32} {prior["span"]:>10.3f}s -> {timing["span"]:>10.3f}s  x{ratio:.2f}  {status}')
+  return regressed
+
+# -------------------------------------------------------------- #
+# benchmark
+# ---------------------------------------------------------------#
+def benchmark(options):
+  scenario = SCENARIOS[options.scenario]
+  root = NodeSchema.load(f'{apiBase}/{scenario.xformPath}')
+  os.makedirs(f'{apiBase}/benchmark/results', exist_ok=True)
+
+  with JobRepo(scenario.jobId) as jobRepo:
+    inputPath = jobRepo.path(scenario.inputPath)
+    os.makedirs(os.path.dirname(inputPath), exist_ok=True)
+    logger.info(f'generating {options.scenario} input, {options.records} root records ...')
+    started = time.perf_counter()
+    rowCount = scenario.generate(inputPath, root, options.records,
+              fanout=options.fanout, seed=options.seed, blobSize=options.blobKb * 1024)
+    generated = time.perf_counter() - started
+    inputBytes = os.path.getsize(inputPath)
+    logger.info(f'input {inputBytes} bytes, rows : {rowCount}, in {generated:.3f}s')
+
+    rssBefore = peakRss()
+    timer = StateTimer(scenario.jobId, jobRepo)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    timer.install(loop)
+    started = time.perf_counter()
+    try:
+      loop.run_until_complete(runJob(timer, options))
+    finally:
+      elapsed = time.perf_counter() - started
+      timer.remove()
+      loop.close()
+    streamed = outputSize(timer) if options.scenario == 'datastream' else None
+
+  states = timer.report()
+  focusSpan = sum(states.get(stateKey, {}).get('span', 0.0) for stateKey in scenario.focus)
+  totalRows = sum(rowCount.values())
+  result = {
+    'scenario': options.scenario,
+    'jobId': scenario.jobId,
+    'timestamp': datetime.now().isoformat(timespec='seconds'),
+    'revision': revision(),
+    'host': {
+      'python': platform.python_version(),
+      'platform': platform.platform(),
+      'cpus': os.cpu_count()
+    },
+    'scale': {
+      'records': options.records,
+      'fanout': options.fanout,
+      'blobKb': options.blobKb,
+      'seed': options.seed
+    },
+    'input': {'bytes': inputBytes, 'rows': rowCount, 'generateSecs': round(generated, 3)},
+    'elapsed': round(elapsed, 6),
+    'states': states,
+    'throughput': {
+      'focus': list(scenario.focus),
+      'rowsPerSec': round(totalRows / focusSpan, 1) if focusSpan else None,
+      'inputMBPerSec': round(inputBytes / focusSpan / 1e6, 3) if focusSpan else None,
+      'jobRowsPerSec': round(totalRows / elapsed, 1) if elapsed else None,
+      'streamedBytes': streamed,
+      'streamMBPerSec': round(streamed / focusSpan / 1e6, 3) if streamed and focusSpan else None
+    },
+    'peakRss': {'before': rssBefore, 'after': peakRss()},
+    'metrics': Metrics.snapshot(scenario.jobId)['metrics']
+  }
+  tsXref = datetime.now().strftime('%y%m%d%H%M%S')
+  resultPath = options.output or f'{apiBase}/benchmark/results/{options.scenario}-{tsXref}.json'
+  with open(resultPath, 'w') as fhw:
+    json.dump(result, fhw, indent=2)
+  logger.info(f'benchmark result : {resultPath}')
+  for stateKey, timing in states.items():
+    active = f'{timing["active"]:>10.3f}s' if timing['active'] is not None else f'{"-":>11}'
+    logger.info(f'{stateKey:<32} span {timing["span"]:>10.3f}s  active {active}')
+  logger.info(f'throughput : {result["throughput"]}')
+  logger.info(f'peak rss : {result["peakRss"]["after"]}')
+
+  if options.baseline:
+    regressed = compare(result, options.baseline, options.tolerance)
+    if regressed:
+      logger.warn(f'regressed states : {regressed}')
+      return 1
+  return 0
+
+# -------------------------------------------------------------- #
+# parseArgs
+# ---------------------------------------------------------------#
+def parseArgs(argv=None):
+  parser = argparse.ArgumentParser(description='dataconvertA1 end to end benchmark')
+  parser.add_argument('scenario', choices=sorted(SCENARIOS))
+  parser.add_argument('--records', type=int, default=5000, help='root records to generate')
+  parser.add_argument('--fanout', type=int, default=2, help='child records per parent record')
+  parser.add_argument('--blob-kb', dest='blobKb', type=int, default=None,
+                              help='blob size per root record, datastream default is 256')
+  parser.add_argument('--seed', type=int, default=1)
+  parser.add_argument('--port', type=int, default=5550)
+  parser.add_argument('--host-addr', dest='hostAddr', default='tcp://127.0.0.1')
+  parser.add_argument('--resources', default='apiResources.json')
+  parser.add_argument('--timeout', type=float, default=1800.0, help='job timeout in seconds')
+  parser.add_argument('--output', help='result json path')
+  parser.add_argument('--baseline', help='prior result json to compare with')
+  parser.add_argument('--tolerance', type=float, default=0.1,
+                              help='span increase ratio that is reported as regressed')
+  options = parser.parse_args(argv)
+  if options.blobKb is None:
+    options.blobKb = 256 if options.scenario == 'datastream' else 0
+  return options
+
+if __name__ == '__main__':
+  sys.exit(benchmark(parseArgs()))
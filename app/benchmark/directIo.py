@@ -0,0 +1,102 @@
+# The MIT License
+#
+# Copyright (c) 2018 Peter A McGill
+#
+'''
+  ConnWATC direct io check and benchmark, over an in process QuConnector
+
+  The cancel checks come first, the run fails if one does not hold :
+    late cancel : the read is cancelled in the loop step that completes
+      its io, the read must still return the payload with status 200
+    early cancel : a pending read is cancelled, it must end with 554
+
+  Then send/receive pairs are timed with the configured io timeout
+
+    cd app
+    python -m benchmark.directIo --pairs 50000 --timeout 1
+'''
+from apibase import addHandler
+from apibase.newbase import ConnWATC, Note, QuConnector
+from apibase.newbase.connector import DIRECT_IO
+import argparse
+import asyncio
+import logging
+import sys
+import time
+
+logger = logging.getLogger('asyncio.benchmark')
+addHandler(logger)
+logger.setLevel(logging.INFO)
+
+# -------------------------------------------------------------- #
+# makeChannel - the read and write side of 1 DUEL QuConnector
+# ---------------------------------------------------------------#
+def makeChannel(timeout):
+  props = {'timeout': timeout, 'retries': 0}
+  config = Note({'readProps': props, 'writeProps': props}, recursive=False)
+  qconn = QuConnector.open(cid='directIo')
+  peer = QuConnector(qconn.id, qconn._writer, qconn._reader)
+  return ConnWATC(qconn, config), ConnWATC(peer, config)
+
+# -------------------------------------------------------------- #
+# lateCancel - the write wakes the pending read, then the read is
+# -- cancelled before the reader task resumes
+# ---------------------------------------------------------------#
+async def lateCancel(timeout):
+  reader, writer = makeChannel(timeout)
+  pending = asyncio.ensure_future(reader.receive())
+  await asyncio.sleep(0)
+  await writer.conn._write('payload')
+  reader.cancelRecv()
+  payload = await pending
+  return payload == 'payload' and reader.statusCode == 200, reader.statusCode
+
+# -------------------------------------------------------------- #
+# earlyCancel - a pending read is cancelled, no payload is written
+# ---------------------------------------------------------------#
+async def earlyCancel(timeout):
+  reader, writer = makeChannel(timeout)
+  pending = asyncio.ensure_future(reader.receive())
+  await asyncio.sleep(0)
+  reader.cancelRecv()
+  payload = await pending
+  return payload is None and reader.statusCode == 554, reader.statusCode
+
+# -------------------------------------------------------------- #
+# roundTrips - elapsed seconds for pairs of send and receive
+# ---------------------------------------------------------------#
+async def roundTrips(pairs, timeout):
+  reader, writer = makeChannel(timeout)
+  started = time.perf_counter()
+  for _ in range(pairs):
+    await writer.send('payload')
+    await reader.receive()
+  return time.perf_counter() - started
+
+# -------------------------------------------------------------- #
+# benchmark
+# ---------------------------------------------------------------#
+async def benchmark(args):
+  failed = 0
+  for check in (lateCancel, earlyCancel):
+    passed, statusCode = await check(args.timeout)
+    logger.info(f'{check.__name__} : {"passed" if passed else "FAILED"}, statusCode {statusCode}')
+    failed += not passed
+  if failed:
+    return 1
+  elapsed = await roundTrips(args.pairs, args.timeout)
+  mode = 'direct' if DIRECT_IO else 'task'
+  logger.info(f'{args.pairs} send/receive pairs, {mode} io : {elapsed:.2f}s')
+  return 0
+
+# -------------------------------------------------------------- #
+# parseArgs
+# ---------------------------------------------------------------#
+def parseArgs():
+  parser = argparse.ArgumentParser(description='ConnWATC direct io check and benchmark')
+  parser.add_argument('--pairs', type=int, default=50000, help='send/receive pairs to time')
+  parser.add_argument('--timeout', type=float, default=1.0, help='io timeout in seconds')
+  return parser.parse_args()
+
+if __name__ == '__main__':
+  sys.exit(asyncio.run(benchmark(parseArgs())))
@@ -0,0 +1,171 @@
+__all__ = [
+  'NodeSchema',
+  'makeBlob',
+  'makeCsvTarball',
+  'makeXmlFragments']
+
+# The MIT License
+#
+# Copyright (c) 2018 Peter A McGill
+#
+from base64 import b64encode
+from dataclasses import dataclass, field
+from xml.sax.saxutils import quoteattr
+import csv
+import io
+import json
+import random
+import tarfile
+import tempfile
+
+# -------------------------------------------------------------- #
+# NodeSchema - the record node tree of a transform inputNodeDefn
+# -- A node without columns is a container, eg DriverDetails, it is
+# -- written once per parent record and holds the child records
+# ---------------------------------------------------------------#
+@dataclass
+class NodeSchema:
+  nodeKey: str
+  columns: list
+  ukey: list
+  fkey: list
+  children: list = field(default_factory=list)
+
+  @property
+  def tag(self):
+    return self.nodeKey.split('|')[0]
+
+  @property
+  def isContainer(self):
+    return not self.columns
+
+  # -------------------------------------------------------------- #
+  # load - returns the root node of the assets xform file
+  # ---------------------------------------------------------------#
+  @classmethod
+  def load(cls, xformPath):
+    with open(xformPath) as fhr:
+      nodeDefn = json.load(fhr)['inputNodeDefn']
+    nodes = {nodeKey: cls(nodeKey, defn['columns'], defn['ukey'] or [], defn['fkey'] or [])
+                                          for nodeKey, defn in nodeDefn.items()}
+    root = None
+    for nodeKey, defn in nodeDefn.items():
+      if defn['parentKey'] is None:
+        root = nodes[nodeKey]
+      else:
+        nodes[defn['parentKey']].children.append(nodes[nodeKey])
+    return root
+
+  # -------------------------------------------------------------- #
+  # walk - record nodes in depth first order
+  # ---------------------------------------------------------------#
+  def walk(self):
+    if not self.isContainer:
+      yield self
+    for child in self.children:
+      yield from child.walk()
+
+# -------------------------------------------------------------- #
+# RecordMaker - synthetic column values. Key columns are unique per
+# -- node, foreign key columns take the parent record key value
+# ---------------------------------------------------------------#
+class RecordMaker:
+  def __init__(self, seed, blobSize=0):
+    self.random = random.Random(seed)
+    self.blobSize = blobSize
+    self.serial = {}
+
+  def make(self, node, parent):
+    record = {}
+    for column in node.columns:
+      if column in node.ukey:
+        self.serial[column] = self.serial.get(column, 0) + 1
+        record[column] = f'{column[:3].upper()}{self.serial[column]:09d}'
+      elif column in node.fkey:
+        record[column] = parent[column]
+      else:
+        record[column] = f'{self.random.randrange(1 << 20):x}'
+    if self.blobSize and node.ukey and not node.fkey:
+      # a root data column carries the blob, so the csv payload that
+      # -- datastream carries grows with blobSize
+      column = [column for column in node.columns if column not in node.ukey][-1]
+      record[column] = makeBlob(self.random, self.blobSize)
+    return record
+
+# -------------------------------------------------------------- #
+# makeBlob - base64 of random bytes, so gzip can not shrink it much
+# ---------------------------------------------------------------#
+def makeBlob(rand, size):
+  return b64encode(rand.getrandbits(size * 6).to_bytes(size * 6 // 8, 'little')).decode()
+
+# -------------------------------------------------------------- #
+# makeXmlFragments - xmltocsv input, 1 root record per line without a
+# -- document root. Returns the record count by node tag
+# ---------------------------------------------------------------#
+def makeXmlFragments(xmlPath, root, records, fanout=2, seed=1, blobSize=0):
+  maker = RecordMaker(seed, blobSize)
+  counter = {node.tag: 0 for node in root.walk()}
+
+  def compose(node, parent, buffer):
+    if node.isContainer:
+      buffer.write(f'<{node.tag}>')
+      for child in node.children:
+        for _ in range(fanout):
+          compose(child, parent, buffer)
+      buffer.write(f'</{node.tag}>')
+      return
+    record = maker.make(node, parent)
+    counter[node.tag] += 1
+    attrib = ' '.join(f'{key}={quoteattr(value)}' for key, value in record.items())
+    buffer.write(f'<{node.tag} {attrib}>')
+    for child in node.children:
+      compose(child, record, buffer)
+    buffer.write(f'</{node.tag}>')
+
+  with open(xmlPath, 'w') as fhw:
+    for _ in range(records):
+      buffer = io.StringIO()
+      compose(root, {}, buffer)
+      buffer.write('\n')
+      fhw.write(buffer.getvalue())
+  return counter
+
+# -------------------------------------------------------------- #
+# makeCsvTarball - csvtojson input, a {table}.csv file with a header
+# -- row per record node. Child rows reference their parent ukey. The
+# -- csv files are written in a temporary workspace, not beside tarPath
+# ---------------------------------------------------------------#
+def makeCsvTarball(tarPath, root, records, fanout=2, seed=1, blobSize=0):
+  with tempfile.TemporaryDirectory(prefix='benchmark-csv-') as workspace:
+    return composeCsvTarball(tarPath, workspace, root, records, fanout, seed, blobSize)
+
+def composeCsvTarball(tarPath, workspace, root, records, fanout, seed, blobSize):
+  maker = RecordMaker(seed, blobSize)
+  nodes = list(root.walk())
+  counter = {node.tag: 0 for node in nodes}
+  csvFiles, writers = {}, {}
+  try:
+    for node in nodes:
+      csvFiles[node.tag] = open(f'{workspace}/{node.tag}.csv', 'w', newline='')
+      writers[node.tag] = csv.writer(csvFiles[node.tag], quotechar='"',
+                    doublequote=False, escapechar='\\', lineterminator='\n')
+      writers[node.tag].writerow(node.columns)
+
+    def compose(node, parent):
+      record = maker.make(node, parent)
+      counter[node.tag] += 1
+      writers[node.tag].writerow(record.values())
+      for child in node.children:
+        for _ in range(fanout):
+          compose(child, record)
+
+    for _ in range(records):
+      compose(root, {})
+  finally:
+    for csvfh in csvFiles.values():
+      csvfh.close()
+  with tarfile.open(tarPath, 'w:gz') as tarfh:
+    for node in nodes:
+      csvPath = f'{workspace}/{node.tag}.csv'
+      tarfh.add(csvPath, arcname=f'{node.tag}.csv')
+  return counter
@@ -9,22 +9,6 @@ import logging
 
 logger = logging.getLogger('asyncio.microservice')
 
-#----------------------------------------------------------------#
-# asyncify
-#----------------------------------------------------------------#		
-def asyncify(func):
-  def wrapper(jobId, taskNum, *args, **kwargs):
-    f = asyncio.Future()
-    try:
-      result = func(jobId, taskNum, *args, **kwargs)
-    except Exception as ex:
-      f.set_exception(ex)
-    else:
-      f.set_result(result)
-    finally:
-      return f
-  return wrapper
-
 # -------------------------------------------------------------- #
 # Microservice
 # ---------------------------------------------------------------#
@@ -45,10 +29,20 @@ class Microservice(AbstractMicroservice):
   def destroy(cls):
     cls._subscriber.destroy()
 
-  @asyncify
-  def __call__(self, jobId, taskNum, *args, **kwargs):
-    self._hh = HardhashContext.connector(contextId=jobId)
-    self.runActor(jobId, taskNum, *args, **kwargs)    
+  def reset(self):
+    # a pooled actor gets a new job connector on each call
+    self.__dict__.pop('_hh', None)
+
+  # a coroutine actor gets the awaitable job connector, a sync actor
+  # -- keeps the blocking one and runs inline as before
+  async def __call__(self, jobId, taskNum, *args, **kwargs):
+    if asyncio.iscoroutinefunction(self.runActor):
+      self._hh = HardhashContext.asyncConnector(contextId=jobId)
+      await self.runActor(jobId, taskNum, *args, **kwargs)
+      await self._hh.drain()
+    else:
+      self._hh = HardhashContext.connector(contextId=jobId)
+      self.runActor(jobId, taskNum, *args, **kwargs)
 
 #----------------------------------------------------------------#
 # HHSubscription
@@ -46,15 +46,15 @@ class Resolvar(AppResolvar):
   # FINAL_HANDSHAKE
   # -------------------------------------------------------------- #  
   @iterate('serviceA')
-  def FINAL_HANDSHAKE(self):
-    self.compressFile()
+  async def FINAL_HANDSHAKE(self):
+    await self.compressFile()
 
   # -------------------------------------------------------------- #
   # REMOVE_WORKSPACE
   # -------------------------------------------------------------- #  
   @iterate('serviceA')
-  def REMOVE_WORKSPACE(self):
-    self.removeWorkSpace()
+  async def REMOVE_WORKSPACE(self):
+    await self.removeWorkSpace()
 
   # -------------------------------------------------------------- #
   # evalSysStatus
@@ -131,29 +131,32 @@ class Resolvar(AppResolvar):
     self._leveldb[dbKey] = jsonFile
 
   # -------------------------------------------------------------- #
-  # compressFile
+  # compressFile - the datastream keys are drained before the state
+  # -- completes, the datastream service reads them next
   # ---------------------------------------------------------------#
-  def compressFile(self):
+  async def compressFile(self):
     logger.info(f'{self.name}, gziping {self.jobId}.json ...')
 
+    hardhash = self._aleveldb
     dbKey = f'{self.jobId}|workspace'
-    workspace = self._leveldb[dbKey]
+    workspace = await hardhash.get(dbKey)
 
     jsonFile = self.jobId + '.json'
     self.sysCmd(['gzip',jsonFile],cwd=workspace)
     dbKey = f'{self.jobId}|datastream|infile'
-    self._leveldb[dbKey] = jsonFile + '.gz'
+    await hardhash.put(dbKey, jsonFile + '.gz')
     dbKey = f'{self.jobId}|datastream|workspace'
-    self._leveldb[dbKey] = workspace
+    await hardhash.put(dbKey, workspace)
+    await hardhash.drain()
 
   # -------------------------------------------------------------- #
   # removeWorkSpace
   # ---------------------------------------------------------------#
-  def removeWorkSpace(self):
+  async def removeWorkSpace(self):
     logger.info(f'ATTN. removing {self.jobId} workspace ...')
     try:
       dbKey = f'{self.jobId}|workspace'
-      workspace = self._leveldb[dbKey]
+      workspace = await self._aleveldb.get(dbKey)
       self.sysCmd(['rm','-rf',workspace])
       logger.info(f'ATTN. {self.jobId} workspace is now removed : {workspace}')
     except TaskError as ex:
@@ -38,12 +38,12 @@ class DatastreamResponse(ZmqConnector):
   async def _PREPARE(self, jobId, taskId):
     self.jobId = jobId
     logger.info(f'{self.name}, job {jobId}, preparing {taskId} data stream ...')    
-    hardhash = HardhashContext.connector(jobId)
+    hardhash = HardhashContext.asyncConnector(jobId)
     try:
       dbKey = f'{jobId}|workspace'
-      workspace = hardhash[dbKey]
+      workspace = await hardhash.get(dbKey)
       dbKey = f'{jobId}|datastream|infile'
-      self.infileName = hardhash[dbKey]
+      self.infileName = await hardhash.get(dbKey)
     except KeyError as ex:
       errmsg = f'{jobId}, failed to get job article from datastorage'
       await self.sock.send_json([500, {'error': errmsg}])
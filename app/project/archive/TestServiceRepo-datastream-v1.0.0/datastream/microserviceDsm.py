@@ -13,7 +13,7 @@ class Microservice(AbstractMicroservice):
   _subscriber = None
 
   async def __call__(self, jobId, taskNum, *args, **kwargs):
-    self._leveldb = HardhashContext.connector(contextId=jobId)
+    self._leveldb = HardhashContext.asyncConnector(contextId=jobId)
     await self.runActor(jobId, taskNum, *args, **kwargs)
     await self._subscriber.notify(taskNum, self.name)
 
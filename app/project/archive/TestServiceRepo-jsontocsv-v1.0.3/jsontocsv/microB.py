@@ -30,9 +30,9 @@ class DatastreamReader(Microservice, Terminal):
   async def readFile(self, jobId, taskNum):
     try:
       dbkey = f'{jobId}|datastream|workspace'
-      workspace = self._leveldb[dbkey]
+      workspace = await self._leveldb.get(dbkey)
       dbkey = f'{jobId}|datastream|outfile'
-      outfileName = self._leveldb[dbkey]
+      outfileName = await self._leveldb.get(dbkey)
     except KeyError as ex:
       errmsg = f'{jobId} workspace or filename info not found'
       logger.error(errmsg)
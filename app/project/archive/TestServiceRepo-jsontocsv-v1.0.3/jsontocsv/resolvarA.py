@@ -71,8 +71,8 @@ class Resolvar(AppResolvar):
   # MAKE_ZIP_FILE
   # -------------------------------------------------------------- #  
   @iterate('serviceA')
-  def MAKE_ZIPFILE(self):
-    self.makeGZipFile()
+  async def MAKE_ZIPFILE(self):
+    await self.makeGZipFile()
 
   # -------------------------------------------------------------- #
   # FINAL_HANDSHAKE
@@ -85,8 +85,8 @@ class Resolvar(AppResolvar):
   # REMOVE_WORKSPACE
   # -------------------------------------------------------------- #  
   @iterate('serviceA')
-  def REMOVE_WORKSPACE(self):
-    self.removeWorkSpace()
+  async def REMOVE_WORKSPACE(self):
+    await self.removeWorkSpace()
 
   # -------------------------------------------------------------- #
   # evalSysStatus
@@ -182,36 +182,37 @@ class Resolvar(AppResolvar):
     self._leveldb[dbKey] = splitFileName
 
   # -------------------------------------------------------------- #
-  # makeGZipFile
+  # makeGZipFile - the datastream keys are drained before the state
+  # -- completes, the datastream service reads them next
   # ---------------------------------------------------------------#
-  def makeGZipFile(self):
+  async def makeGZipFile(self):
+    hardhash = self._aleveldb
     dbKey = f'{self.jobId}|workspace'
-    workspace = self._leveldb[dbKey]
+    workspace = await hardhash.get(dbKey)
     gzipFile = f'{self.jobId}.tar.gz'
     logger.info(f'making tar gzipfile {gzipFile} ...')
 
     cmd = f'tar -czf {gzipFile} *.csv'
     try:
       self.sysCmd(cmd,cwd=workspace,shell=True)
-      dbKey = f'{self.jobId}|datastream|infile'
-      self._leveldb[dbKey] = gzipFile
     except TaskError as ex:
       errmsg = f'{gzipFile}, tar gzip failed'
       logger.error(errmsg)
       raise
     dbKey = f'{self.jobId}|datastream|infile'
-    self._leveldb[dbKey] = gzipFile
+    await hardhash.put(dbKey, gzipFile)
     dbKey = f'{self.jobId}|datastream|workspace'
-    self._leveldb[dbKey] = workspace
+    await hardhash.put(dbKey, workspace)
+    await hardhash.drain()
 
   # -------------------------------------------------------------- #
   # removeWorkSpace
   # ---------------------------------------------------------------#
-  def removeWorkSpace(self):
+  async def removeWorkSpace(self):
     logger.info(f'removing {self.jobId} workspace ...')
     try:
       dbKey = f'{self.jobId}|workspace'
-      workspace = self._leveldb[dbKey]
+      workspace = await self._aleveldb.get(dbKey)
       self.sysCmd(['rm','-rf',workspace])
       logger.info(f'ATTN. {self.jobId} workspace is now removed : {workspace}')
     except TaskError as ex:
@@ -1,8 +1,10 @@
 __all__ = [
   'activate',
+  'CsvStreamConnector',
   'Microservice',
   'TreeProvider']
 
+from .csvStream import CsvStreamConnector
 from .microserviceHdh import Microservice
 from .treeProvider import TreeProvider
 import os
@@ -50,9 +50,41 @@ class NodeTreeA1(NodeTree):
       nodeKey = f'{tag}|{self.level}'
       self.nodes[nodeKey].dump()
       logger.debug(f'{self.name}, dump : {nodeKey}')      
+      if self.level == 1:
+        self.count()
       self.level -= 1
     except KeyError:
-      pass
+      self.level -= 1
+
+  # -------------------------------------------------------------- #
+  # nodeMap - (tag, level) lookup, avoids formatting a node key
+  # -- for every streaming parser event
+  # ---------------------------------------------------------------#
+  def nodeMap(self):
+    nodeMap = {}
+    for nodeKey, treeNode in self.nodes.items():
+      tag, level = nodeKey.split('|')
+      nodeMap[(tag, int(level))] = treeNode
+    return nodeMap
+
+  # -------------------------------------------------------------- #
+  # streamable - direct csv streaming writes rows in document order,
+  # -- which matches the composed output only for 1 node per table
+  # ---------------------------------------------------------------#
+  @property
+  def streamable(self):
+    if not self.tableMap:
+      return False
+    return all(len(nodeList) == 1 for tableName, nodeList in self.tableMap.values())
+
+  # -------------------------------------------------------------- #
+  # connectors - the distinct hardhash connectors of the arranged nodes
+  # ---------------------------------------------------------------#
+  def connectors(self):
+    connectors = {}
+    for treeNode in self.nodes.values():
+      connectors[id(treeNode._hh)] = treeNode._hh
+    return list(connectors.values())
 
   def data(self, data):
     # Ignore data inside nodes
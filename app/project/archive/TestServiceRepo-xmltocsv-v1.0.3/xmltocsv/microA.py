@@ -3,13 +3,19 @@
 # Copyright (c) 2018 Peter A McGill
 #
 from apibase import TaskError
-from lxml.etree import XMLParser, ParseError
-from .component import Microservice, TreeProvider
+from itertools import chain, islice
+from lxml.etree import XMLParser, ParseError, iterparse
+from .component import CsvStreamConnector, Microservice, TreeProvider
+import csv, io
 import logging
 import os, sys
 
 logger = logging.getLogger('asyncio.microservice')
 
+READ_SIZE = 1 << 20
+WRITE_SIZE = 1 << 20
+BATCH_SIZE = 1000
+
 # -------------------------------------------------------------- #
 # XmlNormaliser
 # ---------------------------------------------------------------#
@@ -20,8 +26,9 @@ class XmlNormaliser(Microservice):
   '''
   # -------------------------------------------------------------- #
   # runActor
+  # -- engine : iterparse (default) or feed
   # ---------------------------------------------------------------#
-  def runActor(self, jobId, taskNum, *args, **kwargs):
+  def runActor(self, jobId, taskNum, *args, engine='iterparse', **kwargs):
     try:
       logger.info(f'### XmlNormaliser {taskNum} is called ... ###')
       dbKey = f'{jobId}|workspace'
@@ -37,7 +44,12 @@ class XmlNormaliser(Microservice):
         errmsg = f'{xmlFile} does not exist in workspace'
         raise Exception(errmsg)      
       self.arrange(taskNum)
-      self.run(xmlPath, xmlFile)
+      if self.streamMode(jobId) == 'direct':
+        self.stream(taskNum, workspace, xmlPath, xmlFile)
+      elif engine == 'feed':
+        self.run(xmlPath, xmlFile)
+      else:
+        self.iterparse(xmlPath, xmlFile)
     except Exception as ex:
       logger.error(f'{self.name}, actor {self.actorId} errored', exc_info=True)
       raise TaskError(ex)
@@ -54,18 +66,116 @@ class XmlNormaliser(Microservice):
         parser.feed('<Root>\n')
         for xmlRecord in fhr:
           try:
-            self.nodeTree.count()
             parser.feed(xmlRecord)
           except ParseError as ex:
-            logger.error(exc_info=True)
-        parser.feed('<\Root>\n')
+            logger.error(f'{xmlFile}, parse error', exc_info=True)
+        parser.feed('</Root>\n')
         parser.close()
+      # recover mode repairs or drops a malformed record, so report it
+      for entry in parser.error_log:
+        logger.error(f'{xmlFile}, line {entry.line}, recovered parse error : {entry.message}')
       rowcount = self.nodeTree.result()
       logger.info(f'### {xmlFile} rowcount : {rowcount}')
+    except Exception as ex:
+      errMsg = f'xml inputFile, recnum : {xmlFile}, {self.nodeTree.result()}'
+      logger.error(errMsg, exc_info=True)
+      raise
+
+	#------------------------------------------------------------------#
+	# iterparse - streaming engine, memory stays flat because each root
+  # -- record is cleared and detached once its datasets are dumped.
+  # -- Every element counts for the level, as in NodeTreeA1, so the
+  # -- node map agrees with the feed engine on non schema wrappers. A
+  # -- malformed record raises XMLSyntaxError, it is not recovered
+	#------------------------------------------------------------------#
+  def iterparse(self, xmlPath, xmlFile):
+    logger.info(f'{self.name}, iterparse normalise start ...')
+    nodeMap = self.nodeTree.nodeMap()
+    wbuffer = self.batch()
+    notFound = set()
+    # the Root wrapper element is level 0
+    level, rowcount = -1, 0
+    try:
+      logger.info(f'parsing {xmlFile} ...')
+      with open(xmlPath, 'rb', buffering=READ_SIZE) as bfh:
+        xmlReader = XmlFragmentReader(bfh)
+        events = iterparse(xmlReader, events=('start','end'), huge_tree=True)
+        for event, elem in events:
+          if event == 'start':
+            level += 1
+            treeNode = nodeMap.get((elem.tag, level))
+            if treeNode:
+              treeNode.extract(dict(elem.attrib))
+            elif level and (elem.tag, level) not in notFound:
+              notFound.add((elem.tag, level))
+              logger.warn(f'{self.name}, not found : {elem.tag}|{level}')
+            continue
+          treeNode = nodeMap.get((elem.tag, level))
+          if treeNode:
+            treeNode.dump()
+          level -= 1
+          if level == 0:
+            # root record is complete, commit its puts in one batch write
+            wbuffer.flush()
+            rowcount += 1
+            elem.clear()
+            while elem.getprevious() is not None:
+              del elem.getparent()[0]
+        del events
+      wbuffer.flush()
+      logger.info(f'### {xmlFile} rowcount : {rowcount}')
     except Exception as ex:
       errMsg = f'xml inputFile, recnum : {xmlFile}, {rowcount}'
       logger.error(errMsg, exc_info=True)
       raise
+    finally:
+      self.unbatch()
+
+	#------------------------------------------------------------------#
+	# streamMode - direct mode falls back to hardhash if the schema has
+  # -- multiple nodes per table, the composer then reads the fallback
+	#------------------------------------------------------------------#
+  def streamMode(self, jobId):
+    dbKey = f'{jobId}|XFORM|streamMode'
+    try:
+      streamMode = self._hh[dbKey]
+    except KeyError:
+      return 'hardhash'
+    if streamMode == 'direct' and not self.nodeTree.streamable:
+      logger.warn(f'{self.name}, schema is not streamable, using hardhash mode')
+      streamMode = self._hh[dbKey] = 'hardhash'
+    return streamMode
+
+	#------------------------------------------------------------------#
+	# stream - direct mode, the tree nodes write to the table csv files
+  # -- instead of the hardhash datastore
+	#------------------------------------------------------------------#
+  def stream(self, taskNum, workspace, xmlPath, xmlFile):
+    logger.info(f'{self.name}, direct csv stream mode ...')
+    connector = CsvStreamConnector.make(taskNum, workspace, self.nodeTree.tableMap)
+    for treeNode in self.nodeTree.nodes.values():
+      treeNode._hh = connector
+    try:
+      self.iterparse(xmlPath, xmlFile)
+    finally:
+      connector.close()
+
+	#------------------------------------------------------------------#
+	# batch - bind one write buffer to all node connectors
+	#------------------------------------------------------------------#
+  def batch(self):
+    connectors = self.nodeTree.connectors()
+    wbuffer = connectors[0].batch()
+    for connector in connectors[1:]:
+      connector.batch(wbuffer)
+    return wbuffer
+
+	#------------------------------------------------------------------#
+	# unbatch
+	#------------------------------------------------------------------#
+  def unbatch(self):
+    for connector in self.nodeTree.connectors():
+      connector.unbatch()
 
 	#------------------------------------------------------------------#
 	# arrange
@@ -74,6 +184,30 @@ class XmlNormaliser(Microservice):
     self.nodeTree = TreeProvider.get()
     self.nodeTree.arrange(taskNum)
 
+#------------------------------------------------------------------#
+# XmlFragmentReader
+# - the xml input is a sequence of records, maybe a split file, so 
+# - wrap the byte stream with a Root element for iterparse
+#------------------------------------------------------------------#
+class XmlFragmentReader:
+  def __init__(self, bfh):
+    self._bfh = bfh
+    self._head = b'<Root>\n'
+    self._tail = b'</Root>\n'
+
+  #------------------------------------------------------------------#
+	# read
+	#------------------------------------------------------------------#
+  def read(self, size=READ_SIZE):
+    if self._head:
+      chunk, self._head = self._head, b''
+      return chunk
+    chunk = self._bfh.read(size)
+    if chunk:
+      return chunk
+    chunk, self._tail = self._tail, b''
+    return chunk
+
 #------------------------------------------------------------------#
 # CsvComposer
 #------------------------------------------------------------------#
@@ -90,6 +224,9 @@ class CsvComposer(Microservice):
       logger.info(f'### {self.name} is called ... ###')
       dbKey = f'{jobId}|workspace'
       workspace = self._hh[dbKey]
+      if self.streamMode(jobId) == 'direct':
+        logger.info(f'{self.name}, csv files were written by the direct stream, skipping ...')
+        return
       self.nodeTree = TreeProvider.get()
       tableName, nodeList = self.nodeTree.tableMap[taskNum]
 
@@ -101,6 +238,16 @@ class CsvComposer(Microservice):
       logger.error(f'actor {self.actorId} error', exc_info=True)
       raise TaskError(ex)
 
+  #------------------------------------------------------------------#
+	# streamMode - a job put before stream modes existed has no key
+	#------------------------------------------------------------------#
+  def streamMode(self, jobId):
+    dbKey = f'{jobId}|XFORM|streamMode'
+    try:
+      return self._hh[dbKey]
+    except KeyError:
+      return 'hardhash'
+
 # -------------------------------------------------------------- #
 # CsvComposer - end
 # -------------------------------------------------------------- #  
@@ -125,24 +272,35 @@ class CsvWriter:
     return cls(connector, taskNum, tableName, keyHigh)
 
   #------------------------------------------------------------------#
-	# writeAll
+	# writeAll - a flat table is a composite stack of 1 or more datasets,
+  # - formatted in batches into an output buffer flushed in MB writes
 	#------------------------------------------------------------------#
   def writeAll(self, csvPath, nodeList):
-    with open(csvPath,'w') as csvfh:
-      self.writeHeader(csvfh, nodeList[0])
+    with open(csvPath, 'w', newline='') as csvfh:
+      buffer = io.StringIO()
+      csvWriter = csv.writer(buffer, lineterminator='\n')
+      csvWriter.writerow(self.getHeader(nodeList[0]))
       total = 0
-      # a flat table is a composite stack of 1 or more datasets 
-      for nodeName in nodeList:
-        self.write(csvfh, nodeName)
-        total += 1
+      for batch in self.csvBatches(nodeList):
+        csvWriter.writerows(batch)
+        total += len(batch)
+        if buffer.tell() >= WRITE_SIZE:
+          csvfh.write(buffer.getvalue())
+          buffer.seek(0)
+          buffer.truncate()
+      csvfh.write(buffer.getvalue())
       logger.info(f'### {self.tableName} rowcount : {total}')
 
   #------------------------------------------------------------------#
-	# write
+	# csvBatches - one scan chained over every node range, in nodeList order
 	#------------------------------------------------------------------#
-  def write(self, csvFh, nodeName):
-    for record in self.csvDataset(nodeName):
-      csvFh.write(','.join(record) + '\n')
+  def csvBatches(self, nodeList, batchSize=BATCH_SIZE):
+    dataset = chain.from_iterable(map(self.csvDataset, nodeList))
+    while True:
+      batch = list(islice(dataset, batchSize))
+      if not batch:
+        break
+      yield batch
 
   #------------------------------------------------------------------#
 	# csvDataset
@@ -153,14 +311,12 @@ class CsvWriter:
     return self._hh.select(keyLow,keyHigh)
 
   #------------------------------------------------------------------#
-	# writeHeader
+	# getHeader
 	#------------------------------------------------------------------#
-  def writeHeader(self, csvfh, nodeName):
+  def getHeader(self, nodeName):
     dbkey = f'{nodeName}|header'
     logger.info(f'{self.name}, header key : {dbkey}')
-    header = self._hh[dbkey]
-    record = ','.join(header)
-    csvfh.write(record + '\n')
+    return self._hh[dbkey]
 
 #------------------------------------------------------------------#
 # CsvWriter - end
@@ -18,22 +18,6 @@ logger = logging.getLogger('asyncio.microservice')
 # ---------------------------------------------------------------#
 class TreeProvider(TreeProviderA):
 
-  # -------------------------------------------------------------- #
-  # __start__
-  # ---------------------------------------------------------------#
-  @classmethod
-  def __start__(cls, metaFile):
-    if not cls._nodeTree:
-      with open(metaFile,'r') as fhr:
-        try:
-          schema = Note(json.load(fhr))
-          provider = cls.make(schema)
-          logger.debug(f'########## schema is loaded, maxLevel : {provider.maxLevel}')
-          del provider
-        except ValueError as ex:
-          errmsg = 'json load error: ' + str(ex) 
-          raise Exception(errmsg)
-
 	#------------------------------------------------------------------#
 	# make
 	#------------------------------------------------------------------#
@@ -63,6 +47,23 @@ class TreeProvider(TreeProviderA):
     tablePrvdr.apply(tablePrvdr)
     return treePrvdr
 
+	#------------------------------------------------------------------#
+	# compile - the table provider instance is part of the schema plan
+	#------------------------------------------------------------------#
+  @classmethod
+  def compile(cls):
+    plan = super().compile()
+    plan['tableProvider'] = TableProviderA._instance
+    return plan
+
+	#------------------------------------------------------------------#
+	# restore
+	#------------------------------------------------------------------#
+  @classmethod
+  def restore(cls, plan):
+    super().restore(plan)
+    TableProviderA.restore(plan['tableProvider'])
+
 # -------------------------------------------------------------- #
 # TaskMember
 # ---------------------------------------------------------------#
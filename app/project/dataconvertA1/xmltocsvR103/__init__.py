@@ -24,6 +24,7 @@ class promote:
   def __init__(self, role):
     metaKey = f'{role}-promote'
     self.metaFw = promoteFw[metaKey]
+    self.iterateKey = f'{role}-iterate'
 
   def __call__(self, func):
     @wraps(func)
@@ -32,6 +33,7 @@ class promote:
       for key, value in self.metaFw.items():
         obj._quicken[key] = value
       func(obj, *args, **kwargs)
+      obj.compile(iterateFw[self.iterateKey], self.metaFw)
     return wrapper
 
 iterateFw = {
@@ -64,7 +66,7 @@ class iterate:
     @wraps(func)
     def wrapper(obj, *args, **kwargs):
       if asyncio.iscoroutinefunction(func):
-        return func(obj, *args, **kwargs)
+        return self.advance(func, obj, *args, **kwargs)
       f = asyncio.Future()
       try:
         func(obj, *args, **kwargs)
@@ -75,4 +77,10 @@ class iterate:
         f.set_result(obj.state)
       finally:
         return f
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+  # a coroutine resolver is awaited, then the state delta is applied
+  async def advance(self, func, obj, *args, **kwargs):
+    await func(obj, *args, **kwargs)
+    obj.state.__dict__.update(self.metaFw[func.__name__])
+    return obj.state
\ No newline at end of file
@@ -0,0 +1,138 @@
+__all__ = ['CsvStreamConnector']
+
+# The MIT License
+#
+# Copyright (c) 2018 Peter A McGill
+#
+import csv
+import logging
+
+logger = logging.getLogger('asyncio.microservice')
+
+WRITE_SIZE = 1 << 20
+
+#------------------------------------------------------------------#
+# CsvTableWriter
+# - buffered csv output for 1 tableMap entry
+#------------------------------------------------------------------#
+class CsvTableWriter:
+  def __init__(self, csvPath, tableName):
+    self.csvPath = csvPath
+    self.tableName = tableName
+    self.rowcount = 0
+    self._pending = []
+    self._header = False
+    self._fh = open(csvPath, 'w', newline='', buffering=WRITE_SIZE)
+    self._writer = csv.writer(self._fh, lineterminator='\n')
+
+  #------------------------------------------------------------------#
+	# writeHeader - TreeNodeRNA1 puts the header after the first row
+	#------------------------------------------------------------------#
+  def writeHeader(self, header):
+    if self._header:
+      return
+    self._header = True
+    self._writer.writerow(header)
+    if self._pending:
+      self._writer.writerows(self._pending)
+      self._pending = []
+
+  #------------------------------------------------------------------#
+	# writerow
+	#------------------------------------------------------------------#
+  def writerow(self, record):
+    self.rowcount += 1
+    if not self._header:
+      self._pending.append(record)
+      return
+    self._writer.writerow(record)
+
+  #------------------------------------------------------------------#
+	# close
+	#------------------------------------------------------------------#
+  def close(self):
+    if self._pending:
+      logger.warn(f'{self.tableName}, header was not provided, writing rows only')
+      self._writer.writerows(self._pending)
+      self._pending = []
+    self._fh.close()
+    return self.rowcount
+
+#------------------------------------------------------------------#
+# CsvStreamConnector
+# - stands in for the hardhash connector of each tree node, so that
+# - extracted rows go straight to the table csv files in document order
+#------------------------------------------------------------------#
+class CsvStreamConnector:
+  def __init__(self, taskNum):
+    self.taskNum = taskNum
+    self._writer = {}
+    self._tables = []
+
+  @property
+  def cid(self):
+    return f'CsvStream.{self.taskNum:02}'
+
+  #------------------------------------------------------------------#
+	# make
+	#------------------------------------------------------------------#
+  @classmethod
+  def make(cls, taskNum, workspace, tableMap):
+    connector = cls(taskNum)
+    for tableName, nodeList in tableMap.values():
+      connector.addTable(workspace, tableName, nodeList)
+    return connector
+
+  #------------------------------------------------------------------#
+	# addTable
+	#------------------------------------------------------------------#
+  def addTable(self, workspace, tableName, nodeList):
+    if self.taskNum == 1:
+      csvPath = f'{workspace}/{tableName}.csv'
+    else:
+      csvPath = f'{workspace}/{tableName}-{self.taskNum:02}.csv'
+    writer = CsvTableWriter(csvPath, tableName)
+    self._tables.append(writer)
+    for nodeName in nodeList:
+      self._writer[nodeName] = writer
+
+  #------------------------------------------------------------------#
+	# __setitem__
+	#------------------------------------------------------------------#
+  def __setitem__(self, key, value):
+    self.put(key, value)
+
+  #------------------------------------------------------------------#
+	# put - dbkey format is {tableName}|{level}|{suffix}, where the suffix
+  # - is either header or the record sequence key
+	#------------------------------------------------------------------#
+  def put(self, key, value):
+    tableName, level, suffix = key.split('|', 2)
+    writer = self._writer.get(f'{tableName}|{level}')
+    if not writer:
+      return
+    if suffix == 'header':
+      writer.writeHeader(value)
+    else:
+      writer.writerow(value)
+
+  #------------------------------------------------------------------#
+	# batch - the table writers are already buffered, so batch mode
+  # - is a passthru to satisfy the normaliser engine protocol
+	#------------------------------------------------------------------#
+  def batch(self, wbuffer=None):
+    return self
+
+  def unbatch(self):
+    pass
+
+  def flush(self):
+    return 0
+
+  #------------------------------------------------------------------#
+	# close
+	#------------------------------------------------------------------#
+  def close(self):
+    for writer in self._tables:
+      rowcount = writer.close()
+      logger.info(f'### {writer.tableName} rowcount : {rowcount}')
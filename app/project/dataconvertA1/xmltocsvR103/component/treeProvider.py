@@ -17,22 +17,6 @@ logger = logging.getLogger('asyncio.microservice')
 # ---------------------------------------------------------------#
 class TreeProvider(TreeProviderA):
 
-  # -------------------------------------------------------------- #
-  # __start__
-  # ---------------------------------------------------------------#
-  @classmethod
-  def __start__(cls, metaFile):
-    if not cls._nodeTree:
-      with open(metaFile,'r') as fhr:
-        try:
-          schema = Note(json.load(fhr))
-          provider = cls.make(schema)
-          logger.debug(f'########## schema is loaded, maxLevel : {provider.maxLevel}')
-          del provider
-        except ValueError as ex:
-          errmsg = 'json load error: ' + str(ex) 
-          raise Exception(errmsg)
-
 	#------------------------------------------------------------------#
 	# make
 	#------------------------------------------------------------------#
@@ -73,6 +73,9 @@ from datetime import datetime
 from .component import activate
 import os
 import math
+import shutil
+
+WRITE_SIZE = 1 << 20
 
 # -------------------------------------------------------------- #
 # getLineCount
@@ -137,8 +140,8 @@ class Resolvar(AppResolvar):
   # MAKE_ZIP_FILE
   # -------------------------------------------------------------- #  
   @iterate('serviceA')
-  def MAKE_ZIPFILE(self):
-    self.makeGZipFile()
+  async def MAKE_ZIPFILE(self):
+    await self.makeGZipFile()
 
   # -------------------------------------------------------------- #
   # FINAL_HANDSHAKE
@@ -151,8 +154,8 @@ class Resolvar(AppResolvar):
   # REMOVE_WORKSPACE
   # -------------------------------------------------------------- #  
   @iterate('serviceA')
-  def REMOVE_WORKSPACE(self):
-    self.removeWorkSpace()
+  async def REMOVE_WORKSPACE(self):
+    await self.removeWorkSpace()
 
   # -------------------------------------------------------------- #
   # evalSysStatus
@@ -238,6 +241,12 @@ class Resolvar(AppResolvar):
     self._leveldb[dbKey] = workspace
     self.workspace = workspace
 
+    # direct : XmlNormaliser writes the csv files, bypassing hardhash
+    streamMode = getattr(self.jmeta, 'streamMode', None) or 'hardhash'
+    logger.info(f'{self.jobId}, xml to csv stream mode : {streamMode}')
+    dbKey = f'{self.jobId}|XFORM|streamMode'
+    self._leveldb[dbKey] = streamMode
+
   # -------------------------------------------------------------- #
   # putSplitFilename
   # ---------------------------------------------------------------#
@@ -248,36 +257,74 @@ class Resolvar(AppResolvar):
     self._leveldb[dbKey] = splitFileName
 
   # -------------------------------------------------------------- #
-  # makeGZipFile
+  # makeGZipFile - the datastream keys are drained before the state
+  # -- completes, the datastream service reads them next
   # ---------------------------------------------------------------#
-  def makeGZipFile(self):
+  async def makeGZipFile(self):
+    hardhash = self._aleveldb
     dbKey = f'{self.jobId}|workspace'
-    workspace = self._leveldb[dbKey]
+    workspace = await hardhash.get(dbKey)
+    await self.mergeStreamFiles(workspace)
     gzipFile = f'{self.jobId}.tar.gz'
     logger.info(f'making tar gzipfile {gzipFile} ...')
 
     cmd = f'tar -czf {gzipFile} *.csv'
     try:
       self.sysCmd(cmd,cwd=workspace,shell=True)
-      dbKey = f'{self.jobId}|datastream|infile'
-      self._leveldb[dbKey] = gzipFile
     except TaskError as ex:
       errmsg = f'{gzipFile}, tar gzip failed'
       logger.error(errmsg)
       raise
     dbKey = f'{self.jobId}|datastream|infile'
-    self._leveldb[dbKey] = gzipFile
+    await hardhash.put(dbKey, gzipFile)
     dbKey = f'{self.jobId}|datastream|workspace'
-    self._leveldb[dbKey] = workspace
+    await hardhash.put(dbKey, workspace)
+    await hardhash.drain()
+
+  # -------------------------------------------------------------- #
+  # mergeStreamFiles - in direct mode each split task streams its own
+  # -- {tableName}-{taskNum}.csv file. Append them in task order to the
+  # -- task 1 {tableName}.csv file, without their header row, so that
+  # -- the deliverable matches hardhash mode, 1 csv file per table
+  # ---------------------------------------------------------------#
+  async def mergeStreamFiles(self, workspace):
+    dbKey = f'{self.jobId}|XFORM|streamMode'
+    try:
+      streamMode = await self._aleveldb.get(dbKey)
+    except KeyError:
+      return
+    jobRange = getattr(self, 'jobRange', 1)
+    if streamMode != 'direct' or jobRange == 1:
+      return
+    for csvFile in sorted(os.listdir(workspace)):
+      tableName = csvFile[:-4]
+      if not csvFile.endswith('.csv') or \
+                not os.path.exists(f'{workspace}/{tableName}-02.csv'):
+        continue
+      csvPath = f'{workspace}/{csvFile}'
+      with open(csvPath, 'rb') as fhr:
+        header = fhr.readline()
+      with open(csvPath, 'ab') as fhw:
+        for taskNum in range(2, jobRange+1):
+          taskPath = f'{workspace}/{tableName}-{taskNum:02}.csv'
+          if not os.path.exists(taskPath):
+            continue
+          with open(taskPath, 'rb') as fhr:
+            firstLine = fhr.readline()
+            if firstLine != header:
+              fhw.write(firstLine)
+            shutil.copyfileobj(fhr, fhw, WRITE_SIZE)
+          os.remove(taskPath)
+      logger.info(f'{self.jobId}, merged {jobRange} stream task files : {csvFile}')
 
   # -------------------------------------------------------------- #
   # removeWorkSpace
   # ---------------------------------------------------------------#
-  def removeWorkSpace(self):
+  async def removeWorkSpace(self):
     logger.info(f'removing {self.jobId} workspace ...')
     try:
       dbKey = f'{self.jobId}|workspace'
-      workspace = self._leveldb[dbKey]
+      workspace = await self._aleveldb.get(dbKey)
       self.sysCmd(['rm','-rf',workspace])
       logger.info(f'ATTN. {self.jobId} workspace is now removed : {workspace}')
     except TaskError as ex: